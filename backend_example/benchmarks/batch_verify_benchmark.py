@@ -0,0 +1,103 @@
+"""
+Benchmark for batch verification.
+
+Verifies a portfolio of synthetic contracts through the same verification
+engine and checks as /verify, one document at a time and with the batch
+verifier's bounded concurrency, and reports documents per second. No
+result cache is used, so every document runs every check.
+
+Run from the backend directory:
+    python benchmarks/batch_verify_benchmark.py
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import functools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analysis_service import AnalysisService
+from services.batch_verifier import BatchVerifier
+from services.document_service import DocumentService
+from services.risk_model import RiskModel
+from services.rule_packs import RulePackRegistry
+from services.verification_checks import DEFAULT_CHECKS, build_artifact_providers, compose_verification_result
+from services.verification_engine import VerificationEngine
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules")
+
+CLAUSES = [
+    "This Agreement is made on {day} March 2024 between Northwind Traders Ltd (the \"Supplier\") and Jane Smith (the \"Customer\").",
+    "The Customer shall pay the fees of ${amount} within thirty days of each invoice.",
+    "Either party may terminate this agreement on thirty days written notice.",
+    "This Agreement is governed by the laws of the State of New York.",
+    "Any dispute shall be settled by binding arbitration in New York.",
+    "This Agreement is the entire agreement between the parties and supersedes all prior agreements.",
+    "The Supplier shall deliver the goods to the premises of the Customer in good condition and on time.",
+    "Confidential information shall not be disclosed to any third party without prior written consent."
+]
+
+DOCUMENTS = 200
+
+
+def make_contract(rng: random.Random, paragraphs: int = 60) -> bytes:
+    body = "\n\n".join(
+        f"{position + 1}. " + rng.choice(CLAUSES).format(day=rng.randint(1, 28), amount=rng.randint(1, 99) * 1000)
+        for position in range(paragraphs)
+    )
+    return f"SUPPLY AGREEMENT\n\n{body}\n\nIN WITNESS WHEREOF\n\nSignature: __________\n".encode("utf-8")
+
+
+def build_service() -> AnalysisService:
+    document_service = DocumentService()
+    rule_packs = RulePackRegistry.load(RULES_DIR)
+    engine = VerificationEngine(
+        DEFAULT_CHECKS,
+        build_artifact_providers(document_service, rule_packs),
+        functools.partial(compose_verification_result, risk_model=RiskModel.load())
+    )
+    return AnalysisService(document_service, None, None, None, engine, rule_packs=rule_packs)
+
+
+def add_documents(service: AnalysisService, rng: random.Random) -> list:
+    file_ids = []
+    for position in range(DOCUMENTS):
+        content = make_contract(rng)
+        file_id = str(uuid.uuid4())
+        service.document_service.files[file_id] = {
+            "filename": f"contract{position}.txt",
+            "content_type": "text/plain",
+            "size": len(content),
+            "content": content
+        }
+        file_ids.append(file_id)
+    return file_ids
+
+
+async def run_batch(service: AnalysisService, file_ids: list, concurrency: int) -> float:
+    started = time.perf_counter()
+    async for record in BatchVerifier(service, concurrency).run(file_ids, "contract"):
+        if not record.get("summary") and record["status"] != "completed":
+            raise RuntimeError(record["error"])
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    rng = random.Random(11)
+    service = build_service()
+    cpus = os.cpu_count() or 1
+    print(f"{DOCUMENTS} documents, {cpus} CPU(s)")
+    print(f"{'concurrency':>12} {'seconds':>8} {'docs/s':>8}")
+    for concurrency in (1, 2 * cpus, 8 * cpus):
+        # Fresh documents each round: extraction and indexing are part of the cost
+        file_ids = add_documents(service, rng)
+        elapsed = asyncio.run(run_batch(service, file_ids, concurrency))
+        print(f"{concurrency:>12} {elapsed:>8.2f} {DOCUMENTS / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark for the shared chunk store.
+
+Builds a corpus of contracts that share most of their paragraphs
+(boilerplate) and differ in the rest, then indexes every document and
+evaluates the contract rule pack on it, once without a chunk store and
+once with one. Reports the time per document and how much text the
+store actually holds.
+
+Run from the backend directory:
+    python benchmarks/chunk_store_benchmark.py
+"""
+
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from services.chunk_store import ChunkStore
+from services.document_service import ChunkIndex
+from services.rule_packs import RulePackRegistry
+
+DOCUMENTS = 200
+PARAGRAPHS = 300
+BOILERPLATE_SHARE = 0.8
+
+VOCABULARY = (
+    "the party parties agreement shall may not pay payment within days notice terminate termination "
+    "confidential information governed laws state court arbitration lessee lessor premises rent term"
+).split()
+
+
+def make_paragraph(rng: random.Random) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(40, 120))) + "."
+
+
+def make_corpus(rng: random.Random) -> list:
+    boilerplate = [make_paragraph(rng) for _ in range(PARAGRAPHS)]
+    documents = []
+    for number in range(DOCUMENTS):
+        paragraphs = [
+            paragraph if rng.random() < BOILERPLATE_SHARE else make_paragraph(rng)
+            for paragraph in boilerplate
+        ]
+        paragraphs[0] = f"Agreement {number} between the parties."
+        documents.append("\n\n".join(paragraphs))
+    return documents
+
+
+def median_ms(function, repeats: int = 3) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main() -> None:
+    documents = make_corpus(random.Random(5))
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=2000, chunk_overlap=200, length_function=len, separators=["\n\n", "\n", " ", ""]
+    )
+    chunked = [splitter.split_text(text) for text in documents]
+    pack = RulePackRegistry.load(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules")).get("contract")
+
+    def run(store) -> None:
+        for text, chunks in zip(documents, chunked):
+            if store is not None:
+                chunks = [store.intern(chunk) for chunk in chunks]
+            ChunkIndex(chunks, store)
+            pack.evaluate(text, store)
+
+    total_characters = sum(len(text) for text in documents)
+    print(f"{DOCUMENTS} documents of {PARAGRAPHS} paragraphs, {BOILERPLATE_SHARE:.0%} boilerplate")
+    print(f"{'':>14} {'ms/document':>12} {'stored chars':>13}")
+    plain_ms = median_ms(lambda: run(None))
+    print(f"{'no store':>14} {plain_ms / DOCUMENTS:>12.2f} {total_characters:>13}")
+
+    store = ChunkStore()
+    started = time.perf_counter()
+    run(store)
+    cold_ms = (time.perf_counter() - started) * 1000
+    warm_ms = median_ms(lambda: run(store))
+    stats = store.stats()
+    print(f"{'store, cold':>14} {cold_ms / DOCUMENTS:>12.2f} {stats['characters']:>13}")
+    print(f"{'store, warm':>14} {warm_ms / DOCUMENTS:>12.2f} {stats['characters']:>13}")
+    print("\nartifact hit rates: " + ", ".join(
+        f"{kind} {totals['hit_rate']:.0%}" for kind, totals in stats["artifacts"].items()
+    ))
+
+
+if __name__ == "__main__":
+    main()
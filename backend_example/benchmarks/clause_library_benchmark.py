@@ -0,0 +1,83 @@
+"""
+Benchmark for missing-clause detection against the clause library.
+
+Builds contracts of increasing length from clause-like paragraphs and
+times the comparison of every paragraph window with every exemplar of
+the contract rule pack: cold (every paragraph tokenized), warm (paragraph
+features from the chunk store) and the matrix product on its own.
+
+Run from the backend directory:
+    python benchmarks/clause_library_benchmark.py
+"""
+
+import os
+import sys
+import random
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.chunk_store import ChunkStore
+from services.rule_packs import PARAGRAPH_BREAK, RulePackRegistry
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules")
+
+VOCABULARY = (
+    "the party parties agreement shall may not pay payment within days notice terminate termination "
+    "confidential information governed laws state court arbitration services supplier customer "
+    "deliver delivery goods warranty liability indemnify insurance records audit subcontract"
+).split()
+
+# About 450 words per page
+PARAGRAPHS_PER_PAGE = 5
+
+
+def make_contract(pages: int, rng: random.Random) -> str:
+    return "\n\n".join(
+        " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(60, 120))) + "."
+        for _ in range(pages * PARAGRAPHS_PER_PAGE)
+    )
+
+
+def split_paragraphs(text: str) -> tuple:
+    lowered = text.lower()
+    paragraphs, starts, start = [], [], 0
+    for separator in [*PARAGRAPH_BREAK.finditer(lowered), None]:
+        end = separator.start() if separator is not None else len(lowered)
+        paragraphs.append(lowered[start:end])
+        starts.append(start)
+        if separator is not None:
+            start = separator.end()
+    return paragraphs, starts
+
+
+def median_ms(function, repeats: int = 7) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main() -> None:
+    library = RulePackRegistry.load(RULES_DIR).get("contract").library
+    rng = random.Random(3)
+    print(f"{len(library.clause_ids)} clauses, {len(library.vectors)} exemplars, {len(library.features)} features")
+    print(f"{'pages':>6} {'windows':>8} {'cold ms':>8} {'warm ms':>8} {'matmul ms':>10}")
+    for pages in (10, 100, 300):
+        paragraphs, starts = split_paragraphs(make_contract(pages, rng))
+        store = ChunkStore()
+        library.match(paragraphs, starts, store)
+        cold_ms = median_ms(lambda: library.match(paragraphs, starts))
+        warm_ms = median_ms(lambda: library.match(paragraphs, starts, store))
+        windows = len(paragraphs)
+        matrix = np.random.default_rng(0).random((windows, library.vectors.shape[1]), dtype=np.float32)
+        matmul_ms = median_ms(lambda: matrix @ library.vectors.T)
+        print(f"{pages:>6} {windows:>8} {cold_ms:>8.1f} {warm_ms:>8.1f} {matmul_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
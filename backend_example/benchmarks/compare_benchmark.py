@@ -0,0 +1,86 @@
+"""
+Latency benchmark for POST /compare.
+
+Builds a synthetic contract of a given number of pages and a revision with
+edited, inserted and deleted clauses scattered through it, then times
+DocumentComparer against a plain word-level difflib diff of the same texts.
+
+Run from the backend directory:
+    python benchmarks/compare_benchmark.py
+"""
+
+import os
+import sys
+import random
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.document_comparer import DocumentComparer
+
+VOCABULARY = (
+    "the party parties agreement shall may not pay payment within days notice terminate termination "
+    "confidential information governed laws state court arbitration lessee lessor premises rent term "
+    "obligation breach remedy damages liability indemnify warrant represent consent assign successor"
+).split()
+
+# Clauses per page and words per clause of the synthetic contract
+CLAUSES_PER_PAGE = 6
+WORDS_PER_CLAUSE = 70
+
+
+def make_contract(pages: int, rng: random.Random) -> list:
+    return [
+        f"{number + 1}. " + " ".join(rng.choice(VOCABULARY) for _ in range(WORDS_PER_CLAUSE)) + "."
+        for number in range(pages * CLAUSES_PER_PAGE)
+    ]
+
+
+def revise(clauses: list, edits: int, rng: random.Random) -> list:
+    revised = list(clauses)
+    for _ in range(edits):
+        position = rng.randrange(len(revised))
+        action = rng.choice(("edit", "insert", "delete"))
+        if action == "edit":
+            words = revised[position].split()
+            words[rng.randrange(1, len(words))] = rng.choice(VOCABULARY).upper()
+            revised[position] = " ".join(words)
+        elif action == "insert":
+            revised.insert(position, "Inserted clause: " + " ".join(rng.choice(VOCABULARY) for _ in range(30)) + ".")
+        else:
+            del revised[position]
+    return revised
+
+
+def median_ms(function, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main() -> None:
+    comparer = DocumentComparer()
+    print(f"{'pages':>6} {'words':>8} {'edits':>6} {'compare ms':>11} {'difflib ms':>11} {'changes':>8}")
+    for pages, edits in ((10, 5), (30, 10), (100, 20), (300, 40), (300, 200)):
+        rng = random.Random(pages + edits)
+        base = make_contract(pages, rng)
+        base_text, other_text = "\n\n".join(base), "\n\n".join(revise(base, edits, rng))
+        result = comparer.compare(base_text, other_text)
+        compare_ms = median_ms(lambda: comparer.compare(base_text, other_text), repeats=5)
+        # The naive word diff is quadratic in places; only time it while it stays reasonable
+        if pages <= 100:
+            difflib_ms = f"{median_ms(lambda: SequenceMatcher(None, base_text.split(), other_text.split(), autojunk=False).get_opcodes(), repeats=1):>11.1f}"
+        else:
+            difflib_ms = f"{'skipped':>11}"
+        summary = result["summary"]
+        changes = summary["added"] + summary["removed"] + summary["changed"]
+        print(f"{pages:>6} {len(base_text.split()):>8} {edits:>6} {compare_ms:>11.1f} {difflib_ms} {changes:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Latency benchmark for the local extractive summarizer.
+
+Run from the backend directory:
+    python benchmarks/extractive_summarizer_benchmark.py
+"""
+
+import os
+import sys
+import random
+import statistics
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.extractive_summarizer import ExtractiveSummarizer
+
+CLAUSES = [
+    "The Supplier shall deliver the Goods to the Buyer within thirty (30) days of the Purchase Order.",
+    "The Buyer shall pay each invoice within forty-five (45) days of receipt by bank transfer.",
+    "Either party may terminate this Agreement upon ninety (90) days written notice to the other party.",
+    "Each party shall keep confidential all information disclosed to it under this Agreement.",
+    "All intellectual property rights in the Deliverables shall vest in the Buyer upon payment.",
+    "Neither party shall be liable for any failure to perform caused by events beyond its reasonable control.",
+    "This Agreement shall be governed by and construed in accordance with the laws of England and Wales.",
+    "Any dispute arising out of this Agreement shall be referred to arbitration in London.",
+    "The Supplier warrants that the Goods will be free from material defects for twelve (12) months.",
+    "The liability of either party shall not exceed the total fees paid in the preceding twelve months.",
+]
+
+# Roughly 40 sentences of contract text per page
+SENTENCES_PER_PAGE = 40
+
+
+def make_document(pages: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    paragraphs = []
+    for page in range(pages):
+        sentences = [
+            rng.choice(CLAUSES).replace("Agreement", f"Agreement (Schedule {rng.randint(1, 50)})")
+            for _ in range(SENTENCES_PER_PAGE)
+        ]
+        paragraphs.append(f"{page + 1}. " + " ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def main() -> None:
+    summarizer = ExtractiveSummarizer()
+    print(f"{'pages':>6} {'sentences':>10} {'median ms':>10} {'p95 ms':>8}")
+    for pages in (1, 10, 50, 100, 300):
+        text = make_document(pages)
+        sentence_count = len(summarizer.split_sentences(text))
+        runs = 20 if pages <= 50 else 5
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            summarizer.summarize(text)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{pages:>6} {sentence_count:>10} {statistics.median(timings):>10.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark for the MinHash/LSH near-duplicate index.
+
+Times the signature of documents of increasing length, then fills an
+index with growing numbers of documents and times a lookup, which should
+stay flat as the corpus grows.
+
+Run from the backend directory:
+    python benchmarks/near_duplicate_benchmark.py
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.near_duplicates import NearDuplicateIndex, minhash_signature
+
+VOCABULARY = (
+    "the party parties agreement shall may not pay payment within days notice terminate termination "
+    "confidential information governed laws state court arbitration lessee lessor premises rent term"
+).split()
+
+
+def make_text(words: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def median_ms(function, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main() -> None:
+    rng = random.Random(11)
+    print(f"{'pages':>6} {'signature ms':>13}")
+    for pages in (1, 30, 300):
+        text = make_text(pages * 400, rng)
+        print(f"{pages:>6} {median_ms(lambda: minhash_signature(text)):>13.1f}")
+
+    print(f"\n{'documents':>10} {'lookup ms':>10} {'found':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        index = NearDuplicateIndex(os.path.join(directory, "near_duplicates.db"))
+        original = make_text(4000, rng)
+        index.add("original", minhash_signature(original), "original.txt", "2024-01-01")
+        # A near-duplicate: a few words changed
+        words = original.split()
+        for position in rng.sample(range(len(words)), 20):
+            words[position] = "amended"
+        query = minhash_signature(" ".join(words))
+
+        stored = 1
+        for target in (1_000, 10_000, 50_000):
+            while stored < target:
+                # Random signatures stand in for unrelated documents
+                signature = minhash_signature(make_text(60, rng))
+                index.add(f"document-{stored}", signature, "unrelated.txt", "2024-01-01")
+                stored += 1
+            found = index.query(query)
+            print(f"{stored:>10} {median_ms(lambda: index.query(query)):>10.2f} {len(found):>6}")
+
+
+if __name__ == "__main__":
+    main()
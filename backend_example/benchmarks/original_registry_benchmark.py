@@ -0,0 +1,68 @@
+"""
+Scale benchmark for the registry of known originals.
+
+Registers synthetic 100-page originals until the registry holds up to a
+million pages, reporting the on-disk size per page and the time to match
+an unmodified and a modified copy of one of them.
+
+Run from the backend directory:
+    python benchmarks/original_registry_benchmark.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.original_registry import OriginalRegistry
+
+PAGES_PER_ORIGINAL = 100
+
+
+def make_pages(original: int) -> list:
+    return [
+        f"Original {original}, page {page + 1}.\n\nThe parties agree to clause {original}-{page} as issued."
+        for page in range(PAGES_PER_ORIGINAL)
+    ]
+
+
+def median_ms(function, repeats: int = 9) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main() -> None:
+    print(f"{'pages':>10} {'bytes/page':>11} {'exact ms':>9} {'modified ms':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "originals.db")
+        registry = OriginalRegistry(path)
+        registered = 0
+        for target in (10_000, 100_000, 1_000_000):
+            while registered * PAGES_PER_ORIGINAL < target:
+                registry.register(f"original-{registered}", f"Original {registered}", f"hash-{registered}",
+                                  make_pages(registered))
+                registered += 1
+            registry._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+            probe = registered // 2
+            copy = make_pages(probe)
+            modified = list(copy)
+            modified[41] = modified[41].replace("as issued", "as amended")
+            exact_ms = median_ms(lambda: registry.match(f"hash-{probe}", copy))
+            modified_ms = median_ms(lambda: registry.match("unknown", modified))
+            match = registry.match("unknown", modified)
+            assert match["originalId"] == f"original-{probe}" and match["differingPages"][0]["page"] == 42
+
+            pages = registered * PAGES_PER_ORIGINAL
+            print(f"{pages:>10} {os.path.getsize(path) / pages:>11.1f} {exact_ms:>9.2f} {modified_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Latency benchmark for the PDF tamper-forensics scan.
+
+Builds synthetic PDFs of increasing size (page content plus incompressible
+image data), optionally with an incremental update that replaces a page,
+and times analyze_pdf over a memory-mapped file.
+
+Run from the backend directory:
+    python benchmarks/pdf_forensics_benchmark.py
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.pdf_forensics import analyze_pdf
+
+XMP_TEMPLATE = (
+    '<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+    '<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+    '<rdf:Description rdf:about="" xmlns:xmp="http://ns.adobe.com/xap/1.0/" xmlns:pdf="http://ns.adobe.com/pdf/1.3/">'
+    '<xmp:CreateDate>2024-03-04T10:00:00Z</xmp:CreateDate>'
+    '<xmp:ModifyDate>2024-03-04T10:00:00Z</xmp:ModifyDate>'
+    '<pdf:Producer>Benchmark Writer 1.0</pdf:Producer>'
+    '</rdf:Description></rdf:RDF></x:xmpmeta><?xpacket end="r"?>'
+)
+
+
+class PdfWriter:
+    """Just enough of a PDF writer to produce valid files with incremental updates."""
+
+    def __init__(self):
+        self.parts = [b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"]
+        self.offsets = {}
+
+    def size(self) -> int:
+        return sum(len(part) for part in self.parts)
+
+    def add(self, number: int, body: bytes, stream: bytes = None) -> None:
+        self.offsets[number] = self.size()
+        data = f"{number} 0 obj\n".encode() + body
+        if stream is not None:
+            data += b"\nstream\n" + stream + b"\nendstream"
+        self.parts.append(data + b"\nendobj\n")
+
+    def finish(self, root: int, info: int, previous: int = None) -> int:
+        xref_offset = self.size()
+        numbers = sorted(self.offsets)
+        lines = [b"xref\n"]
+        # One subsection per run of consecutive object numbers
+        runs = []
+        for number in numbers:
+            if runs and runs[-1][-1] == number - 1:
+                runs[-1].append(number)
+            else:
+                runs.append([number])
+        for run in runs:
+            lines.append(f"{run[0]} {len(run)}\n".encode())
+            lines.extend(f"{self.offsets[number]:010d} 00000 n \n".encode() for number in run)
+        trailer = f"/Size {max(numbers) + 1} /Root {root} 0 R /Info {info} 0 R"
+        if previous is not None:
+            trailer += f" /Prev {previous}"
+        lines.append(f"trailer\n<< {trailer} >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        self.parts.extend(lines)
+        self.offsets = {}
+        return xref_offset
+
+    def bytes(self) -> bytes:
+        return b"".join(self.parts)
+
+
+def make_pdf(pages: int, padding: int = 0, update: bool = False, seed: int = 7) -> bytes:
+    """A PDF with `pages` pages, `padding` bytes of image data and optionally one incremental update."""
+    rng = random.Random(seed)
+    writer = PdfWriter()
+    first_page = 10
+    writer.add(1, b"<< /Type /Catalog /Pages 2 0 R /Metadata 5 0 R >>")
+    kids = " ".join(f"{first_page + 2 * page} 0 R" for page in range(pages))
+    writer.add(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    writer.add(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /ABCDEF+Helvetica /FontDescriptor 6 0 R >>")
+    writer.add(4, (
+        b"<< /Producer (Benchmark Writer 1.0) /CreationDate (D:20240304100000Z)"
+        b" /ModDate (D:20240304100000Z) /Title (Benchmark) >>"
+    ))
+    xmp = XMP_TEMPLATE.encode()
+    writer.add(5, f"<< /Type /Metadata /Subtype /XML /Length {len(xmp)} >>".encode(), xmp)
+    writer.add(6, b"<< /Type /FontDescriptor /FontName /ABCDEF+Helvetica /FontFile2 7 0 R >>")
+    writer.add(7, b"<< /Length 4 >>", b"font")
+    image_size = padding // max(1, pages)
+    for page in range(pages):
+        number = first_page + 2 * page
+        content = f"BT /F1 12 Tf 72 720 Td (Page {page + 1} of the agreement) Tj ET".encode()
+        resources = "/Font << /F1 3 0 R >>"
+        if image_size:
+            image_number = first_page + 2 * pages + page
+            resources += f" /XObject << /Im1 {image_number} 0 R >>"
+            image = rng.randbytes(image_size)
+            writer.add(image_number, f"<< /Type /XObject /Subtype /Image /Length {len(image)} >>".encode(), image)
+        writer.add(number, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+            f" /Resources << {resources} >> /Contents {number + 1} 0 R >>"
+        ).encode())
+        writer.add(number + 1, f"<< /Length {len(content)} >>".encode(), content)
+    previous = writer.finish(root=1, info=4)
+
+    if update:
+        # Replace the first page's text with a new font and touch the Info dictionary
+        content = b"BT /F2 12 Tf 72 720 Td (Amended page) Tj ET"
+        writer.add(8, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
+        writer.add(first_page, (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+            b" /Resources << /Font << /F1 3 0 R /F2 8 0 R >> >> /Contents 9 0 R >>"
+        ))
+        writer.add(9, f"<< /Length {len(content)} >>".encode(), content)
+        writer.add(4, (
+            b"<< /Producer (Other Editor 2.0) /CreationDate (D:20240304100000Z)"
+            b" /ModDate (D:20240610090000Z) /Title (Benchmark) >>"
+        ))
+        writer.finish(root=1, info=4, previous=previous)
+    return writer.bytes()
+
+
+def main() -> None:
+    print(f"{'pages':>6} {'size MB':>8} {'update':>7} {'median ms':>10} {'risk':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for pages, padding, update in ((10, 0, False), (100, 1_000_000, False), (300, 10_000_000, False),
+                                       (300, 10_000_000, True), (1000, 10_000_000, True)):
+            path = os.path.join(directory, "benchmark.pdf")
+            with open(path, "wb") as pdf_file:
+                pdf_file.write(make_pdf(pages, padding, update))
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                result = analyze_pdf(path)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            size = os.path.getsize(path) / 1_000_000
+            print(f"{pages:>6} {size:>8.1f} {str(update):>7} {timings[len(timings) // 2]:>10.1f} "
+                  f"{result['alterabilityRisk']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Latency benchmark for the upload-time PDF structure scan.
+
+Times pdf_metadata (startxref, xref sections, page count, Info dictionary)
+against reading the same facts with PyPDF2, on the synthetic PDFs from the
+forensics benchmark.
+
+Run from the backend directory:
+    python benchmarks/pdf_scanner_benchmark.py
+"""
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyPDF2 import PdfReader
+
+from benchmarks.pdf_forensics_benchmark import make_pdf
+from services.pdf_scanner import pdf_metadata
+
+
+def median_ms(function, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def read_with_pypdf2(data: bytes) -> dict:
+    reader = PdfReader(io.BytesIO(data))
+    return {"pageCount": len(reader.pages), "info": dict(reader.metadata or {})}
+
+
+def main() -> None:
+    print(f"{'pages':>6} {'size MB':>8} {'update':>7} {'scanner ms':>11} {'PyPDF2 ms':>10} {'pages ok':>9}")
+    for pages, padding, update in ((10, 0, False), (100, 1_000_000, False), (300, 10_000_000, True),
+                                   (1000, 10_000_000, True)):
+        data = make_pdf(pages, padding, update)
+        scanned = pdf_metadata(data)
+        scanner = median_ms(lambda: pdf_metadata(data))
+        pypdf2 = median_ms(lambda: read_with_pypdf2(data))
+        pages_ok = scanned["pageCount"] == read_with_pypdf2(data)["pageCount"]
+        print(f"{pages:>6} {len(data) / 1_000_000:>8.1f} {str(update):>7} {scanner:>11.1f} {pypdf2:>10.1f} "
+              f"{str(pages_ok):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark for the NDJSON result export.
+
+Fills a result cache with one million synthetic verification results,
+then streams exports of increasing size through the same generators as
+GET /export/results, plain and gzip-compressed. The peak of Python
+allocations during each export (tracemalloc) stays flat as the number of
+rows grows: only one page of rows and one output block are held at once.
+
+Run from the backend directory:
+    python benchmarks/result_export_benchmark.py
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.result_cache import ResultCache
+from services.result_export import encode_blocks, export_lines
+
+ROWS = 1_000_000
+
+
+def fill(cache: ResultCache) -> None:
+    started = datetime(2024, 1, 1)
+    result = json.dumps({
+        "isValid": True,
+        "riskLevel": "Low",
+        "confidence": 91,
+        "authenticityScore": 97,
+        "issues": ["Missing required element: Dispute resolution"],
+        "legalCompliance": {"complianceScore": 88, "missingElements": ["dispute_resolution"]}
+    })
+
+    def rows():
+        for position in range(ROWS):
+            yield (
+                hashlib.sha256(str(position).encode()).hexdigest(), "verify", "contract", "9",
+                result, (started + timedelta(seconds=position)).isoformat()
+            )
+
+    cache._conn.execute("BEGIN")
+    cache._conn.executemany("INSERT INTO analysis_results VALUES (?, ?, ?, ?, ?, ?)", rows())
+    cache._conn.execute("COMMIT")
+
+
+def export(cache: ResultCache, limit: int, gzip: bool) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = 0
+    for block in encode_blocks(export_lines(cache, ["verify"], limit=limit), gzip=gzip):
+        size += len(block)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResultCache(os.path.join(directory, "results.db"))
+        started = time.perf_counter()
+        fill(cache)
+        print(f"Stored {ROWS} results in {time.perf_counter() - started:.1f} s")
+        print(f"{'rows':>9} {'gzip':>5} {'seconds':>8} {'rows/s':>9} {'output MB':>10} {'peak MB':>8}")
+        for limit, gzip in ((10_000, False), (100_000, False), (ROWS, False), (ROWS, True)):
+            elapsed, size, peak = export(cache, limit, gzip)
+            print(
+                f"{limit:>9} {'yes' if gzip else 'no':>5} {elapsed:>8.1f} {limit / elapsed:>9.0f}"
+                f" {size / 1e6:>10.1f} {peak / 1e6:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
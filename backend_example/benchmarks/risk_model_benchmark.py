@@ -0,0 +1,75 @@
+"""
+Benchmark for batched risk scoring.
+
+Scores synthetic verification features with the shipped risk model, one
+document per call and all documents in one batch, and times training a
+model on them.
+
+Run from the backend directory:
+    python benchmarks/risk_model_benchmark.py
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.risk_model import FEATURES, RiskModel
+
+
+def make_features(count: int, rng: np.random.Generator) -> list:
+    rows = []
+    for _ in range(count):
+        row = {name: float(rng.random() < 0.15) for name in FEATURES if name.endswith("_failed")}
+        row.update({
+            "incomplete_checks": float(rng.random() < 0.05) / 7,
+            "incremental_updates": float(np.log1p(rng.poisson(0.3))),
+            "garbled_ratio": float(rng.random() * 0.05),
+            "compliance_gap": float(rng.random() * 0.5),
+            "missing_elements": float(np.log1p(rng.poisson(0.8))),
+            "weakest_clause_score": float(rng.random() * 0.5),
+            "near_duplicate_similarity": float(rng.random() < 0.1) * 0.9,
+            "signature_blocks": float(np.log1p(rng.poisson(2))),
+            "witness_or_notary": float(rng.random() < 0.4)
+        })
+        rows.append(row)
+    return rows
+
+
+def median_ms(function, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main() -> None:
+    model = RiskModel.load()
+    rng = np.random.default_rng(0)
+    print(f"{'documents':>10} {'one by one ms':>14} {'batch ms':>9} {'per doc us':>11}")
+    for count in (1, 100, 10000):
+        rows = make_features(count, rng)
+        single_ms = median_ms(lambda: [model.score([row]) for row in rows])
+        batch_ms = median_ms(lambda: model.score(rows))
+        print(f"{count:>10} {single_ms:>14.2f} {batch_ms:>9.2f} {1000 * batch_ms / count:>11.1f}")
+
+    # Retrain on the shipped model's own labels
+    rows = make_features(10000, rng)
+    features = RiskModel.matrix(rows)
+    predicted = model.predict(features)
+    authentic = predicted["authenticity"] >= 0.7
+    levels = predicted["risk"].argmax(axis=1)
+    started = time.perf_counter()
+    trained = RiskModel.fit(features, authentic, levels)
+    fit_ms = (time.perf_counter() - started) * 1000
+    agreement = (trained.predict(features)["risk"].argmax(axis=1) == levels).mean()
+    print(f"fit on {len(rows)} documents: {fit_ms:.0f} ms, risk level agreement {100 * agreement:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
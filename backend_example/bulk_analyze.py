@@ -0,0 +1,372 @@
+"""
+Offline bulk analysis of a directory tree of documents, without the HTTP API.
+
+Runs the same analyses as /verify, /analyze-alterability and /summarize,
+built from the same services as main.py, in a pool of worker processes
+(one document per process at a time). Results go
+to the shared result cache, so the API serves them afterwards without
+recomputing, and optionally to an NDJSON file, one line per document.
+Workers run at a lower scheduling priority so a nightly run does not
+slow down the interactive API on the same machine.
+
+Run from the backend directory:
+    python -m bulk_analyze /archive/contracts --analyses verify --output results.ndjson
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set, TextIO
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import functools
+import logging
+import argparse
+import tempfile
+import mimetypes
+from datetime import datetime
+from dotenv import load_dotenv
+from services.analysis_service import ANALYSIS_KINDS, SUMMARY_MODES, AnalysisService
+from services.chunk_store import ChunkStore
+from services.document_service import DocumentService
+from services.extractive_summarizer import ExtractiveSummarizer
+from services.near_duplicates import NearDuplicateIndex
+from services.original_registry import OriginalRegistry
+from services.result_cache import ResultCache
+from services.risk_model import RiskModel
+from services.rule_packs import RulePackRegistry
+from services.verification_checks import DEFAULT_CHECKS, build_artifact_providers, compose_verification_result
+from services.verification_engine import VerificationEngine
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# Documents queued per worker process; enough to keep every worker busy
+# without holding the whole tree's futures at once
+IN_FLIGHT_PER_WORKER = 2
+
+# The analysis service of this worker process, built once by _init_worker
+_service: Optional[AnalysisService] = None
+_near_duplicates: Optional[NearDuplicateIndex] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def build_analysis_service(
+    kinds: List[str],
+    mode: str,
+    data_dir: str,
+    rules_dir: str,
+    store: Optional[str],
+    near_duplicates: Optional[NearDuplicateIndex]
+) -> AnalysisService:
+    """The analysis service of main.py, for one process and without a file store."""
+    chunk_store = ChunkStore()
+    document_service = DocumentService(chunk_store=chunk_store)
+    result_cache = ResultCache(store) if store else None
+    rule_packs = RulePackRegistry.load(rules_dir)
+    risk_model = RiskModel.load()
+
+    openai_service = None
+    summarization_service = None
+    if "summarize" in kinds and mode != "extractive":
+        from services.openai_service import OpenAIService
+        from services.summarization_service import SummarizationService
+        openai_service = OpenAIService()
+        summarization_service = SummarizationService(openai_service, result_cache, chunk_store)
+
+    verification_engine = VerificationEngine(
+        DEFAULT_CHECKS,
+        build_artifact_providers(document_service, rule_packs),
+        functools.partial(compose_verification_result, risk_model=risk_model)
+    )
+    return AnalysisService(
+        document_service,
+        openai_service,
+        summarization_service,
+        ExtractiveSummarizer(),
+        verification_engine,
+        result_cache,
+        rule_packs,
+        OriginalRegistry(os.path.join(data_dir, "originals.db")),
+        risk_model,
+        near_duplicates
+    )
+
+
+def _init_worker(niceness: int, log_level: int, service_args: tuple) -> None:
+    global _service, _near_duplicates, _loop
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    *args, near_duplicates = service_args
+    _near_duplicates = NearDuplicateIndex(near_duplicates) if near_duplicates else None
+    _service = build_analysis_service(*args, _near_duplicates)
+    # One loop for the worker's lifetime: the async OpenAI client is bound to it
+    _loop = asyncio.new_event_loop()
+
+
+def _analyze_file(path: str, root: str, kinds: List[str], document_type: str, mode: str) -> dict:
+    """Run every requested analysis of one file in this worker process."""
+    file_id = os.path.relpath(path, root)
+    record = {"path": file_id}
+    started = time.perf_counter()
+    try:
+        with open(path, "rb") as handle:
+            content = handle.read()
+    except OSError as e:
+        record.update(status="failed", error=str(e), duration_ms=0.0)
+        return record
+
+    document_service = _service.document_service
+    filename = os.path.basename(path)
+    document_service.files[file_id] = {
+        "filename": filename,
+        "content_type": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "size": len(content),
+        # Near-duplicate matches only look at files modified earlier
+        "uploaded_at": datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+        "content_hash": hashlib.sha256(content).hexdigest(),
+        "pdf": document_service.scan_pdf(content),
+        "content": content
+    }
+    record["content_hash"] = document_service.files[file_id]["content_hash"]
+
+    results: Dict[str, dict] = {}
+    errors: Dict[str, str] = {}
+
+    if _near_duplicates is not None and "verify" in kinds:
+        # Verification only reads the index, the way upload does it in main.py
+        try:
+            _near_duplicates.index_document(
+                file_id, document_service.get_context(file_id).text, filename,
+                document_service.files[file_id]["uploaded_at"]
+            )
+        except Exception as e:
+            logger.warning(f"Indexing {file_id} failed: {str(e)}")
+
+    async def run_all() -> None:
+        for kind in kinds:
+            try:
+                results[kind] = await _service.run(kind, file_id, document_type=document_type, mode=mode)
+            except Exception as e:
+                logger.error(f"{kind} of {file_id} failed: {str(e)}")
+                errors[kind] = str(e)
+
+    try:
+        _loop.run_until_complete(run_all())
+    finally:
+        document_service.forget(file_id)
+        del document_service.files[file_id]
+
+    record["status"] = "failed" if errors else "completed"
+    record["results"] = results
+    if errors:
+        record["errors"] = errors
+    record["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return record
+
+
+def find_documents(root: str, extensions: List[str]) -> Iterator[str]:
+    """Paths of documents under root in a stable order, skipping hidden files and directories."""
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories if not name.startswith("."))
+        for filename in sorted(filenames):
+            if not filename.startswith(".") and filename.lower().endswith(tuple(extensions)):
+                yield os.path.join(directory, filename)
+
+
+class Progress:
+    """A status line on stderr: redrawn in place on a terminal, printed every few seconds otherwise."""
+
+    def __init__(self, total: int, stream: TextIO = sys.stderr, enabled: bool = True):
+        self.total = total
+        self.stream = stream
+        self.enabled = enabled
+        self.interactive = stream.isatty()
+        self.started = time.perf_counter()
+        self._shown = 0.0
+
+    def update(self, done: int, failed: int, force: bool = False) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if not force and now - self._shown < (0.2 if self.interactive else 10.0):
+            return
+        self._shown = now
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - done) / rate if rate > 0 else 0.0
+        line = (
+            f"{done}/{self.total} documents, {failed} failed, {rate:.1f} docs/s,"
+            f" {elapsed:.0f}s elapsed, ~{remaining:.0f}s left"
+        )
+        if self.interactive:
+            self.stream.write(f"\r{line}\033[K" + ("\n" if force else ""))
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+def analyze_tree(
+    root: str,
+    kinds: List[str],
+    document_type: str = "contract",
+    mode: str = "auto",
+    workers: Optional[int] = None,
+    output: Optional[TextIO] = None,
+    extensions: List[str] = DEFAULT_EXTENSIONS,
+    service_args: tuple = (),
+    niceness: int = 10,
+    progress: bool = True
+) -> dict:
+    """Analyze every document under root in a process pool; returns the run's summary."""
+    paths = list(find_documents(root, extensions))
+    workers = workers or os.cpu_count() or 1
+    display = Progress(len(paths), enabled=progress)
+    done = failed = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(niceness, logging.getLogger().level, service_args)
+    ) as pool:
+        pending = iter(paths)
+        running: Set[Future] = set()
+        try:
+            while True:
+                for path in pending:
+                    running.add(pool.submit(_analyze_file, path, root, kinds, document_type, mode))
+                    if len(running) >= workers * IN_FLIGHT_PER_WORKER:
+                        break
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    done += 1
+                    if record["status"] == "failed":
+                        failed += 1
+                    if output is not None:
+                        output.write(json.dumps(record) + "\n")
+                display.update(done, failed)
+        except BaseException:
+            # Interrupted: don't start the documents still queued
+            for future in running:
+                future.cancel()
+            raise
+        finally:
+            display.update(done, failed, force=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "documents": len(paths),
+        "completed": done - failed,
+        "failed": failed,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+        "documentsPerSecond": round(done / elapsed, 2) if elapsed > 0 else None
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m bulk_analyze",
+        description="Analyze a directory tree of documents with the API's engines, without going through HTTP."
+    )
+    parser.add_argument("root", help="Directory to analyze, recursively")
+    parser.add_argument(
+        "--analyses", default="verify",
+        help=f"Comma-separated analyses to run: {', '.join(ANALYSIS_KINDS)} (default: verify)"
+    )
+    parser.add_argument("--document-type", default="contract", help="Document type for verification (default: contract)")
+    parser.add_argument("--mode", default="auto", choices=SUMMARY_MODES, help="Summary mode (default: auto)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--output", help="Write one NDJSON line per document to this file, or - for stdout")
+    parser.add_argument("--store", help="Result cache to read and write (default: DATA_DIR/results.db)")
+    parser.add_argument("--no-store", action="store_true", help="Don't read or write the result cache")
+    parser.add_argument(
+        "--near-duplicates",
+        help="Near-duplicate index to check against and add to (default: a new index for this run only)"
+    )
+    parser.add_argument(
+        "--extensions", default=",".join(DEFAULT_EXTENSIONS),
+        help=f"Comma-separated file extensions to analyze (default: {','.join(DEFAULT_EXTENSIONS)})"
+    )
+    parser.add_argument("--nice", type=int, default=10, help="Added to the workers' scheduling niceness (default: 10)")
+    parser.add_argument("--quiet", action="store_true", help="No progress display")
+    parser.add_argument("--verbose", action="store_true", help="Log every analysis step")
+    args = parser.parse_args(argv)
+
+    args.analyses = [kind.strip() for kind in args.analyses.split(",") if kind.strip()]
+    unknown = [kind for kind in args.analyses if kind not in ANALYSIS_KINDS]
+    if unknown or not args.analyses:
+        parser.error(f"--analyses must be a comma-separated list of: {', '.join(ANALYSIS_KINDS)}")
+    if not os.path.isdir(args.root):
+        parser.error(f"{args.root} is not a directory")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    args.extensions = [
+        extension if extension.startswith(".") else f".{extension}"
+        for extension in (item.strip().lower() for item in args.extensions.split(",")) if extension
+    ]
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    load_dotenv()
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    data_dir = os.getenv("DATA_DIR", "data")
+    os.makedirs(data_dir, exist_ok=True)
+    rules_dir = os.getenv("RULES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules"))
+    store = None if args.no_store else (args.store or os.path.join(data_dir, "results.db"))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        near_duplicates = args.near_duplicates or os.path.join(scratch, "near_duplicates.db")
+        if near_duplicates != args.near_duplicates:
+            # Create the schema here rather than in every worker at once
+            NearDuplicateIndex(near_duplicates)
+        output = None
+        if args.output == "-":
+            output = sys.stdout
+        elif args.output:
+            output = open(args.output, "w", encoding="utf-8")
+        try:
+            summary = analyze_tree(
+                os.path.abspath(args.root),
+                args.analyses,
+                document_type=args.document_type,
+                mode=args.mode,
+                workers=args.workers,
+                output=output,
+                extensions=args.extensions,
+                service_args=(args.analyses, args.mode, data_dir, rules_dir, store, near_duplicates),
+                niceness=args.nice,
+                progress=not args.quiet
+            )
+        except KeyboardInterrupt:
+            print("Interrupted", file=sys.stderr)
+            return 130
+        finally:
+            if output is not None and output is not sys.stdout:
+                output.close()
+
+    print(
+        f"Analyzed {summary['documents']} documents with {summary['workers']} workers in {summary['elapsed_s']}s"
+        f" ({summary['documentsPerSecond']} docs/s), {summary['failed']} failed",
+        file=sys.stderr
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,16 +2,43 @@
 FastAPI backend for document verification with OpenAI integration
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request
+from fastapi import BackgroundTasks, FastAPI, File, Form, UploadFile, HTTPException, Request, Header, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import BinaryIO, List, Dict, Optional
 import uuid
 import os
+import hashlib
+import time
+import json
+import asyncio
+import functools
+from contextlib import suppress
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
 from services.openai_service import OpenAIService
+from services.document_service import DocumentService
+from services.summarization_service import SummarizationService
+from services.extractive_summarizer import ExtractiveSummarizer
+from services.analysis_service import ANALYSIS_KINDS, AnalysisService, AnalysisUnavailableError
+from services.result_cache import ResultCache
+from services.chunk_store import ChunkStore
+from services.verification_engine import VerificationEngine
+from services.rule_packs import RulePackWatcher
+from services.verification_checks import DEFAULT_CHECKS, build_artifact_providers, compose_verification_result
+from services.analysis_pipeline import AnalysisPipeline
+from services.job_service import Job, JobManager, JobQueueFullError
+from services.job_queue import JobQueue
+from services.file_store import FileStore
+from services.revision_tracker import RevisionTracker
+from services.document_comparer import DocumentComparer
+from services.near_duplicates import NearDuplicateIndex
+from services.original_registry import OriginalRegistry
+from services.risk_model import RiskModel
+from services.batch_verifier import BatchVerifier, check_upload_size, read_zip
+from services.result_export import encode_blocks, export_lines, parse_timestamp
 
 # Set up logging
 logging.basicConfig(
@@ -39,6 +66,74 @@ except Exception as e:
     logger.error(f"Failed to initialize OpenAI service: {str(e)}")
     raise
 
+# Uploads and the job queue live here so they survive restarts and are shared by all workers
+DATA_DIR = os.getenv("DATA_DIR", "data")
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Which uploads are new versions of an earlier one, and what changed
+revision_tracker = RevisionTracker(os.path.join(DATA_DIR, "revisions.db"))
+
+# Chunks shared across documents, with their term counts, token counts, rule matches and partial summaries
+chunk_store = ChunkStore()
+
+# Extracted text, chunks and retrieval index per uploaded file
+document_service = DocumentService(FileStore(os.path.join(DATA_DIR, "uploads")), revision_tracker, chunk_store)
+
+# MinHash signatures and LSH buckets of every upload, shared by all workers
+near_duplicates = NearDuplicateIndex(os.path.join(DATA_DIR, "near_duplicates.db"))
+
+# Page and paragraph hashes of documents we issued, for exact tamper comparison
+original_registry = OriginalRegistry(os.path.join(DATA_DIR, "originals.db"))
+
+# Analysis results by content hash, shared by all workers
+result_cache = ResultCache(os.path.join(DATA_DIR, "results.db"))
+
+# Map-reduce summarizer over the async OpenAI client; partial summaries are shared through the result cache
+summarization_service = SummarizationService(openai_service, result_cache, chunk_store)
+
+# Local summarizer used on request or while the LLM circuit is open
+extractive_summarizer = ExtractiveSummarizer()
+
+# Per-document-type compliance rules, recompiled in the background when the files change
+RULES_DIR = os.getenv("RULES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules"))
+rule_packs = RulePackWatcher(RULES_DIR, poll_interval=float(os.getenv("RULES_POLL_INTERVAL", "2")))
+
+# Local model behind riskLevel, confidence and authenticityScore
+risk_model = RiskModel.load()
+
+# Pluggable verification checks, run in a worker thread
+verification_engine = VerificationEngine(
+    DEFAULT_CHECKS,
+    build_artifact_providers(document_service, rule_packs),
+    functools.partial(compose_verification_result, risk_model=risk_model)
+)
+
+# Analyses shared by the HTTP endpoints and the jobs API
+analysis_service = AnalysisService(
+    document_service,
+    openai_service,
+    summarization_service,
+    extractive_summarizer,
+    verification_engine,
+    result_cache,
+    rule_packs,
+    original_registry,
+    risk_model,
+    near_duplicates
+)
+
+# Verifies portfolios for POST /batch/verify, a bounded number of documents at a time
+batch_verifier = BatchVerifier(analysis_service)
+
+# Clause-level diff for POST /compare
+document_comparer = DocumentComparer()
+
+# Runs several analyses of one document concurrently for POST /analyze
+analysis_pipeline = AnalysisPipeline(document_service, analysis_service)
+
+# Maximum number of outgoing chat events buffered per WebSocket connection
+WS_CHAT_BUFFER_SIZE = 64
+
 # CORS middleware with production configuration
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "").split(",")
 if not allowed_origins or allowed_origins == [""]:
@@ -66,15 +161,16 @@ app.add_middleware(
         "Access-Control-Allow-Origin",
         "Access-Control-Allow-Methods",
         "Access-Control-Allow-Headers",
-        "Access-Control-Allow-Credentials"
+        "Access-Control-Allow-Credentials",
+        "Idempotency-Key",
+        "If-None-Match"
     ],
     expose_headers=["*"],
     max_age=3600
 )
 
-# In-memory storage for demo (use database in production)
-uploaded_files = {}
-analysis_results = {}
+# Upload records, persisted under DATA_DIR/uploads
+uploaded_files = document_service.files
 
 # Pydantic models
 class VerificationRequest(BaseModel):
@@ -89,6 +185,30 @@ class ChatRequest(BaseModel):
     message: str
     chat_history: List[Dict[str, str]] = []
 
+class SummarizeRequest(BaseModel):
+    file_id: str
+    # "auto" uses the LLM unless its circuit is open, "llm" or "extractive" force one
+    mode: str = "auto"
+
+class RiskRequest(BaseModel):
+    file_ids: List[str]
+    document_type: str = "contract"
+
+class OriginalRequest(BaseModel):
+    file_id: str
+    # Defaults to the uploaded filename
+    name: Optional[str] = None
+
+class CompareRequest(BaseModel):
+    base_file_id: str
+    file_id: str
+
+class JobRequest(BaseModel):
+    kind: str  # "verify", "alterability" or "summarize"
+    file_id: str
+    document_type: str = "contract"
+    mode: str = "auto"
+
 class ChatMessage(BaseModel):
     role: str
     message: str
@@ -99,6 +219,30 @@ async def health_check():
     logger.info("Health check requested")
     return {"status": "healthy", "version": "1.0.0"}
 
+# Result cache and chunk store hit rates
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**result_cache.stats(), "chunk_store": chunk_store.stats()}
+
+@app.on_event("startup")
+async def purge_stale_results():
+    purged = result_cache.purge_stale(analysis_service.engine_versions())
+    if purged:
+        logger.info(f"Purged {purged} cached results from older engine versions")
+
+@app.on_event("startup")
+async def start_rule_pack_watcher():
+    rule_packs.start()
+
+@app.on_event("shutdown")
+async def stop_rule_pack_watcher():
+    rule_packs.stop()
+
+# Loaded rule packs and their version
+@app.get("/rules")
+async def get_rules():
+    return rule_packs.registry.describe()
+
 # Add middleware to log all requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -107,9 +251,71 @@ async def log_requests(request: Request, call_next):
     logger.info(f"Response: {response.status_code}")
     return response
 
+def index_upload(file_id: str) -> None:
+    """Extract the text of a new upload and add it to the shared indexes, after the response is sent."""
+    try:
+        context = document_service.get_context(file_id)
+        file_info = uploaded_files[file_id]
+        near_duplicates.index_document(file_id, context.text, file_info["filename"], file_info.get("uploaded_at", ""))
+    except Exception as e:
+        logger.warning(f"Indexing upload {file_id} failed: {str(e)}")
+
+async def save_upload(file: UploadFile, background_tasks: BackgroundTasks) -> dict:
+    """Store an uploaded file, schedule its indexing and return its id, name and size."""
+    # Read file content
+    content = await file.read()
+    return store_upload(file.filename, file.content_type, content, background_tasks)
+
+def store_upload(
+    filename: str,
+    content_type: Optional[str],
+    content: bytes,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> dict:
+    """Store one document's bytes under a new file ID and schedule its indexing, if background tasks are given."""
+    # Generate unique file ID
+    file_id = str(uuid.uuid4())
+    
+    # Store file info (persisted under DATA_DIR/uploads)
+    uploaded_files[file_id] = {
+        "filename": filename,
+        "content_type": content_type,
+        "size": len(content),
+        "uploaded_at": datetime.now().isoformat(),
+        "content_hash": hashlib.sha256(content).hexdigest(),
+        # Trailer, xref layout and page count; a few milliseconds even for large PDFs
+        "pdf": document_service.scan_pdf(content),
+        "content": content
+    }
+    if background_tasks is not None:
+        background_tasks.add_task(index_upload, file_id)
+    
+    return {
+        "file_id": file_id,
+        "filename": filename,
+        "size": len(content)
+    }
+
+def store_batch(archive: BinaryIO) -> Dict[str, str]:
+    """Store and index every document of a zip archive; returns file ID -> filename.
+
+    Every document is indexed before any is verified, so the near-duplicate
+    check sees the earlier documents of the same batch. Their extracted
+    text is dropped again right away, so a large batch is not held in
+    memory until its verification reaches each document.
+    """
+    check_upload_size(archive, batch_verifier.max_upload_bytes)
+    filenames = {}
+    for filename, content_type, content in read_zip(archive, batch_verifier.max_files, batch_verifier.max_bytes):
+        filenames[store_upload(filename, content_type, content)["file_id"]] = filename
+    for file_id in filenames:
+        index_upload(file_id)
+        document_service.forget(file_id)
+    return filenames
+
 # File upload endpoint
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     try:
         # Debug logging
         logger.info(f"Received file upload request: {file.filename if file else 'None'}")
@@ -120,30 +326,45 @@ async def upload_file(file: UploadFile = File(...)):
             logger.error("Error: No file provided")
             raise HTTPException(status_code=400, detail="No file provided")
         
-        # Generate unique file ID
-        file_id = str(uuid.uuid4())
+        return await save_upload(file, background_tasks)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+# Single round trip: upload (or reuse) a document and run several analyses
+@app.post("/analyze")
+async def analyze_document(
+    background_tasks: BackgroundTasks,
+    file: Optional[UploadFile] = File(None),
+    file_id: Optional[str] = Form(None),
+    analyses: str = Form(",".join(ANALYSIS_KINDS)),
+    document_type: str = Form("contract"),
+    mode: str = Form("auto")
+):
+    try:
+        upload_started = time.perf_counter()
+        if file is not None and file.filename:
+            file_id = (await save_upload(file, background_tasks))["file_id"]
+        elif not file_id:
+            raise HTTPException(status_code=400, detail="Provide a file or a file_id")
+        elif file_id not in uploaded_files:
+            raise HTTPException(status_code=404, detail="File not found")
+        upload_ms = round((time.perf_counter() - upload_started) * 1000, 2)
         
-        # Read file content (in production, save to disk/database)
-        content = await file.read()
+        requested = [kind.strip() for kind in analyses.split(",") if kind.strip()]
+        try:
+            analysis_result = await analysis_pipeline.run(file_id, requested, document_type, mode)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Store file info (in production, save to disk/database)
-        uploaded_files[file_id] = {
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "size": len(content),
-            "uploaded_at": datetime.now().isoformat(),
-            "content": content  # Store content for demo purposes
-        }
+        analysis_result["timings"]["upload"] = {"start_ms": 0.0, "duration_ms": upload_ms}
+        return analysis_result
         
-        return {
-            "file_id": file_id,
-            "filename": file.filename,
-            "size": len(content)
-        }
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 # Document verification endpoint
 @app.post("/verify")
@@ -152,47 +373,80 @@ async def verify_document(request: VerificationRequest):
         if request.file_id not in uploaded_files:
             raise HTTPException(status_code=404, detail="File not found")
         
-        # TODO: Implement actual document verification logic here
-        # This is a mock response - replace with your NLP/AI verification logic
-        
-        # Mock verification result
-        verification_result = {
-            "isValid": True,
-            "confidence": 95,
-            "isAuthentic": True,
-            "authenticityScore": 92,
-            "issues": ["Missing witness signature on page 3"],
-            "recommendations": [
-                "Add witness signature",
-                "Verify notary stamp",
-                "Check document formatting"
-            ],
-            "summary": "Document appears to be valid with minor formatting issues. Overall authenticity is high.",
-            "riskLevel": "Low",
-            "analysisDetails": {
-                "structureValidation": True,
-                "signatureVerification": False,
-                "contentIntegrity": True,
-                "metadataAnalysis": True,
-                "tamperingDetection": True
-            },
-            "legalCompliance": {
-                "isCompliant": True,
-                "missingElements": ["witness_signature"],
-                "complianceScore": 85
-            }
-        }
-        
-        # Store result
-        analysis_results[request.file_id] = verification_result
+        verification_result = await analysis_service.verify(request.file_id, request.document_type)
         
         return verification_result
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
 
+# Verify many documents (file_ids or a zip archive), streaming NDJSON results as they complete
+@app.post("/batch/verify")
+async def batch_verify(
+    file: Optional[UploadFile] = File(None),
+    file_ids: Optional[str] = Form(None),
+    document_type: str = Form("contract")
+):
+    try:
+        filenames: Dict[str, str] = {}
+        if file is not None and file.filename:
+            # Unzipping, hashing and text extraction stay off the event loop; the archive
+            # is read from the upload Starlette spooled to disk, not loaded into memory whole
+            filenames = await asyncio.to_thread(store_batch, file.file)
+            ids = list(filenames)
+        elif file_ids:
+            ids = [file_id.strip() for file_id in file_ids.split(",") if file_id.strip()]
+            missing = [file_id for file_id in ids if file_id not in uploaded_files]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"File not found: {', '.join(missing[:10])}")
+        else:
+            raise HTTPException(status_code=400, detail="Provide a zip file or file_ids")
+        if not ids:
+            raise HTTPException(status_code=400, detail="No documents to verify")
+        if len(ids) > batch_verifier.max_files:
+            raise HTTPException(status_code=400, detail=f"At most {batch_verifier.max_files} documents per batch")
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch verification failed: {str(e)}")
+
+    async def records():
+        # Documents stored only for this batch don't stay in memory once verified
+        async for record in batch_verifier.run(ids, document_type, filenames, evict=bool(filenames)):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(
+        records(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Risk scores of many documents in one batch
+@app.post("/risk")
+async def score_risk(request: RiskRequest):
+    try:
+        missing = [file_id for file_id in request.file_ids if file_id not in uploaded_files]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"File not found: {', '.join(missing[:10])}")
+
+        scores = await batch_verifier.score(request.file_ids, request.document_type)
+
+        return {"model": risk_model.version, "scores": scores}
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Risk scoring failed: {str(e)}")
+
 # Alterability analysis endpoint
 @app.post("/analyze-alterability")
 async def analyze_alterability(request: AlterabilityRequest):
@@ -200,33 +454,14 @@ async def analyze_alterability(request: AlterabilityRequest):
         if request.file_id not in uploaded_files:
             raise HTTPException(status_code=404, detail="File not found")
         
-        # TODO: Implement actual alterability analysis logic here
-        # This is a mock response - replace with your tampering detection logic
-        
-        # Mock alterability result
-        alterability_result = {
-            "alterabilityRisk": "Low",
-            "confidence": 88,
-            "findings": [
-                "Consistent font usage throughout document",
-                "No text insertion detected",
-                "Original PDF metadata intact",
-                "No suspicious formatting changes"
-            ],
-            "summary": "Low risk of alteration detected. Document appears authentic with consistent formatting and metadata.",
-            "technicalDetails": {
-                "fontConsistency": True,
-                "textInsertion": False,
-                "metadataIntact": True,
-                "digitalSignature": False,
-                "timestampValidation": True
-            }
-        }
+        alterability_result = await analysis_service.analyze_alterability(request.file_id)
         
         return alterability_result
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Alterability analysis failed: {str(e)}")
 
@@ -242,35 +477,23 @@ async def chat_with_document(request: ChatRequest):
             logger.error(f"File not found: {request.file_id}")
             raise HTTPException(status_code=404, detail="File not found")
         
-        # Get file content and info
-        file_info = uploaded_files[request.file_id]
-        file_content = file_info["content"]
-        logger.info(f"Retrieved file. Size: {len(file_content)} bytes, Type: {file_info['content_type']}")
-        
-        # Decode binary content to text
+        # Text extracted at upload (PDF, Word or plain text), with its clause and
+        # entity indexes, so clause questions only send that clause
         try:
-            logger.info("Attempting UTF-8 decode...")
-            document_text = file_content.decode('utf-8')
-        except UnicodeDecodeError:
-            logger.warning("UTF-8 decode failed, trying latin-1")
-            try:
-                document_text = file_content.decode('latin-1')
-            except:
-                logger.error("All decoding attempts failed")
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Unable to process the document content. Please ensure it's a valid text document."
-                )
-        
-        logger.info(f"Successfully decoded file content. Length: {len(document_text)}")
+            context = await asyncio.to_thread(document_service.get_context, request.file_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        logger.info(f"Loaded document text. Length: {len(context.text)}")
         
         # Use OpenAI service for chat
         logger.info("Sending request to OpenAI service...")
         try:
             chat_response = await openai_service.chat_with_document(
-                document_text=document_text,
+                document_text=context.text,
                 user_message=request.message,
-                chat_history=request.chat_history
+                chat_history=request.chat_history,
+                clauses=context.clauses,
+                entities=context.entities
             )
             
             if chat_response.get("sources") == ["mock_response"]:
@@ -312,27 +535,116 @@ async def chat_with_document(request: ChatRequest):
             detail="An unexpected error occurred. Our team has been notified."
         )
 
+# Streaming chat over a WebSocket
+@app.websocket("/ws/chat/{file_id}")
+async def chat_websocket(websocket: WebSocket, file_id: str):
+    await websocket.accept()
+
+    if file_id not in uploaded_files:
+        logger.error(f"File not found: {file_id}")
+        await websocket.close(code=4404, reason="File not found")
+        return
+
+    # Load the document once for the whole connection
+    try:
+        context = await asyncio.to_thread(document_service.get_context, file_id)
+    except ValueError as e:
+        await websocket.close(code=4400, reason=str(e))
+        return
+
+    logger.info(f"Chat WebSocket opened for file_id: {file_id}")
+    chat_history: List[Dict[str, str]] = []
+    # Bounded so a slow client pauses generation instead of growing memory
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=WS_CHAT_BUFFER_SIZE)
+    question_id = 0
+    generation: Optional[asyncio.Task] = None
+
+    async def send_events():
+        while True:
+            event = await outbox.get()
+            # Drop tokens still buffered for a question that was superseded
+            if event["type"] == "token" and event["id"] != question_id:
+                continue
+            await websocket.send_json(event)
+
+    async def answer(current_id: int, message: str):
+        await outbox.put({"type": "start", "id": current_id})
+        tokens = []
+        try:
+            async for token in openai_service.stream_chat_with_context(
+                context_chunks=context.relevant_chunks(message),
+                user_message=message,
+                chat_history=chat_history,
+                clauses=context.clauses,
+                entities=context.entities
+            ):
+                tokens.append(token)
+                await outbox.put({"type": "token", "id": current_id, "content": token})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Chat generation failed: {str(e)}")
+            await outbox.put({
+                "type": "error",
+                "id": current_id,
+                "detail": "Unable to process your request at this time. Please try again later."
+            })
+            return
+
+        chat_history.append({"role": "user", "message": message})
+        chat_history.append({"role": "ai", "message": "".join(tokens)})
+        # Only the turns that still fit in the prompt are worth keeping
+        chat_history[:] = openai_service.trim_history(chat_history)
+        await outbox.put({"type": "end", "id": current_id, "sources": ["document_context"]})
+
+    sender = asyncio.create_task(send_events())
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                payload = json.loads(raw)
+                message = payload.get("message", "") if isinstance(payload, dict) else ""
+            except json.JSONDecodeError:
+                message = raw
+            if not isinstance(message, str):
+                await outbox.put({"type": "error", "detail": "Message must be a string"})
+                continue
+            message = message.strip()
+            if not message:
+                await outbox.put({"type": "error", "detail": "Message is required"})
+                continue
+
+            # A new question cancels the answer still being generated
+            if generation is not None and not generation.done():
+                generation.cancel()
+                with suppress(asyncio.CancelledError):
+                    await generation
+                await outbox.put({"type": "cancelled", "id": question_id})
+
+            question_id += 1
+            generation = asyncio.create_task(answer(question_id, message))
+    except WebSocketDisconnect:
+        logger.info(f"Chat WebSocket closed for file_id: {file_id}")
+    finally:
+        for task in (generation, sender):
+            if task is not None and not task.done():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+
 # Document summary endpoint
 @app.post("/summarize")
-async def summarize_document(request: AlterabilityRequest):
+async def summarize_document(request: SummarizeRequest):
     try:
         if request.file_id not in uploaded_files:
             raise HTTPException(status_code=404, detail="File not found")
         
-        # TODO: Implement actual document summarization logic here
-        # This is a mock response - replace with your NLP summarization logic
-        
-        # Mock summary result
-        summary_result = {
-            "summary": "This is a legal document containing standard clauses and terms. The document appears to be properly formatted and contains typical legal language and structure.",
-            "keyPoints": [
-                "Document type: Legal contract",
-                "Key parties involved",
-                "Main terms and conditions",
-                "Signatures and dates",
-                "Legal compliance requirements"
-            ]
-        }
+        try:
+            summary_result = await analysis_service.summarize(request.file_id, request.mode)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except AnalysisUnavailableError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         
         return summary_result
         
@@ -341,6 +653,249 @@ async def summarize_document(request: AlterabilityRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
 
+# Cached results, served without running any analysis
+def cached_response(request: Request, payload: dict) -> Response:
+    """JSON response with an ETag; 304 when the client already has this version."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/results/{file_id}")
+async def get_results(file_id: str, request: Request):
+    if file_id not in uploaded_files:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    content_hash = document_service.get_content_hash(file_id)
+    entries = await asyncio.gather(*(
+        asyncio.to_thread(result_cache.latest, content_hash, kind, analysis_service.engine_version(kind))
+        for kind in ANALYSIS_KINDS
+    ))
+    results = {kind: entry for kind, entry in zip(ANALYSIS_KINDS, entries) if entry is not None}
+    return cached_response(request, {"file_id": file_id, "results": results})
+
+@app.get("/results/{file_id}/{kind}")
+async def get_result(file_id: str, kind: str, request: Request, variant: Optional[str] = None):
+    if kind not in ANALYSIS_KINDS:
+        raise HTTPException(status_code=404, detail=f"kind must be one of: {', '.join(ANALYSIS_KINDS)}")
+    if file_id not in uploaded_files:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    entry = await asyncio.to_thread(
+        result_cache.latest,
+        document_service.get_content_hash(file_id), kind, analysis_service.engine_version(kind), variant
+    )
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No {kind} result for this file yet")
+    return cached_response(request, entry["result"])
+
+# Every stored result in a time range, streamed as NDJSON (optionally gzip) with resumable cursors
+@app.get("/export/results")
+async def export_results(
+    kind: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    compress: bool = Query(False, alias="gzip")
+):
+    try:
+        kinds = [name.strip() for name in kind.split(",")] if kind else list(ANALYSIS_KINDS)
+        unknown = [name for name in kinds if name not in ANALYSIS_KINDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(ANALYSIS_KINDS)}")
+        lines = export_lines(
+            result_cache, kinds, parse_timestamp(since, "since"), parse_timestamp(until, "until"), cursor, limit
+        )
+        # Fail on a bad cursor before the response starts
+        first = next(lines, None)
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+
+    def all_lines():
+        if first is not None:
+            yield first
+            yield from lines
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if compress:
+        headers["Content-Disposition"] = 'attachment; filename="results.ndjson.gz"'
+        return StreamingResponse(encode_blocks(all_lines(), gzip=True), media_type="application/gzip", headers=headers)
+    return StreamingResponse(encode_blocks(all_lines()), media_type="application/x-ndjson", headers=headers)
+
+# Register an uploaded document as an original we issued
+@app.post("/originals")
+async def register_original(request: OriginalRequest):
+    try:
+        if request.file_id not in uploaded_files:
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        file_info = uploaded_files[request.file_id]
+        pages = await asyncio.to_thread(document_service.get_pages, request.file_id)
+        return await asyncio.to_thread(
+            original_registry.register,
+            request.file_id,
+            request.name or file_info["filename"],
+            document_service.get_content_hash(request.file_id),
+            pages
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
+
+# Added, removed and changed clauses of one document relative to another
+@app.post("/compare")
+async def compare_documents(request: CompareRequest):
+    try:
+        if request.base_file_id not in uploaded_files or request.file_id not in uploaded_files:
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        base, other = await asyncio.gather(
+            asyncio.to_thread(document_service.get_context, request.base_file_id),
+            asyncio.to_thread(document_service.get_context, request.file_id)
+        )
+        comparison = await asyncio.to_thread(document_comparer.compare, base.text, other.text)
+        
+        return {"base_file_id": request.base_file_id, "file_id": request.file_id, **comparison}
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Comparison failed: {str(e)}")
+
+# Versions of a document and what changed since the previous one (or since base_id)
+@app.get("/revisions/{file_id}")
+async def get_revisions(file_id: str, base_id: Optional[str] = None):
+    try:
+        if file_id not in uploaded_files or (base_id is not None and base_id not in uploaded_files):
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        # Registers the files on first use, which extracts their text
+        revision = await asyncio.to_thread(document_service.get_revision, file_id)
+        if base_id is not None:
+            await asyncio.to_thread(document_service.get_revision, base_id)
+        
+        return {
+            **revision.to_dict(),
+            "versions": [version.to_dict() for version in revision_tracker.lineage(revision.lineage_id)],
+            "changes": revision_tracker.diff(file_id, base_id)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Revision lookup failed: {str(e)}")
+
+# Clauses found in a document and where each clause type is
+@app.get("/clauses/{file_id}")
+async def get_clauses(file_id: str):
+    try:
+        if file_id not in uploaded_files:
+            raise HTTPException(status_code=404, detail="File not found")
+
+        # Built at upload; extracts the text now if that has not finished
+        context = await asyncio.to_thread(document_service.get_context, file_id)
+        return {"file_id": file_id, **context.clauses.to_dict()}
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Clause lookup failed: {str(e)}")
+
+# Parties, dates, amounts and jurisdictions found in a document
+@app.get("/entities/{file_id}")
+async def get_entities(file_id: str, kind: Optional[str] = None):
+    try:
+        if file_id not in uploaded_files:
+            raise HTTPException(status_code=404, detail="File not found")
+
+        # Extracted at upload; extracts the text now if that has not finished
+        entities = await asyncio.to_thread(document_service.get_entities, file_id)
+        spans = entities.of_kind(kind) if kind else entities.entities
+        return {
+            "file_id": file_id,
+            "keyFacts": entities.key_facts(),
+            "entities": [entity.to_dict() for entity in spans]
+        }
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Entity lookup failed: {str(e)}")
+
+# Background jobs for long-running analyses
+async def run_job(job: Job) -> dict:
+    return await analysis_service.run(job.kind, on_progress=job.report, **job.params)
+
+job_manager = JobManager(run_job, JobQueue(os.path.join(DATA_DIR, "jobs.db")))
+
+@app.on_event("startup")
+async def start_job_workers():
+    await job_manager.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_manager.stop()
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest, idempotency_key: Optional[str] = Header(None)):
+    if request.kind not in ANALYSIS_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(ANALYSIS_KINDS)}")
+    if request.file_id not in uploaded_files:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    try:
+        job = job_manager.submit(request.kind, request.model_dump(exclude={"kind"}), idempotency_key)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    if job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        async for snapshot in job_manager.events(job_id):
+            if snapshot is None:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import time
+import asyncio
+import logging
+from services.analysis_service import ANALYSIS_KINDS
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    requires: Tuple[str, ...] = ()
+
+
+class AnalysisPipeline:
+    """Runs several analyses of one document as a dependency graph.
+
+    Shared artifacts (document metadata, extracted text and chunks) are
+    produced once, and every analysis starts as soon as the artifacts it
+    needs are ready, concurrently with the others.
+    """
+
+    def __init__(self, document_service, analysis_service):
+        self.document_service = document_service
+        self.analysis_service = analysis_service
+
+    def _stages(self, file_id: str, document_type: str, mode: str) -> Dict[str, Stage]:
+        stages = [
+            Stage("metadata", lambda: asyncio.to_thread(self.document_service.get_metadata, file_id)),
+            # Text extraction is CPU-bound; keep it off the event loop
+            Stage("text", lambda: asyncio.to_thread(self.document_service.get_context, file_id)),
+            Stage(
+                "verify",
+                lambda: self.analysis_service.verify(file_id, document_type),
+                requires=("text", "metadata")
+            ),
+            Stage(
+                "alterability",
+                lambda: self.analysis_service.analyze_alterability(file_id),
+                requires=("metadata",)
+            ),
+            Stage(
+                "summarize",
+                lambda: self.analysis_service.summarize(file_id, mode),
+                requires=("text",)
+            )
+        ]
+        return {stage.name: stage for stage in stages}
+
+    async def run(
+        self,
+        file_id: str,
+        analyses: List[str],
+        document_type: str = "contract",
+        mode: str = "auto"
+    ) -> dict:
+        unknown = [kind for kind in analyses if kind not in ANALYSIS_KINDS]
+        if unknown or not analyses:
+            raise ValueError(f"analyses must be a non-empty subset of: {', '.join(ANALYSIS_KINDS)}")
+
+        stages = self._stages(file_id, document_type, mode)
+
+        # Only schedule the requested analyses and what they transitively need
+        needed: List[str] = []
+
+        def visit(name: str) -> None:
+            if name in needed:
+                return
+            for dependency in stages[name].requires:
+                visit(dependency)
+            needed.append(name)
+
+        for kind in analyses:
+            visit(kind)
+
+        started = time.perf_counter()
+        timings: Dict[str, dict] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def execute(stage: Stage) -> Any:
+            await asyncio.gather(*(tasks[dependency] for dependency in stage.requires))
+            stage_started = time.perf_counter()
+            try:
+                return await stage.run()
+            finally:
+                timings[stage.name] = {
+                    "start_ms": round((stage_started - started) * 1000, 2),
+                    "duration_ms": round((time.perf_counter() - stage_started) * 1000, 2)
+                }
+
+        # `needed` is in dependency order, so every dependency task exists first
+        for name in needed:
+            tasks[name] = asyncio.create_task(execute(stages[name]))
+        outcomes = await asyncio.gather(*(tasks[name] for name in needed), return_exceptions=True)
+
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for name, outcome in zip(needed, outcomes):
+            if name not in analyses:
+                continue
+            if isinstance(outcome, Exception):
+                logger.error(f"Analysis {name} failed for {file_id}: {str(outcome)}")
+                errors[name] = str(outcome)
+            else:
+                results[name] = outcome
+
+        return {
+            "file_id": file_id,
+            "results": results,
+            "errors": errors,
+            "timings": timings,
+            "total_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
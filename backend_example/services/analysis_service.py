@@ -0,0 +1,320 @@
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+from services.pdf_forensics import analyze_pdf
+from services.summarization_service import SUMMARY_PROMPT_VERSION
+from services.verification_checks import add_near_duplicates, find_near_duplicates
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Analyses that can be requested through the jobs API
+ANALYSIS_KINDS = ("verify", "alterability", "summarize")
+
+SUMMARY_MODES = ("auto", "llm", "extractive")
+
+# Bump an engine's version whenever its output changes; cached results of
+# older versions are then ignored and purged at startup. Verification also
+# carries the version of the rule packs it ran with and of the risk model;
+# alterability results are checked against the registry of known originals
+# when they are read.
+ENGINE_VERSIONS = {
+    "verify": "12",
+    "alterability": "4",
+    "summarize": f"4.{SUMMARY_PROMPT_VERSION}"
+}
+
+# Called with (stage, progress between 0 and 1)
+ProgressCallback = Callable[[str, float], None]
+
+
+class AnalysisUnavailableError(Exception):
+    """The analysis needs the LLM and the LLM is not available."""
+
+
+def _report(on_progress: Optional[ProgressCallback], stage: str, progress: float) -> None:
+    if on_progress is not None:
+        on_progress(stage, progress)
+
+
+def _apply_original_match(result: dict, match: Optional[dict], registered_until: Optional[str]) -> dict:
+    """Let a comparison with a registered original override the forensic heuristics."""
+    result["originalMatch"] = match
+    # Latest registration the document was compared against
+    result["originalsRegisteredUntil"] = registered_until
+    if match is None:
+        return result
+    name = match["name"]
+    if match["status"] == "exact":
+        result["findings"].insert(0, f"Identical, byte for byte, to the registered original \"{name}\"")
+        result["alterabilityRisk"] = "Low"
+        result["confidence"] = 99
+        result["summary"] = f"The document is an unmodified copy of the registered original \"{name}\"."
+    elif match["status"] == "identical_text":
+        result["findings"].insert(0, f"Every page has the same text as the registered original \"{name}\", but the file differs")
+    else:
+        pages = [str(page["page"]) for page in match["differingPages"]]
+        finding = f"Differs from the registered original \"{name}\""
+        if pages:
+            finding += f" on page {', '.join(pages[:10])}"
+        if match["missingOriginalPages"]:
+            finding += f"; original page(s) missing: {', '.join(str(page) for page in match['missingOriginalPages'][:10])}"
+        result["findings"].insert(0, finding)
+        result["alterabilityRisk"] = "High"
+        result["confidence"] = max(result["confidence"], 90)
+        result["technicalDetails"]["textInsertion"] = True
+        result["summary"] = f"{finding}. {result['summary']}"
+    return result
+
+
+class AnalysisService:
+    """The document analyses behind /verify, /analyze-alterability and /summarize."""
+
+    def __init__(
+        self,
+        document_service,
+        openai_service,
+        summarization_service,
+        extractive_summarizer,
+        verification_engine,
+        result_cache=None,
+        rule_packs=None,
+        originals=None,
+        risk_model=None,
+        near_duplicates=None
+    ):
+        self.document_service = document_service
+        self.openai_service = openai_service
+        self.summarization_service = summarization_service
+        self.extractive_summarizer = extractive_summarizer
+        self.verification_engine = verification_engine
+        self.result_cache = result_cache
+        self.rule_packs = rule_packs
+        self.originals = originals
+        self.risk_model = risk_model
+        self.near_duplicates = near_duplicates
+
+    def engine_version(self, kind: str) -> str:
+        """Version stamp that cached results of this kind are stored under."""
+        version = ENGINE_VERSIONS[kind]
+        if kind == "verify" and self.rule_packs is not None:
+            version = f"{version}+rules.{self.rule_packs.version}"
+        if kind == "verify" and self.risk_model is not None:
+            version = f"{version}+model.{self.risk_model.version}"
+        return version
+
+    def engine_versions(self) -> Dict[str, str]:
+        return {kind: self.engine_version(kind) for kind in ENGINE_VERSIONS}
+
+    async def _cached(
+        self,
+        kind: str,
+        file_id: str,
+        variant: str,
+        compute: Callable[[], Awaitable[dict]],
+        on_progress: Optional[ProgressCallback] = None,
+        cacheable: Callable[[dict], bool] = lambda result: True,
+        current: Callable[[dict], bool] = lambda result: True
+    ) -> dict:
+        """Return the cached result for this content if it is still current, or compute and store it."""
+        if self.result_cache is None:
+            return await compute()
+
+        content_hash = self.document_service.get_content_hash(file_id)
+        engine_version = self.engine_version(kind)
+        # SQLite may wait on another writer; keep that off the event loop
+        cached = await asyncio.to_thread(self.result_cache.get, content_hash, kind, variant, engine_version)
+        if cached is not None and current(cached):
+            logger.info(f"Using cached {kind} result for {file_id}")
+            _report(on_progress, kind, 1.0)
+            return dict(cached)
+
+        result = await compute()
+        # Rules reloaded mid-run: the result may mix versions, so don't keep it
+        if cacheable(result) and self.engine_version(kind) == engine_version:
+            await asyncio.to_thread(self.result_cache.put, content_hash, kind, variant, engine_version, result)
+        return result
+
+    def _previous_version_result(self, file_id: str, kind: str, variant: str) -> Optional[dict]:
+        """Cached result of the previous version when this revision left the text unchanged."""
+        revisions = self.document_service.revisions
+        if self.result_cache is None or revisions is None:
+            return None
+        revision = self.document_service.get_revision(file_id)
+        if revision is None or revision.parent_id is None or revision.parent_id not in self.document_service.files:
+            return None
+        if not revisions.diff(file_id)["identical"]:
+            return None
+        cached = self.result_cache.get(
+            self.document_service.get_content_hash(revision.parent_id), kind, variant, self.engine_version(kind)
+        )
+        if cached is None:
+            return None
+        logger.info(f"Text of {file_id} is unchanged from {revision.parent_id}, reusing its {kind} result")
+        return dict(cached)
+
+    async def verify(
+        self,
+        file_id: str,
+        document_type: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        result = await self._cached(
+            "verify", file_id, document_type,
+            lambda: self._verify(file_id, document_type, on_progress),
+            on_progress
+        )
+        # Depends on the upload, not just its content, so it is never cached
+        started = time.perf_counter()
+        matches = await asyncio.to_thread(find_near_duplicates, self.document_service, self.near_duplicates, file_id)
+        return add_near_duplicates(
+            result, matches, document_type, round((time.perf_counter() - started) * 1000, 2), self.risk_model
+        )
+
+    async def _verify(
+        self,
+        file_id: str,
+        document_type: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        return await self.verification_engine.verify(file_id, document_type, on_progress)
+
+    async def analyze_alterability(
+        self,
+        file_id: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        return await self._cached(
+            "alterability", file_id, "",
+            lambda: self._analyze_alterability(file_id, on_progress),
+            on_progress,
+            current=self._original_match_current
+        )
+
+    def _original_match_current(self, result: dict) -> bool:
+        """Whether registrations since the result was computed leave its original match as it was.
+
+        A matched original must not have been re-registered since; a
+        document that matched nothing is re-checked once any original is
+        registered after it. Other registrations leave the result alone.
+        """
+        if self.originals is None:
+            return True
+        if "originalMatch" not in result:
+            return False
+        match = result["originalMatch"]
+        if match is not None:
+            return self.originals.registered_at(match["originalId"]) == match["registeredAt"]
+        return self.originals.registered_at() == result.get("originalsRegisteredUntil")
+
+    async def _analyze_alterability(
+        self,
+        file_id: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        metadata = self.document_service.get_metadata(file_id)
+        is_pdf = metadata["filename"].lower().endswith(".pdf") or metadata.get("content_type") == "application/pdf"
+        if not is_pdf:
+            result = {
+                "alterabilityRisk": "Low",
+                "confidence": 20,
+                "findings": ["Forensic checks are only available for PDF files"],
+                "summary": "No alteration analysis was possible for this file type.",
+                "technicalDetails": {
+                    "fontConsistency": True,
+                    "textInsertion": False,
+                    "metadataIntact": True,
+                    "digitalSignature": False,
+                    "timestampValidation": False
+                }
+            }
+        else:
+            # Scan the stored file through mmap when it is on disk
+            path = self.document_service.content_path(file_id)
+            content = None if path is not None else self.document_service.files[file_id]["content"]
+            result = await asyncio.to_thread(analyze_pdf, path, content)
+
+        if self.originals is not None:
+            # Read before matching, so a registration during the match makes the result stale
+            registered_until = await asyncio.to_thread(self.originals.registered_at)
+            match = await asyncio.to_thread(self._match_original, file_id)
+            result = _apply_original_match(result, match, registered_until)
+        _report(on_progress, "alterability", 1.0)
+        return result
+
+    def _match_original(self, file_id: str) -> Optional[dict]:
+        return self.originals.match(
+            self.document_service.get_content_hash(file_id), self.document_service.get_pages(file_id)
+        )
+
+    async def summarize(
+        self,
+        file_id: str,
+        mode: str = "auto",
+        on_progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(SUMMARY_MODES)}")
+
+        variant = mode if mode == "extractive" else f"{mode}:{self.openai_service.model}"
+        return await self._cached(
+            "summarize", file_id, variant,
+            lambda: self._summarize(file_id, mode, variant, on_progress),
+            on_progress,
+            # An extractive fallback should not stop "auto" from trying the LLM next time
+            cacheable=lambda result: mode != "auto" or result["method"] == "llm"
+        )
+
+    async def _summarize(
+        self,
+        file_id: str,
+        mode: str,
+        variant: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        _report(on_progress, "extract", 0.0)
+        # Extraction and chunking are CPU work; keep them off the event loop
+        context = await asyncio.to_thread(self.document_service.get_context, file_id)
+        _report(on_progress, "extract", 1.0)
+
+        # A re-saved or re-signed copy summarizes exactly like its previous version
+        previous = await asyncio.to_thread(self._previous_version_result, file_id, "summarize", variant)
+        if previous is not None:
+            _report(on_progress, "summarize", 1.0)
+            return previous
+
+        use_llm = mode == "llm" or (mode == "auto" and not self.openai_service.circuit.is_open)
+        if use_llm:
+            try:
+                summary_result = await self.summarization_service.summarize(
+                    context.text,
+                    on_progress=lambda done: _report(on_progress, "summarize", done),
+                    key_facts=context.entities.describe()
+                )
+                summary_result["method"] = "llm"
+                summary_result["keyFacts"] = context.entities.key_facts()
+                return summary_result
+            except Exception as e:
+                if mode == "llm":
+                    logger.error(f"LLM summarization failed: {str(e)}")
+                    raise AnalysisUnavailableError(
+                        "AI service is currently unavailable. Try mode \"extractive\"."
+                    )
+                logger.warning(f"LLM summarization failed, using extractive summary: {str(e)}")
+
+        summary_result = await asyncio.to_thread(self.extractive_summarizer.summarize, context.text)
+        summary_result["method"] = "extractive"
+        summary_result["keyFacts"] = context.entities.key_facts()
+        _report(on_progress, "summarize", 1.0)
+        return summary_result
+
+    async def run(self, kind: str, file_id: str, on_progress: Optional[ProgressCallback] = None, **params) -> dict:
+        """Run one analysis by kind name."""
+        if kind == "verify":
+            return await self.verify(file_id, params.get("document_type", "contract"), on_progress)
+        if kind == "alterability":
+            return await self.analyze_alterability(file_id, on_progress)
+        if kind == "summarize":
+            return await self.summarize(file_id, params.get("mode", "auto"), on_progress)
+        raise ValueError(f"Unknown analysis kind: {kind}")
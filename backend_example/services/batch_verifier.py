@@ -0,0 +1,176 @@
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import os
+import time
+import asyncio
+import logging
+import zipfile
+import mimetypes
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class BatchTooLargeError(ValueError):
+    """The batch has more documents or bytes than allowed."""
+
+
+def check_upload_size(upload: BinaryIO, max_bytes: int, chunk_size: int = 1024 * 1024) -> int:
+    """Size of an uploaded file, read through a chunk at a time and rejected past max_bytes; rewinds it."""
+    size = 0
+    upload.seek(0)
+    while True:
+        chunk = upload.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise BatchTooLargeError(f"Upload is larger than {max_bytes} bytes")
+    upload.seek(0)
+    return size
+
+
+def read_zip(archive: BinaryIO, max_files: int, max_bytes: int) -> Iterator[Tuple[str, str, bytes]]:
+    """(filename, content type, content) of every document in a zip archive, one at a time.
+
+    Directories, hidden files and macOS resource forks are skipped. Sizes
+    are checked against the archive's directory before anything is
+    decompressed, and again while reading, so a zip bomb is rejected early.
+    Only the document being yielded is held in memory.
+    """
+    try:
+        zip_file = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        raise ValueError("Upload is not a valid zip archive")
+
+    members = [
+        member for member in zip_file.infolist()
+        if not member.is_dir()
+        and not member.filename.startswith("__MACOSX/")
+        and not os.path.basename(member.filename).startswith(".")
+    ]
+    if len(members) > max_files:
+        raise BatchTooLargeError(f"Archive has {len(members)} documents; at most {max_files} are allowed")
+    if sum(member.file_size for member in members) > max_bytes:
+        raise BatchTooLargeError(f"Archive expands to more than {max_bytes} bytes")
+
+    total = 0
+    for member in members:
+        with zip_file.open(member) as member_file:
+            data = member_file.read(max_bytes - total + 1)
+        total += len(data)
+        if total > max_bytes:
+            raise BatchTooLargeError(f"Archive expands to more than {max_bytes} bytes")
+        filename = os.path.basename(member.filename)
+        yield filename, mimetypes.guess_type(filename)[0] or "application/octet-stream", data
+
+
+class BatchVerifier:
+    """Verifies many documents with bounded concurrency, yielding results as they complete.
+
+    A fixed number of tasks pull file ids from a shared queue, so at most
+    `concurrency` documents are being verified (and have their artifacts
+    in memory) at once, while enough are in flight to keep every CPU
+    busy. Results come back in completion
+    order; the last record reports the batch's throughput.
+    """
+
+    def __init__(self, analysis_service, concurrency: Optional[int] = None):
+        self.analysis_service = analysis_service
+        # Twice the CPUs: one document's checks run while the next one's artifacts load
+        self.concurrency = concurrency or int(os.getenv("BATCH_VERIFY_CONCURRENCY", str(2 * (os.cpu_count() or 1))))
+        self.max_files = int(os.getenv("BATCH_MAX_FILES", "500"))
+        self.max_bytes = int(os.getenv("BATCH_MAX_BYTES", str(500 * 1024 * 1024)))
+        # Size of the uploaded (compressed) archive
+        self.max_upload_bytes = int(os.getenv("BATCH_MAX_UPLOAD_BYTES", str(self.max_bytes)))
+
+    async def run(
+        self,
+        file_ids: List[str],
+        document_type: str,
+        filenames: Optional[Dict[str, str]] = None,
+        evict: bool = False
+    ) -> AsyncIterator[dict]:
+        """One record per document, in completion order, then a summary record.
+
+        With `evict`, each document's extracted text and indexes are dropped
+        once it is verified, for documents stored only for this batch.
+        """
+        if len(file_ids) > self.max_files:
+            raise BatchTooLargeError(f"At most {self.max_files} documents per batch")
+
+        started = time.perf_counter()
+        pending: asyncio.Queue = asyncio.Queue()
+        for position, file_id in enumerate(file_ids):
+            pending.put_nowait((position, file_id))
+        finished: asyncio.Queue = asyncio.Queue()
+
+        async def worker() -> None:
+            while True:
+                try:
+                    position, file_id = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                document_started = time.perf_counter()
+                record = {"index": position, "file_id": file_id}
+                if filenames and file_id in filenames:
+                    record["filename"] = filenames[file_id]
+                try:
+                    record["result"] = await self.analysis_service.verify(file_id, document_type)
+                    record["status"] = "completed"
+                except Exception as e:
+                    logger.error(f"Batch verification of {file_id} failed: {str(e)}")
+                    record["status"] = "failed"
+                    record["error"] = str(e)
+                if evict:
+                    self.analysis_service.document_service.forget(file_id)
+                record["duration_ms"] = round((time.perf_counter() - document_started) * 1000, 2)
+                await finished.put(record)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(file_ids)))]
+        failed = 0
+        risk_levels: Dict[str, int] = {}
+        try:
+            for _ in range(len(file_ids)):
+                record = await finished.get()
+                if record["status"] == "failed":
+                    failed += 1
+                else:
+                    level = record["result"].get("riskLevel")
+                    risk_levels[level] = risk_levels.get(level, 0) + 1
+                yield record
+        finally:
+            # The client went away: stop starting new documents
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        elapsed = time.perf_counter() - started
+        yield {
+            "summary": True,
+            "documents": len(file_ids),
+            "completed": len(file_ids) - failed,
+            "failed": failed,
+            "riskLevels": risk_levels,
+            "concurrency": self.concurrency,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "documentsPerSecond": round(len(file_ids) / elapsed, 2) if elapsed > 0 else None
+        }
+
+    async def score(self, file_ids: List[str], document_type: str) -> Dict[str, dict]:
+        """Risk scores of many documents, scored by the model in one batch.
+
+        Documents are verified `concurrency` at a time, so documents verified
+        before only cost a cache lookup. A document that cannot be verified
+        gets an `error` instead of a score.
+        """
+        features: Dict[str, dict] = {}
+        scores: Dict[str, dict] = {}
+        async for record in self.run(file_ids, document_type):
+            if record.get("summary"):
+                continue
+            if record["status"] == "completed":
+                features[record["file_id"]] = record["result"]["riskFeatures"]
+            else:
+                scores[record["file_id"]] = {"error": record["error"]}
+        scores.update(zip(features, self.analysis_service.risk_model.score(list(features.values()))))
+        return {file_id: scores[file_id] for file_id in file_ids}
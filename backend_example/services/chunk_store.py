@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import os
+import hashlib
+import threading
+
+# Artifact lookups that found nothing, as opposed to a stored None
+_MISSING = object()
+
+
+class StoredChunk:
+    __slots__ = ("text", "artifacts")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.artifacts: Dict[str, Any] = {}
+
+
+class ChunkStore:
+    """Content-addressed chunks shared by every document in the process.
+
+    Contracts repeat the same boilerplate (definitions, governing law,
+    force majeure), so each distinct chunk text is kept once, keyed by its
+    hash, and every document containing it refers to the same string.
+    Artifacts derived from a chunk (term counts, token counts, rule
+    matches, partial summaries) are computed the first time any document
+    needs them and reused by all others. Memory and CPU therefore grow
+    with the amount of unique text. The least recently used chunks are
+    dropped beyond `max_chunks`.
+    """
+
+    def __init__(self, max_chunks: Optional[int] = None):
+        self.max_chunks = max_chunks or int(os.getenv("CHUNK_STORE_SIZE", "200000"))
+        self._chunks: "OrderedDict[bytes, StoredChunk]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._interned = 0
+        self._shared = 0
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _entry(self, text: str) -> StoredChunk:
+        # Caller holds the lock
+        key = self.key(text)
+        entry = self._chunks.get(key)
+        if entry is None:
+            entry = self._chunks[key] = StoredChunk(text)
+            while len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(key)
+        return entry
+
+    def intern(self, text: str) -> str:
+        """The stored copy of this chunk text, so identical chunks share one string."""
+        with self._lock:
+            entry = self._entry(text)
+            self._interned += 1
+            if entry.text is not text:
+                self._shared += 1
+            return entry.text
+
+    def get(self, text: str, name: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self._entry(text).artifacts.get(name, _MISSING)
+            counter = self._misses if value is _MISSING else self._hits
+            counter[name] = counter.get(name, 0) + 1
+        return default if value is _MISSING else value
+
+    def put(self, text: str, name: str, value: Any) -> None:
+        with self._lock:
+            self._entry(text).artifacts[name] = value
+
+    def artifact(self, text: str, name: str, compute: Callable[[str], Any]) -> Any:
+        """The named artifact of a chunk, computed once per distinct chunk text."""
+        value = self.get(text, name, _MISSING)
+        if value is _MISSING:
+            # Computed outside the lock; two threads may race, both get the same value
+            value = compute(text)
+            self.put(text, name, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_kind: Dict[str, Dict[str, int]] = {}
+            for name in set(self._hits) | set(self._misses):
+                # Artifact names carry versions after the first ":"
+                totals = per_kind.setdefault(name.split(":", 1)[0], {"hits": 0, "misses": 0})
+                totals["hits"] += self._hits.get(name, 0)
+                totals["misses"] += self._misses.get(name, 0)
+            chunks = len(self._chunks)
+            characters = sum(len(entry.text) for entry in self._chunks.values())
+            interned, shared = self._interned, self._shared
+        for totals in per_kind.values():
+            lookups = totals["hits"] + totals["misses"]
+            totals["hit_rate"] = round(totals["hits"] / lookups, 3) if lookups else 0.0
+        return {
+            "chunks": chunks,
+            "characters": characters,
+            "interned": interned,
+            "shared": shared,
+            "artifacts": dict(sorted(per_kind.items()))
+        }
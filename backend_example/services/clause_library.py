@@ -0,0 +1,127 @@
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+import hashlib
+import numpy as np
+from services.document_service import tokenize
+from services.extractive_summarizer import STOP_WORDS
+
+# Hashed feature space shared by documents and exemplars
+DIMENSIONS = 4096
+
+# Paragraphs longer than this many words are compared in pieces
+WINDOW_WORDS = 120
+
+# Bump when the features change so cached paragraph features are not reused
+FEATURE_VERSION = "1"
+
+
+@lru_cache(maxsize=200000)
+def _word_hash(word: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def paragraph_features(paragraph: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(window, feature, count) of the hashed words of one paragraph, one entry per pair."""
+    words = [word for word in tokenize(paragraph) if len(word) > 1 and word not in STOP_WORDS]
+    if not words:
+        empty = np.zeros(0, dtype=np.int32)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+    features = np.array([_word_hash(word) % DIMENSIONS for word in words], dtype=np.int64)
+    keys = (np.arange(len(words)) // WINDOW_WORDS) * DIMENSIONS + features
+    keys, counts = np.unique(keys, return_counts=True)
+    return (keys // DIMENSIONS).astype(np.int32), (keys % DIMENSIONS).astype(np.int32), counts.astype(np.float32)
+
+
+def _weights(features: np.ndarray, counts: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    return np.log1p(counts) * idf[features]
+
+
+class ClauseLibrary:
+    """Exemplars of standard clauses, vectorized once when a rule pack is compiled.
+
+    A document is compared with every exemplar in one matrix product:
+    the hashed TF-IDF vectors of its paragraph windows (rows) against
+    the exemplar vectors (columns). Only the features that occur in some
+    exemplar get a column, so the matrix is a few hundred columns wide
+    however large the document's vocabulary. The best score per clause is
+    the highest cosine similarity between any window and any of the
+    clause's exemplars. Paragraph features come from the chunk store when
+    one is given, so boilerplate is only tokenized once.
+    """
+
+    def __init__(self, exemplars: Dict[str, Sequence[str]]):
+        self.clause_ids = [clause_id for clause_id, texts in exemplars.items() if texts]
+        texts = [text for clause_id in self.clause_ids for text in exemplars[clause_id]]
+        # Exemplar columns of each clause start here
+        self._starts = np.cumsum([0] + [len(exemplars[clause_id]) for clause_id in self.clause_ids[:-1]])
+
+        # Exemplars are one window each, however long
+        counts = np.zeros((len(texts), DIMENSIONS), dtype=np.float32)
+        for row, text in enumerate(texts):
+            _, features, feature_counts = paragraph_features(text.lower())
+            np.add.at(counts[row], features, feature_counts)
+
+        # Document frequency over clauses: words every clause uses carry little weight
+        document_frequency = np.zeros(DIMENSIONS, dtype=np.float32)
+        for start, end in zip(self._starts, [*self._starts[1:], len(texts)]):
+            document_frequency += counts[start:end].any(axis=0)
+        self.idf = (np.log((1 + len(self.clause_ids)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        rows, columns = np.nonzero(counts)
+        vectors = np.zeros_like(counts)
+        vectors[rows, columns] = _weights(columns, counts[rows, columns], self.idf)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        # Only features some exemplar has can add to a similarity
+        self.features = np.flatnonzero(vectors.any(axis=0))
+        self._column = np.full(DIMENSIONS, -1, dtype=np.int64)
+        self._column[self.features] = np.arange(len(self.features))
+        self.vectors = vectors[:, self.features]
+
+    def match(self, paragraphs: List[str], offsets: List[int], chunk_store=None) -> Dict[str, dict]:
+        """Best score of every clause over the windows of the given paragraphs, with where it was found.
+
+        `paragraphs` are lowercased and `offsets` are where each starts in the text.
+        """
+        name = f"clause_features:{FEATURE_VERSION}"
+        windows, features, counts, window_offsets = [], [], [], []
+        rows = 0
+        for paragraph, offset in zip(paragraphs, offsets):
+            if chunk_store is not None:
+                entry = chunk_store.artifact(paragraph, name, paragraph_features)
+            else:
+                entry = paragraph_features(paragraph)
+            if not len(entry[0]):
+                continue
+            windows.append(entry[0] + rows)
+            features.append(entry[1])
+            counts.append(entry[2])
+            pieces = int(entry[0][-1]) + 1
+            window_offsets.extend([offset] * pieces)
+            rows += pieces
+        if not rows:
+            return {clause_id: {"score": 0.0, "offset": None} for clause_id in self.clause_ids}
+
+        windows, features = np.concatenate(windows), np.concatenate(features)
+        weights = _weights(features, np.concatenate(counts), self.idf)
+        # Window norms over all their features, but columns only for the library's
+        norms = np.sqrt(np.bincount(windows, weights=weights * weights, minlength=rows))
+        columns = self._column[features]
+        kept = columns >= 0
+        matrix = np.zeros((rows, len(self.features)), dtype=np.float32)
+        matrix[windows[kept], columns[kept]] = weights[kept] / norms[windows[kept]]
+        scores = matrix @ self.vectors.T
+        best_windows = scores.argmax(axis=0)
+        best_scores = scores[best_windows, np.arange(scores.shape[1])]
+        # Best exemplar of each clause
+        per_clause = np.maximum.reduceat(best_scores, self._starts)
+        results = {}
+        ends = [*self._starts[1:], len(best_scores)]
+        for position, clause_id in enumerate(self.clause_ids):
+            start, end = self._starts[position], ends[position]
+            exemplar = start + int(best_scores[start:end].argmax())
+            results[clause_id] = {
+                "score": round(float(per_clause[position]), 3),
+                "offset": window_offsets[int(best_windows[exemplar])]
+            }
+        return results
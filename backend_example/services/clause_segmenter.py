@@ -0,0 +1,162 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import re
+
+# Clause type -> words that name it, in a heading or in a question
+CLAUSE_TYPES: Dict[str, str] = {
+    "definitions": r"definitions?|interpretation",
+    "parties": r"parties",
+    "payment": r"pay(?:ment|ments|able)?|fees?|compensation|price|invoic\w*|consideration",
+    "rent": r"rent(?:al)?",
+    "term": r"term|duration|commencement",
+    "termination": r"terminat\w*|cancell?ation",
+    "confidentiality": r"confidential\w*|non-disclosure|nondisclosure",
+    "intellectual_property": r"intellectual property|ip rights|ownership|licen[cs]\w*",
+    "indemnification": r"indemn\w*",
+    "liability": r"liabilit\w*",
+    "warranties": r"warrant\w*|representations",
+    "force_majeure": r"force majeure",
+    "governing_law": r"governing law|applicable law|choice of law|jurisdiction",
+    "dispute_resolution": r"disputes?|arbitration|mediation",
+    "entire_agreement": r"entire agreement|integration",
+    "notices": r"notices?",
+    "assignment": r"assignment",
+    "security_deposit": r"(?:security )?deposit",
+    "signatures": r"signatures?|execution|in witness whereof"
+}
+TYPE_PATTERNS = {name: re.compile(rf"\b(?:{pattern})\b") for name, pattern in CLAUSE_TYPES.items()}
+
+# "12.3 Governing Law. ...", "Section 4 - Term", "ARTICLE IV: CONFIDENTIALITY", "II. Payment"
+NUMBERED_HEADING = re.compile(
+    r"^[ \t]*(?:(?:article|section|clause)[ \t]+(?P<named>\d{1,3}(?:\.\d{1,3})*|[ivxlc]{1,6})[.):]?"
+    r"|(?P<number>\d{1,3}(?:\.\d{1,3})*)[.)]?|(?P<roman>(?-i:[IVXLC]{1,6}))[.)])"
+    r"(?:[ \t]*[-–—:])?[ \t]+(?P<title>\S[^\n]*)$",
+    re.MULTILINE | re.IGNORECASE
+)
+# A line of capitals on its own: "GOVERNING LAW", "IN WITNESS WHEREOF"
+CAPS_HEADING = re.compile(r"^[ \t]*(?P<title>[A-Z][A-Z &,'/-]{2,80}?)[ \t]*[.:]?[ \t]*$", re.MULTILINE)
+
+# Words a title-case heading may leave in lowercase
+MINOR_WORDS = frozenset("a an and as at by for in of on or the to with".split())
+
+MAX_HEADING_WORDS = 10
+
+
+def clause_types(text: str) -> Tuple[str, ...]:
+    """Clause types named in a heading or a question."""
+    lowered = text.lower()
+    return tuple(name for name, pattern in TYPE_PATTERNS.items() if pattern.search(lowered))
+
+
+def _heading(title: str) -> Optional[str]:
+    """The heading part of a numbered line, or None if the line reads like body text."""
+    heading = re.split(r"(?<=[A-Za-z)])[.:](?:\s|$)", title, maxsplit=1)[0].strip().rstrip(".:")
+    words = heading.split()
+    if not words or len(words) > MAX_HEADING_WORDS:
+        return None
+    if all(word[0].isupper() or not word[0].isalpha() or word.lower() in MINOR_WORDS for word in words):
+        return heading
+    return None
+
+
+@dataclass
+class Clause:
+    heading: str
+    number: Optional[str]
+    types: Tuple[str, ...]
+    start: int
+    end: int
+    # 1 for top-level sections, 2 for "4.1", and so on
+    depth: int
+
+    def to_dict(self) -> dict:
+        return {
+            "heading": self.heading,
+            "number": self.number,
+            "types": list(self.types),
+            "start": self.start,
+            "end": self.end
+        }
+
+
+def segment_clauses(text: str) -> List[Clause]:
+    """Clauses of a document, one per heading, each running until the next heading at its level or above."""
+    found = []
+    for match in NUMBERED_HEADING.finditer(text):
+        heading = _heading(match.group("title"))
+        if heading is None:
+            continue
+        number = (match.group("named") or match.group("number") or match.group("roman")).rstrip(".")
+        depth = number.count(".") + 1 if number[0].isdigit() else 1
+        found.append((match.start(), heading, number, depth))
+    for match in CAPS_HEADING.finditer(text):
+        if len(match.group("title").split()) <= MAX_HEADING_WORDS:
+            found.append((match.start(), match.group("title").strip(" ,&/-"), None, 1))
+    found.sort(key=lambda item: item[0])
+
+    clauses: List[Clause] = []
+    # Clauses still open, outermost first
+    open_clauses: List[Clause] = []
+    for start, heading, number, depth in found:
+        if clauses and clauses[-1].start == start:
+            continue
+        while open_clauses and open_clauses[-1].depth >= depth:
+            open_clauses.pop().end = start
+        clause = Clause(heading, number, clause_types(heading), start, len(text), depth)
+        clauses.append(clause)
+        open_clauses.append(clause)
+    return clauses
+
+
+class ClauseIndex:
+    """Clauses of one document and where each clause type is.
+
+    Built once per document; clause questions and compliance checks look
+    up spans here instead of searching the whole text.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.clauses = segment_clauses(text)
+        self._starts = [clause.start for clause in self.clauses]
+        self.by_type: Dict[str, List[Clause]] = {}
+        for clause in self.clauses:
+            for name in clause.types:
+                self.by_type.setdefault(name, []).append(clause)
+
+    def of_type(self, name: str) -> List[Clause]:
+        return self.by_type.get(name, [])
+
+    def for_question(self, question: str) -> Tuple[Tuple[str, ...], List[Clause]]:
+        """Clause types a question asks about, and the clauses of those types in document order.
+
+        A clause nested in another matching clause is left out; its text is part of the outer one.
+        """
+        names = clause_types(question)
+        candidates = {id(clause): clause for name in names for clause in self.of_type(name)}
+        selected: List[Clause] = []
+        for clause in sorted(candidates.values(), key=lambda clause: (clause.depth, clause.start)):
+            if not any(outer.start <= clause.start and clause.end <= outer.end for outer in selected):
+                selected.append(clause)
+        return names, sorted(selected, key=lambda clause: clause.start)
+
+    def containing(self, offset: int) -> Optional[Clause]:
+        """The innermost clause around a text offset."""
+        position = bisect_right(self._starts, offset) - 1
+        while position >= 0:
+            clause = self.clauses[position]
+            if clause.end > offset:
+                return clause
+            position -= 1
+        return None
+
+    def excerpt(self, clause: Clause, limit: int = 2000) -> str:
+        text = self.text[clause.start:clause.end].strip()
+        return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " ..."
+
+    def to_dict(self) -> dict:
+        return {
+            "clauses": [clause.to_dict() for clause in self.clauses],
+            "types": {name: [clause.start for clause in clauses] for name, clauses in sorted(self.by_type.items())}
+        }
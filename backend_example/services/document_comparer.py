@@ -0,0 +1,258 @@
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+import re
+import time
+import numpy as np
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+
+# Words per rolling-hash window; a window must occur once in each document to anchor them
+ANCHOR_WORDS = 12
+
+# Gaps between anchors larger than this (words x words) are not diffed word by word
+FINE_DIFF_LIMIT = 4_000_000
+
+HASH_BASE = np.uint64(0x100000001B3)
+
+# Code points str.split() treats as whitespace (all below U+3001)
+WHITESPACE = np.array([chr(code).isspace() for code in range(0x3001)] + [False])
+
+
+def rolling_hashes(values: np.ndarray, width: int) -> np.ndarray:
+    """Polynomial hash of every `width`-long window of uint64 values (wrapping arithmetic)."""
+    count = len(values) - width + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        hashes = hashes * HASH_BASE + values[offset:offset + count]
+    return hashes
+
+
+def clause_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) offsets of the paragraphs of a text."""
+    spans, start = [], 0
+    for separator in PARAGRAPH_BREAK.finditer(text):
+        if text[start:separator.start()].strip():
+            spans.append((start, separator.start()))
+        start = separator.end()
+    if text[start:].strip():
+        spans.append((start, len(text.rstrip())))
+    return spans
+
+
+class _Side:
+    """Words, word offsets and clauses of one document."""
+
+    def __init__(self, text: str, vocabulary: Dict[str, int]):
+        self.text = text
+        words = text.split()
+        self.ids = np.array([vocabulary.setdefault(word, len(vocabulary)) for word in words], dtype=np.int64)
+        # Word offsets from the whitespace mask of the code points, matching str.split()
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        space = WHITESPACE[np.minimum(codes, len(WHITESPACE) - 1)]
+        edges = np.diff(np.concatenate(([True], space, [True])).astype(np.int8))
+        self.starts = np.flatnonzero(edges == -1)
+        self.ends = np.flatnonzero(edges == 1)
+        self.clauses = clause_spans(text)
+        clause_starts = np.array([start for start, _ in self.clauses], dtype=np.int64)
+        self.clause_of_word = np.searchsorted(clause_starts, self.starts, side="right") - 1
+        # Index of the matching word in the other document, or -1
+        self.match = np.full(len(words), -1, dtype=np.int64)
+
+    def window_hashes(self) -> np.ndarray:
+        """Rolling hash of every ANCHOR_WORDS-word window."""
+        words = (self.ids.astype(np.uint64) + np.uint64(1)) * np.uint64(0x9E3779B97F4A7C15)
+        return rolling_hashes(words, ANCHOR_WORDS)
+
+    def clause(self, index: int) -> dict:
+        start, end = self.clauses[index]
+        return {"clause": index, "start": start, "end": end, "text": self.text[start:end]}
+
+    def span(self, start: int, end: int, limit: int) -> Tuple[int, int]:
+        """Character span of words [start, end); an empty range gives the insertion point before `limit`."""
+        if end > start:
+            return int(self.starts[start]), int(self.ends[end - 1])
+        position = int(self.starts[start]) if start < limit else int(self.ends[start - 1])
+        return position, position
+
+    def words_of(self, index: int) -> range:
+        return range(
+            int(np.searchsorted(self.clause_of_word, index, side="left")),
+            int(np.searchsorted(self.clause_of_word, index, side="right"))
+        )
+
+
+def _unique_positions(hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Hash values that occur exactly once, with their positions."""
+    values, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+    once = counts == 1
+    return values[once], first[once]
+
+
+def _heaviest_chain(runs: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    """Runs (a, b, length) sorted by a, keeping the chain increasing in b with the most anchors."""
+    order = sorted(set(b for _, b, _ in runs))
+    tree_best = [0] * (len(order) + 1)
+    tree_at = [-1] * (len(order) + 1)
+    best, previous = [0] * len(runs), [-1] * len(runs)
+    for position, (_, b, length) in enumerate(runs):
+        # Best chain ending at a run with a smaller b (Fenwick tree prefix maximum)
+        rank, chain, at = bisect_left(order, b), 0, -1
+        while rank > 0:
+            if tree_best[rank] > chain:
+                chain, at = tree_best[rank], tree_at[rank]
+            rank -= rank & -rank
+        best[position], previous[position] = chain + length, at
+        rank = bisect_left(order, b) + 1
+        while rank <= len(order):
+            if best[position] > tree_best[rank]:
+                tree_best[rank], tree_at[rank] = best[position], position
+            rank += rank & -rank
+    chain, position = [], max(range(len(runs)), key=best.__getitem__) if runs else -1
+    while position >= 0:
+        chain.append(runs[position])
+        position = previous[position]
+    return chain[::-1]
+
+
+class DocumentComparer:
+    """Clause-level diff of two document texts in near-linear time.
+
+    Word windows whose rolling hash occurs exactly once in each document
+    anchor the alignment; consecutive anchors are merged into runs and the
+    heaviest run chain increasing in both documents is kept. Only the gaps
+    between runs are diffed word by word, and the changed words are then
+    reported per clause with their character offsets.
+    """
+
+    def _anchor(self, base: _Side, other: _Side) -> None:
+        base_values, base_positions = _unique_positions(base.window_hashes())
+        other_values, other_positions = _unique_positions(other.window_hashes())
+        common, base_index, other_index = np.intersect1d(
+            base_values, other_values, assume_unique=True, return_indices=True
+        )
+        if not len(common):
+            return
+        a = base_positions[base_index]
+        order = np.argsort(a)
+        a, b = a[order], other_positions[other_index][order]
+
+        # Collapse anchors that continue each other into runs
+        breaks = np.flatnonzero((np.diff(a) != 1) | (np.diff(b) != 1)) + 1
+        starts = np.concatenate(([0], breaks))
+        lengths = np.diff(np.concatenate((starts, [len(a)])))
+        runs = list(zip(a[starts].tolist(), b[starts].tolist(), lengths.tolist()))
+
+        end_a = end_b = 0
+        for run_a, run_b, length in _heaviest_chain(runs):
+            # A run of n anchors covers n + ANCHOR_WORDS - 1 words; clip overlap with the previous run
+            skip = max(0, end_a - run_a, end_b - run_b)
+            words = length + ANCHOR_WORDS - 1 - skip
+            if words <= 0:
+                continue
+            run_a, run_b = run_a + skip, run_b + skip
+            base.match[run_a:run_a + words] = np.arange(run_b, run_b + words)
+            other.match[run_b:run_b + words] = np.arange(run_a, run_a + words)
+            end_a, end_b = run_a + words, run_b + words
+
+    def _fill_gaps(self, base: _Side, other: _Side) -> None:
+        """Word-level diff inside every window between anchored runs."""
+        matched = np.flatnonzero(base.match >= 0)
+        # Boundaries of the matched stretches, plus both ends of the documents
+        boundaries = [(-1, -1)]
+        if len(matched):
+            breaks = np.flatnonzero((np.diff(matched) != 1) | (np.diff(base.match[matched]) != 1))
+            for start, end in zip(np.concatenate(([0], breaks + 1)), np.concatenate((breaks, [len(matched) - 1]))):
+                boundaries.append((int(matched[start]), int(matched[end])))
+        boundaries.append((len(base.ids), len(base.ids)))
+
+        for (_, previous_end), (next_start, _) in zip(boundaries, boundaries[1:]):
+            gap_a = (previous_end + 1, next_start)
+            gap_b = (
+                int(base.match[previous_end]) + 1 if previous_end >= 0 else 0,
+                int(base.match[next_start]) if next_start < len(base.ids) else len(other.ids)
+            )
+            size_a, size_b = gap_a[1] - gap_a[0], gap_b[1] - gap_b[0]
+            if size_a <= 0 or size_b <= 0 or size_a * size_b > FINE_DIFF_LIMIT:
+                continue
+            matcher = SequenceMatcher(
+                None, base.ids[gap_a[0]:gap_a[1]].tolist(), other.ids[gap_b[0]:gap_b[1]].tolist(), autojunk=False
+            )
+            for block_a, block_b, size in matcher.get_matching_blocks():
+                if size:
+                    start_a, start_b = gap_a[0] + block_a, gap_b[0] + block_b
+                    base.match[start_a:start_a + size] = np.arange(start_b, start_b + size)
+                    other.match[start_b:start_b + size] = np.arange(start_a, start_a + size)
+
+    def _edits(self, base: _Side, other: _Side, base_clause: int, other_clause: int) -> List[dict]:
+        base_words, other_words = base.words_of(base_clause), other.words_of(other_clause)
+        matcher = SequenceMatcher(
+            None, base.ids[base_words.start:base_words.stop].tolist(),
+            other.ids[other_words.start:other_words.stop].tolist(), autojunk=False
+        )
+        edits = []
+        for operation, a_start, a_end, b_start, b_end in matcher.get_opcodes():
+            if operation == "equal":
+                continue
+            base_span = base.span(a_start + base_words.start, a_end + base_words.start, base_words.stop)
+            other_span = other.span(b_start + other_words.start, b_end + other_words.start, other_words.stop)
+            edits.append({
+                "type": operation,
+                "baseStart": base_span[0],
+                "baseEnd": base_span[1],
+                "start": other_span[0],
+                "end": other_span[1],
+                "baseText": base.text[base_span[0]:base_span[1]],
+                "text": other.text[other_span[0]:other_span[1]]
+            })
+        return edits
+
+    def compare(self, base_text: str, other_text: str) -> dict:
+        """Added, removed and changed clauses of `other_text` relative to `base_text`."""
+        started = time.perf_counter()
+        vocabulary: Dict[str, int] = {}
+        base, other = _Side(base_text, vocabulary), _Side(other_text, vocabulary)
+        self._anchor(base, other)
+        self._fill_gaps(base, other)
+
+        pairs = set()
+        removed, added, intact = [], [], set()
+        for side, partner, found, flip in ((base, other, removed, False), (other, base, added, True)):
+            unmatched = np.bincount(side.clause_of_word[side.match < 0], minlength=len(side.clauses))
+            totals = np.bincount(side.clause_of_word, minlength=len(side.clauses))
+            for index in range(len(side.clauses)):
+                if not unmatched[index]:
+                    if flip:
+                        intact.add(index)
+                    continue
+                if unmatched[index] == totals[index]:
+                    found.append(side.clause(index))
+                    continue
+                words = side.words_of(index)
+                partners = side.match[words.start:words.stop]
+                counterpart = Counter(partner.clause_of_word[partners[partners >= 0]].tolist()).most_common(1)[0][0]
+                pairs.add((counterpart, index) if flip else (index, counterpart))
+
+        changed = [
+            {"base": base.clause(base_clause), "compared": other.clause(other_clause),
+             "edits": self._edits(base, other, base_clause, other_clause)}
+            for base_clause, other_clause in sorted(pairs, key=lambda pair: (pair[1], pair[0]))
+        ]
+        matched_words = int(np.count_nonzero(other.match >= 0))
+        return {
+            "summary": {
+                "added": len(added),
+                "removed": len(removed),
+                "changed": len(changed),
+                # Clauses of the compared document with no edits on either side
+                "unchanged": len(intact - {other_clause for _, other_clause in pairs}),
+                "similarity": round(2 * matched_words / max(1, len(base.ids) + len(other.ids)), 4)
+            },
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+            "compareTimeMs": round((time.perf_counter() - started) * 1000, 2)
+        }
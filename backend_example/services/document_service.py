@@ -0,0 +1,299 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, MutableMapping, Optional
+import io
+import os
+import math
+import hashlib
+import re
+import logging
+import threading
+from collections import Counter, OrderedDict
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from services.chunk_store import ChunkStore
+from services.clause_segmenter import ClauseIndex
+from services.entity_extractor import ENTITY_VERSION, EntityIndex
+from services.pdf_scanner import pdf_metadata
+from services.revision_tracker import Revision, RevisionTracker
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Page texts are joined with a blank line, so pages always end a paragraph
+PAGE_SEPARATOR = "\n\n"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used for chunk retrieval."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def count_terms(text: str) -> Counter:
+    return Counter(tokenize(text))
+
+
+class ChunkIndex:
+    """Small in-memory TF-IDF index over the chunks of one document.
+
+    Term counts come from the chunk store, so a chunk seen in any other
+    document (an earlier revision, or shared boilerplate) is not
+    tokenized again.
+    """
+
+    def __init__(self, chunks: List[str], chunk_store: Optional[ChunkStore] = None):
+        self.size = len(chunks)
+        self.postings: Dict[str, Dict[int, int]] = {}
+        for position, chunk in enumerate(chunks):
+            if chunk_store is not None:
+                terms = chunk_store.artifact(chunk, "terms", count_terms)
+            else:
+                terms = count_terms(chunk)
+            for term, count in terms.items():
+                self.postings.setdefault(term, {})[position] = count
+
+    def search(self, query: str, k: int = 4) -> List[int]:
+        """Return the positions of the k best matching chunks, in document order."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + self.size / len(postings))
+            for position, count in postings.items():
+                scores[position] = scores.get(position, 0.0) + (1 + math.log(count)) * idf
+
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        if not best:
+            # Nothing matched, fall back to the beginning of the document
+            best = list(range(min(k, self.size)))
+        return sorted(best)
+
+
+@dataclass
+class DocumentContext:
+    """Extracted text, chunks, retrieval and clause indexes for one uploaded file."""
+    file_id: str
+    filename: str
+    text: str
+    chunks: List[str] = field(default_factory=list)
+    index: Optional[ChunkIndex] = None
+    revision: Optional[Revision] = None
+    # Offset in `text` where each page starts
+    page_starts: List[int] = field(default_factory=list)
+    clauses: Optional[ClauseIndex] = None
+    entities: Optional[EntityIndex] = None
+
+    def pages(self) -> List[str]:
+        ends = self.page_starts[1:] + [len(self.text)]
+        return [self.text[start:end] for start, end in zip(self.page_starts, ends)]
+
+    def relevant_chunks(self, query: str, k: int = 4) -> List[str]:
+        # A question about a clause gets that clause rather than the best matching chunks
+        if self.clauses is not None:
+            _, clauses = self.clauses.for_question(query)
+            if clauses:
+                return [self.clauses.excerpt(clause) for clause in clauses[:k]]
+        if self.index is None:
+            return self.chunks[:k]
+        return [self.chunks[position] for position in self.index.search(query, k)]
+
+
+class DocumentService:
+    def __init__(
+        self,
+        files: Optional[MutableMapping[str, dict]] = None,
+        revisions: Optional[RevisionTracker] = None,
+        chunk_store: Optional[ChunkStore] = None
+    ):
+        # Same chunking parameters as the chat context in OpenAIService
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=2000,
+            chunk_overlap=200,
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""]
+        )
+        # file_id -> uploaded file record (filename, content_type, size, uploaded_at, content)
+        self.files: MutableMapping[str, dict] = files if files is not None else {}
+        # Contexts and page texts of this many recently used files stay in memory
+        self.memory_size = int(os.getenv("DOCUMENT_CACHE_SIZE", "64"))
+        self._contexts: "OrderedDict[str, DocumentContext]" = OrderedDict()
+        # Links new versions of a document to the previous one
+        self.revisions = revisions
+        # Chunks and their term counts, shared across documents
+        self.chunk_store = chunk_store if chunk_store is not None else ChunkStore()
+        # Extracted page texts waiting to be turned into a context
+        self._pages: "OrderedDict[str, List[str]]" = OrderedDict()
+        # One extraction per file, even when several requests ask for it at once
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def _remember(self, cache: OrderedDict, file_id: str, value) -> None:
+        with self._lock:
+            cache[file_id] = value
+            cache.move_to_end(file_id)
+            while len(cache) > self.memory_size:
+                cache.popitem(last=False)
+
+    def _recall(self, cache: OrderedDict, file_id: str):
+        with self._lock:
+            value = cache.get(file_id)
+            if value is not None:
+                cache.move_to_end(file_id)
+            return value
+
+    def extract_pages(self, content: bytes, content_type: Optional[str], filename: str) -> List[str]:
+        """Extract plain text per page from PDF uploads; Word and text files are one page."""
+        name = (filename or "").lower()
+        try:
+            if name.endswith(".pdf") or content_type == "application/pdf":
+                from PyPDF2 import PdfReader
+                reader = PdfReader(io.BytesIO(content))
+                return [page.extract_text() or "" for page in reader.pages]
+            if name.endswith(".docx"):
+                from docx import Document
+                document = Document(io.BytesIO(content))
+                return ["\n\n".join(paragraph.text for paragraph in document.paragraphs)]
+        except Exception as e:
+            logger.warning(f"Structured extraction failed for {filename}, decoding as text: {str(e)}")
+
+        try:
+            return [content.decode("utf-8")]
+        except UnicodeDecodeError:
+            return [content.decode("latin-1")]
+
+    def extract_text(self, content: bytes, content_type: Optional[str], filename: str) -> str:
+        """Extract plain text from PDF, Word or text uploads."""
+        return "\n\n".join(self.extract_pages(content, content_type, filename))
+
+    def scan_pdf(self, content: bytes) -> Optional[dict]:
+        """Structural record of a PDF (xref layout, page count, Info), or None if it cannot be read."""
+        if not content.startswith(b"%PDF-"):
+            return None
+        try:
+            return pdf_metadata(content)
+        except Exception as e:
+            logger.warning(f"PDF structure scan failed: {str(e)}")
+            return None
+
+    def get_metadata(self, file_id: str) -> dict:
+        """The stored upload record without its content."""
+        return {key: value for key, value in self.files[file_id].items() if key != "content"}
+
+    def content_path(self, file_id: str) -> Optional[str]:
+        """Path of the stored bytes, if the file store keeps them on disk."""
+        path = getattr(self.files, "path", None)
+        return path(file_id) if path is not None else None
+
+    def get_content_hash(self, file_id: str) -> str:
+        """SHA-256 of the uploaded bytes, computed at upload time."""
+        file_info = self.files[file_id]
+        content_hash = file_info.get("content_hash")
+        if content_hash is None:
+            content_hash = hashlib.sha256(file_info["content"]).hexdigest()
+            file_info["content_hash"] = content_hash
+        return content_hash
+
+    def get_pages(self, file_id: str) -> List[str]:
+        """Cleaned page texts of an uploaded file."""
+        context = self._recall(self._contexts, file_id)
+        if context is not None:
+            return context.pages()
+        pages = self._recall(self._pages, file_id)
+        if pages is None:
+            file_info = self.files[file_id]
+            pages = [
+                page.replace("\x00", "") for page in
+                self.extract_pages(file_info["content"], file_info.get("content_type"), file_info["filename"])
+            ]
+            self._remember(self._pages, file_id, pages)
+        return pages
+
+    def get_revision(self, file_id: str) -> Optional[Revision]:
+        """Where this file sits among the versions of its document, registering it on first use."""
+        if self.revisions is None:
+            return None
+        revision = self.revisions.get(file_id)
+        if revision is None:
+            file_info = self.files[file_id]
+            revision = self.revisions.register(
+                file_id, file_info["filename"], self.get_pages(file_id), file_info.get("uploaded_at")
+            )
+        return revision
+
+    def get_context(self, file_id: str) -> DocumentContext:
+        """Load (once while it stays cached) the text, chunks and index for an uploaded file."""
+        context = self._recall(self._contexts, file_id)
+        if context is not None:
+            return context
+
+        with self._lock:
+            loading = self._loading.setdefault(file_id, threading.Lock())
+        try:
+            with loading:
+                context = self._recall(self._contexts, file_id)
+                if context is None:
+                    context = self._build_context(file_id)
+            return context
+        finally:
+            with self._lock:
+                self._loading.pop(file_id, None)
+
+    def _build_context(self, file_id: str) -> DocumentContext:
+        file_info = self.files[file_id]
+        pages = self.get_pages(file_id)
+        joined = PAGE_SEPARATOR.join(pages)
+        text = joined.strip()
+        # Page offsets in the stripped text
+        leading, page_starts, offset = len(joined) - len(joined.lstrip()), [], 0
+        for page in pages:
+            page_starts.append(min(max(0, offset - leading), len(text)))
+            offset += len(page) + len(PAGE_SEPARATOR)
+        if not text:
+            self.forget(file_id)
+            raise ValueError("Empty document text after cleaning")
+
+        # Chunks seen in earlier revisions or other documents share one copy and its term counts
+        chunks = [self.chunk_store.intern(chunk) for chunk in self.text_splitter.split_text(text)]
+        context = DocumentContext(
+            file_id=file_id,
+            filename=file_info["filename"],
+            text=text,
+            chunks=chunks,
+            index=ChunkIndex(chunks, self.chunk_store),
+            revision=self.get_revision(file_id),
+            page_starts=page_starts,
+            clauses=ClauseIndex(text),
+            entities=self._entities(file_id, text)
+        )
+        self._remember(self._contexts, file_id, context)
+        with self._lock:
+            self._pages.pop(file_id, None)
+        logger.info(
+            f"Built document context for {file_id}: {len(chunks)} chunks, "
+            f"{len(context.clauses.clauses)} clauses, {len(context.entities.entities)} entities"
+        )
+        return context
+
+    def _entities(self, file_id: str, text: str) -> EntityIndex:
+        """Entity spans stored with the upload, extracted and stored on first use."""
+        file_info = self.files[file_id]
+        if file_info.get("entities_version") == ENTITY_VERSION:
+            return EntityIndex.from_dicts(file_info["entities"])
+        entities = EntityIndex.from_text(text)
+        fields = {"entities": entities.to_dicts(), "entities_version": ENTITY_VERSION}
+        update_record = getattr(self.files, "update_record", None)
+        if update_record is not None:
+            update_record(file_id, fields)
+        else:
+            file_info.update(fields)
+        return entities
+
+    def get_entities(self, file_id: str) -> EntityIndex:
+        """Parties, dates, amounts and jurisdictions of an uploaded file."""
+        return self.get_context(file_id).entities
+
+    def forget(self, file_id: str) -> None:
+        with self._lock:
+            self._contexts.pop(file_id, None)
+            self._pages.pop(file_id, None)
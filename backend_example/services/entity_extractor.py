@@ -0,0 +1,239 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import re
+
+# Bump when extraction changes so spans stored with uploads are extracted again
+ENTITY_VERSION = "1"
+
+# Kinds of entity, in the order they are reported
+ENTITY_KINDS = ("party", "date", "ambiguous_date", "amount", "jurisdiction")
+
+# Entity kind -> words that ask about it in a question
+ENTITY_QUESTIONS: Dict[str, str] = {
+    "party": r"who|parties|party|signator(?:y|ies)",
+    "date": r"when|dates?|dated|effective",
+    "amount": r"how much|amounts?|sums?",
+    "jurisdiction": r"jurisdiction|which (?:law|laws|court|courts|state|country)"
+}
+QUESTION_PATTERNS = {kind: re.compile(rf"\b(?:{pattern})\b") for kind, pattern in ENTITY_QUESTIONS.items()}
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+MONTH = r"(?i:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+
+# A capitalized name of up to seven words, e.g. "Jane Smith", "Bank of America";
+# a dot only ends an initial ("J. Smith"), never a sentence
+NAME_WORD = r"[A-Z](?:[\w&'-]*|\.)"
+NAME = rf"(?!(?:The|This|That|These|Such|Each|Any|Said|Either|Neither|All)\b){NAME_WORD}(?:[ \t]+(?:{NAME_WORD}|&|of|de|van|von)){{0,6}}"
+COMPANY_SUFFIX = r",?[ \t]+(?:Inc|Incorporated|LLC|L\.L\.C|Ltd|Limited|Corp|Corporation|Company|Co|LLP|LP|L\.P|GmbH|PLC|plc|AG|S\.A|N\.V|B\.V)\b\.?"
+PARTY_NAME = rf"{NAME}(?:{COMPANY_SUFFIX})?"
+# ", a Delaware corporation (the "Company")" after a party name
+PARTY_ROLE = r"(?:,?\s+an?\s+[^(),\n]{{1,60}})?,?\s*(?:\((?:the\s+|hereinafter\s+(?:referred\s+to\s+as\s+)?(?:the\s+)?)?[\"“”](?P<{}>[^\"“”\n]{{1,40}})[\"“”]\))?"
+ROLE_LABEL = (
+    r"(?i:landlord|tenant|lessor|lessee|buyer|seller|purchaser|vendor|client|contractor|consultant|employer|employee"
+    r"|grantor|grantee|principal|agent|attorney-in-fact|licensor|licensee|borrower|lender|guarantor|testator|testatrix"
+    r"|executor|executrix|affiant|party [ab12])"
+)
+PLACE = r"[A-Z][a-z]+(?:[ \t]+(?:and[ \t]+)?[A-Z][a-z]+){0,3}"
+NUMBER = r"\d{1,3}(?:,\d{3})+|\d+"
+CURRENCIES = {"$": "USD", "us$": "USD", "usd": "USD", "dollars": "USD", "€": "EUR", "eur": "EUR", "euros": "EUR",
+              "£": "GBP", "gbp": "GBP", "pounds": "GBP", "pounds sterling": "GBP"}
+SCALES = {"thousand": 1e3, "million": 1e6, "billion": 1e9}
+
+
+@dataclass
+class Entity:
+    kind: str
+    # As written in the text
+    text: str
+    # Normalized: a name, an ISO date, "5000.00 USD", a place
+    value: str
+    start: int
+    end: int
+    # Defined term of a party, e.g. "Tenant"
+    role: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "text": self.text,
+            "value": self.value,
+            "start": self.start,
+            "end": self.end,
+            "role": self.role
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Entity":
+        return cls(data["kind"], data["text"], data["value"], data["start"], data["end"], data.get("role"))
+
+
+def _party(match: re.Match, name_group: str, role_group: Optional[str] = None, role: Optional[str] = None) -> Entity:
+    start, end = match.span(name_group)
+    name = match.group(name_group).rstrip(",. ")
+    if role_group is not None and match.group(role_group):
+        role = match.group(role_group).strip()
+    return Entity("party", name, name, start, start + len(name) if name else end, role)
+
+
+def _between(match: re.Match) -> List[Entity]:
+    return [_party(match, "party_a", "role_a"), _party(match, "party_b", "role_b")]
+
+
+def _labelled(match: re.Match) -> List[Entity]:
+    return [_party(match, "labelled", role=match.group("label").strip().title())]
+
+
+def _declarant(match: re.Match) -> List[Entity]:
+    return [_party(match, "declarant")]
+
+
+def _company(match: re.Match) -> List[Entity]:
+    return [_party(match, "company")]
+
+
+def _date(match: re.Match, prefix: str) -> List[Entity]:
+    month = match.group(f"{prefix}_month")
+    month = int(month) if month.isdigit() else MONTHS[month[:3].lower()]
+    try:
+        value = date(int(match.group(f"{prefix}_year")), month, int(match.group(f"{prefix}_day")))
+    except ValueError:
+        # "February 30, 2024" is not a date
+        return []
+    return [Entity("date", match.group(0), value.isoformat(), match.start(), match.end())]
+
+
+def _ambiguous_date(match: re.Match) -> List[Entity]:
+    return [Entity("ambiguous_date", match.group(0), match.group(0), match.start(), match.end())]
+
+
+def _amount(match: re.Match, suffix: str = "") -> List[Entity]:
+    amount = float(match.group(f"number{suffix}").replace(",", "") + (match.group(f"cents{suffix}") or ""))
+    scale = match.group(f"scale{suffix}")
+    if scale:
+        amount *= SCALES[scale.lower()]
+    currency = CURRENCIES[match.group(f"currency{suffix}").lower()]
+    return [Entity("amount", match.group(0), f"{amount:.2f} {currency}", match.start(), match.end())]
+
+
+def _jurisdiction(match: re.Match) -> List[Entity]:
+    start, end = match.span("place")
+    place = match.group("place")
+    value = re.sub(r"^(?:State|Commonwealth|Province|Republic|Kingdom)\s+of\s+", "", place)
+    return [Entity("jurisdiction", place, value, start, end)]
+
+
+# Every alternative of the combined scanner and what it yields
+ALTERNATIVES: List[Tuple[str, Callable[[re.Match], List[Entity]]]] = [
+    (
+        rf"\b(?i:between)\s+(?P<party_a>{PARTY_NAME}){PARTY_ROLE.format('role_a')}"
+        rf",?\s+and\s+(?P<party_b>{PARTY_NAME}){PARTY_ROLE.format('role_b')}",
+        _between
+    ),
+    # "Tenant: Globex LLC" at the start of a line
+    (rf"^(?P<label>{ROLE_LABEL})[ \t]*:[ \t]*(?P<labelled>{PARTY_NAME})", _labelled),
+    (rf"\bI,[ \t]+(?P<declarant>{NAME}),", _declarant),
+    (rf"\b(?P<company>{NAME}{COMPANY_SUFFIX})", _company),
+    (
+        rf"\b(?P<d1_month>{MONTH})\.?[ \t]+(?P<d1_day>\d{{1,2}})(?:st|nd|rd|th)?,?[ \t]+(?P<d1_year>\d{{4}})\b",
+        lambda match: _date(match, "d1")
+    ),
+    (
+        rf"\b(?P<d2_day>\d{{1,2}})(?:st|nd|rd|th)?[ \t]+(?:(?i:day)[ \t]+(?i:of)[ \t]+)?(?P<d2_month>{MONTH})\.?,?[ \t]+(?P<d2_year>\d{{4}})\b",
+        lambda match: _date(match, "d2")
+    ),
+    (r"\b(?P<d3_year>\d{4})-(?P<d3_month>\d{2})-(?P<d3_day>\d{2})\b", lambda match: _date(match, "d3")),
+    (r"\b\d{1,2}/\d{1,2}/\d{2,4}\b", _ambiguous_date),
+    (
+        rf"(?P<currency>[$€£]|(?:US\$|USD|EUR|GBP)(?=[ \t]?\d))[ \t]?(?P<number>{NUMBER})(?P<cents>\.\d{{1,2}})?\b"
+        r"(?:[ \t](?P<scale>(?i:thousand|million|billion))\b)?",
+        _amount
+    ),
+    (
+        rf"\b(?P<number_word>{NUMBER})(?P<cents_word>\.\d{{1,2}})?(?:[ \t](?P<scale_word>(?i:thousand|million|billion)))?"
+        r"[ \t](?P<currency_word>(?i:dollars|euros|pounds(?: sterling)?|usd|eur|gbp))\b",
+        lambda match: _amount(match, "_word")
+    ),
+    (
+        rf"\b(?i:laws?|courts?)\s+of\s+(?:the\s+)?(?P<place>(?:State|Commonwealth|Province|Republic|Kingdom)\s+of\s+{PLACE}|{PLACE})",
+        _jurisdiction
+    )
+]
+
+# One pass over the text finds every kind of entity. Every alternative
+# starts a word (or a currency symbol), so the guard in front rejects
+# every other position before any alternative is tried.
+SCANNER = re.compile(
+    r"(?<!\w)(?=[\w$€£])(?:"
+    + "|".join(f"(?P<e{position}>{pattern})" for position, (pattern, _) in enumerate(ALTERNATIVES))
+    + ")",
+    re.MULTILINE
+)
+
+
+def extract_entities(text: str) -> List[Entity]:
+    """Parties, dates, amounts and jurisdictions of a text, in order of appearance."""
+    entities: List[Entity] = []
+    for match in SCANNER.finditer(text):
+        # The wrapping group closes last, so it is the last group
+        entities.extend(ALTERNATIVES[int(match.lastgroup[1:])][1](match))
+    return entities
+
+
+def entity_kinds(question: str) -> Tuple[str, ...]:
+    """Entity kinds a question asks about."""
+    lowered = question.lower()
+    return tuple(kind for kind, pattern in QUESTION_PATTERNS.items() if pattern.search(lowered))
+
+
+class EntityIndex:
+    """Typed entity spans of one document, extracted once at upload.
+
+    Checks, summaries and chat read entities from here (or from the
+    stored upload record) instead of scanning the text again.
+    """
+
+    def __init__(self, entities: Iterable[Entity]):
+        self.entities = list(entities)
+        self.by_kind: Dict[str, List[Entity]] = {kind: [] for kind in ENTITY_KINDS}
+        for entity in self.entities:
+            self.by_kind[entity.kind].append(entity)
+
+    @classmethod
+    def from_text(cls, text: str) -> "EntityIndex":
+        return cls(extract_entities(text))
+
+    @classmethod
+    def from_dicts(cls, entities: Iterable[dict]) -> "EntityIndex":
+        return cls(Entity.from_dict(entity) for entity in entities)
+
+    def of_kind(self, kind: str) -> List[Entity]:
+        return self.by_kind.get(kind, [])
+
+    def values(self, kind: str, limit: int = 10) -> List[str]:
+        """Distinct values of one kind, in order of first appearance."""
+        seen: Dict[str, None] = {}
+        for entity in self.of_kind(kind):
+            value = f"{entity.value} ({entity.role})" if entity.role else entity.value
+            seen.setdefault(value, None)
+        return list(seen)[:limit]
+
+    def key_facts(self) -> Dict[str, List[str]]:
+        return {
+            "parties": self.values("party"),
+            "dates": self.values("date"),
+            "amounts": self.values("amount"),
+            "jurisdictions": self.values("jurisdiction")
+        }
+
+    def describe(self) -> str:
+        """Key facts as prompt lines, empty when none were found."""
+        return "\n".join(
+            f"{name.capitalize()}: {'; '.join(values)}" for name, values in self.key_facts().items() if values
+        )
+
+    def to_dicts(self) -> List[dict]:
+        return [entity.to_dict() for entity in self.entities]
@@ -0,0 +1,153 @@
+from typing import List, Tuple
+import re
+import numpy as np
+from services.document_service import tokenize
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?;])\s+(?=[A-Z0-9(\"'])|\n")
+# A line break before a lowercase word only wraps a sentence
+WRAPPED_LINE = re.compile(r"\n[ \t]*(?=[a-z])")
+
+# Longer sentences (run-on lists, tables) are cut into pieces of at most this many characters
+MAX_SENTENCE_LENGTH = 400
+MAX_SUMMARY_LENGTH = 2000
+
+STOP_WORDS = frozenset("""
+a an and are as at be been by for from has have in is it its of on or shall that the
+their then there these this to was were which will with any all such not no other
+""".split())
+
+
+class ExtractiveSummarizer:
+    """Local summarizer: TextRank over TF-IDF sentence vectors, no network calls.
+
+    The sentence similarity matrix S = X X^T is never materialized. X is kept
+    as flat sparse arrays (row, column, weight) and every product with S is
+    done as two bincounts, so each iteration is linear in the number of
+    non-zero entries.
+    """
+
+    def __init__(self, damping: float = 0.85, iterations: int = 30, tolerance: float = 1e-6):
+        self.damping = damping
+        self.iterations = iterations
+        self.tolerance = tolerance
+
+    def split_sentences(self, text: str) -> List[str]:
+        sentences = []
+        for sentence in SENTENCE_PATTERN.split(WRAPPED_LINE.sub(" ", text)):
+            for piece in self._pieces(" ".join(sentence.split())):
+                # Skip headings, page numbers and other fragments
+                if len(piece) >= 25 and len(piece.split()) >= 5:
+                    sentences.append(piece)
+        return sentences
+
+    def _pieces(self, sentence: str) -> List[str]:
+        """The sentence cut at word boundaries into pieces of at most MAX_SENTENCE_LENGTH characters."""
+        pieces = []
+        while len(sentence) > MAX_SENTENCE_LENGTH:
+            cut = sentence.rfind(" ", 0, MAX_SENTENCE_LENGTH + 1)
+            if cut <= 0:
+                cut = MAX_SENTENCE_LENGTH
+            pieces.append(sentence[:cut].rstrip())
+            sentence = sentence[cut:].lstrip()
+        pieces.append(sentence)
+        return pieces
+
+    def _tfidf(self, sentences: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """Return L2-normalized TF-IDF entries as (rows, cols, weights, vocabulary size)."""
+        vocabulary = {}
+        rows, cols = [], []
+        for position, sentence in enumerate(sentences):
+            for term in tokenize(sentence):
+                if term in STOP_WORDS or len(term) < 2:
+                    continue
+                rows.append(position)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        if rows.size == 0:
+            return rows, cols, np.zeros(0), len(vocabulary)
+
+        # Collapse repeated (sentence, term) pairs into counts
+        pairs, counts = np.unique(rows * len(vocabulary) + cols, return_counts=True)
+        rows, cols = np.divmod(pairs, len(vocabulary))
+
+        document_frequency = np.bincount(cols, minlength=len(vocabulary))
+        idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1.0
+        weights = (1.0 + np.log(counts)) * idf[cols]
+
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(sentences)))
+        weights = weights / np.where(norms > 0, norms, 1.0)[rows]
+        return rows, cols, weights, len(vocabulary)
+
+    def score_sentences(self, sentences: List[str]) -> np.ndarray:
+        """TextRank scores for the given sentences."""
+        n = len(sentences)
+        rows, cols, weights, vocabulary_size = self._tfidf(sentences)
+        if n == 0 or weights.size == 0:
+            return np.zeros(n)
+
+        self_similarity = np.bincount(rows, weights=weights ** 2, minlength=n)
+
+        def similarity_product(vector: np.ndarray) -> np.ndarray:
+            # S v = X (X^T v) - diag(S) v, dropping each sentence's self-similarity
+            term_totals = np.bincount(cols, weights=weights * vector[rows], minlength=vocabulary_size)
+            product = np.bincount(rows, weights=weights * term_totals[cols], minlength=n)
+            return product - self_similarity * vector
+
+        degree = similarity_product(np.ones(n))
+        degree = np.where(degree > 1e-12, degree, 1.0)
+
+        scores = np.full(n, 1.0 / n)
+        for _ in range(self.iterations):
+            updated = (1 - self.damping) / n + self.damping * similarity_product(scores / degree)
+            if np.abs(updated - scores).sum() < self.tolerance:
+                scores = updated
+                break
+            scores = updated
+        return scores
+
+    def summarize(self, text: str, summary_sentences: int = 5, key_points: int = 5) -> dict:
+        """Produce the `summary` / `keyPoints` response for a document text."""
+        sentences = self.split_sentences(text)
+        if not sentences:
+            # Too short or fragmentary to rank: the summary is the beginning of the document
+            lead = " ".join(text.split())
+            if not lead:
+                raise ValueError("Document has no text to summarize")
+            return {"summary": self._shorten(lead, MAX_SUMMARY_LENGTH), "keyPoints": [self._shorten(lead)]}
+
+        scores = self.score_sentences(sentences)
+        ranked = self._drop_redundant(sentences, np.argsort(-scores, kind="stable"))
+
+        summary_positions = []
+        length = 0
+        for position in ranked[:summary_sentences]:
+            if summary_positions and length + len(sentences[position]) > MAX_SUMMARY_LENGTH:
+                break
+            summary_positions.append(position)
+            length += len(sentences[position]) + 1
+        summary_positions.sort()
+        return {
+            "summary": " ".join(sentences[position] for position in summary_positions),
+            "keyPoints": [self._shorten(sentences[position]) for position in ranked[:key_points]]
+        }
+
+    def _drop_redundant(self, sentences: List[str], order: np.ndarray, limit: int = 20) -> List[int]:
+        """Walk sentences by rank and skip near-repeats of already chosen ones."""
+        chosen: List[int] = []
+        chosen_terms: List[set] = []
+        for position in order:
+            terms = set(tokenize(sentences[position])) - STOP_WORDS
+            if any(len(terms & other) / max(1, len(terms | other)) > 0.6 for other in chosen_terms):
+                continue
+            chosen.append(int(position))
+            chosen_terms.append(terms)
+            if len(chosen) >= limit:
+                break
+        return chosen
+
+    def _shorten(self, sentence: str, max_length: int = 200) -> str:
+        if len(sentence) <= max_length:
+            return sentence
+        return sentence[:max_length].rsplit(" ", 1)[0] + "..."
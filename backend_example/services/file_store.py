@@ -0,0 +1,119 @@
+from typing import Iterator
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import os
+import re
+import json
+import threading
+
+# file_ids are UUIDs; anything else must never reach the filesystem
+FILE_ID_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+class StoredRecord(dict):
+    """An upload record whose `content` is read from disk whenever it is accessed."""
+
+    def __init__(self, fields: dict, content_path: str):
+        super().__init__(fields)
+        self.content_path = content_path
+
+    def __missing__(self, key: str) -> bytes:
+        if key != "content":
+            raise KeyError(key)
+        with open(self.content_path, "rb") as content_file:
+            return content_file.read()
+
+
+class FileStore(MutableMapping):
+    """Uploaded file records, persisted on disk with their metadata cached in memory.
+
+    Each upload is written as <file_id>.bin (content) and <file_id>.json
+    (everything else), so records survive restarts and are visible to every
+    worker process sharing the directory. Only the metadata of the
+    `memory_size` most recently used records is kept in memory; content is
+    always read from disk (the OS page cache keeps hot files in memory).
+    """
+
+    def __init__(self, directory: str, memory_size: int = 10000):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.memory_size = memory_size
+        self._records: "OrderedDict[str, StoredRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, file_id: str) -> str:
+        """Path of the stored content, e.g. for memory-mapping."""
+        if not FILE_ID_PATTERN.match(file_id):
+            raise KeyError(file_id)
+        return os.path.join(self.directory, f"{file_id}.bin")
+
+    def _meta_path(self, file_id: str) -> str:
+        return os.path.join(self.directory, f"{file_id}.json")
+
+    def __contains__(self, file_id: object) -> bool:
+        if not isinstance(file_id, str):
+            return False
+        if file_id in self._records:
+            return True
+        return bool(FILE_ID_PATTERN.match(file_id)) and os.path.exists(self._meta_path(file_id))
+
+    def _remember(self, file_id: str, record: StoredRecord) -> None:
+        with self._lock:
+            self._records[file_id] = record
+            self._records.move_to_end(file_id)
+            while len(self._records) > self.memory_size:
+                self._records.popitem(last=False)
+
+    def _write_meta(self, file_id: str, meta: dict) -> None:
+        with open(self._meta_path(file_id) + ".tmp", "w", encoding="utf-8") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(self._meta_path(file_id) + ".tmp", self._meta_path(file_id))
+
+    def __getitem__(self, file_id: str) -> dict:
+        with self._lock:
+            record = self._records.get(file_id)
+            if record is not None:
+                self._records.move_to_end(file_id)
+                return record
+        if file_id not in self:
+            raise KeyError(file_id)
+
+        with open(self._meta_path(file_id), encoding="utf-8") as meta_file:
+            record = StoredRecord(json.load(meta_file), self.path(file_id))
+        self._remember(file_id, record)
+        return record
+
+    def __setitem__(self, file_id: str, record: dict) -> None:
+        content_path = self.path(file_id)
+        meta = {key: value for key, value in record.items() if key != "content"}
+        # Write content first; the metadata file marks the upload as complete
+        with open(content_path + ".tmp", "wb") as content_file:
+            content_file.write(record["content"])
+        os.replace(content_path + ".tmp", content_path)
+        self._write_meta(file_id, meta)
+        self._remember(file_id, StoredRecord(meta, content_path))
+
+    def update_record(self, file_id: str, fields: dict) -> None:
+        """Add fields to a stored record, rewriting only its metadata file."""
+        record = self[file_id]
+        record.update(fields)
+        self._write_meta(file_id, dict(record))
+
+    def __delitem__(self, file_id: str) -> None:
+        if file_id not in self:
+            raise KeyError(file_id)
+        with self._lock:
+            self._records.pop(file_id, None)
+        for path in (self._meta_path(file_id), self.path(file_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def __iter__(self) -> Iterator[str]:
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                yield name[:-len(".json")]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
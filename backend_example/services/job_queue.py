@@ -0,0 +1,199 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stages TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    available_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, available_at);
+"""
+
+
+class JobQueue:
+    """Durable job queue in a local SQLite database (WAL mode).
+
+    Workers lease jobs for a visibility timeout. A job whose lease expires
+    (worker crashed or was recycled) becomes available to any other worker
+    process using the same database file, until max_attempts is reached.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _row_to_dict(self, row: sqlite3.Row) -> dict:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "params": json.loads(row["params"]),
+            "status": row["status"],
+            "stages": json.loads(row["stages"]),
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "updated_at": row["updated_at"]
+        }
+
+    def enqueue(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        max_attempts: int = 3
+    ) -> dict:
+        """Add a job, or return the existing one with the same idempotency key."""
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, kind, params, status, max_attempts, idempotency_key,"
+                    " available_at, updated_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(params), JOB_QUEUED, max_attempts, idempotency_key,
+                     now, now, datetime.now().isoformat())
+                )
+            except sqlite3.IntegrityError:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+                return self._row_to_dict(row)
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row)
+
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[dict]:
+        """Claim the next available job for visibility_timeout seconds."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose last allowed attempt timed out are given up on
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = 'Worker lease expired', finished_at = ?,"
+                    " lease_owner = NULL, updated_at = ?"
+                    " WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts",
+                    (JOB_FAILED, datetime.now().isoformat(), now, JOB_RUNNING, now)
+                )
+                row = self._conn.execute(
+                    "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires_at = ?,"
+                    " attempts = attempts + 1, started_at = COALESCE(started_at, ?), updated_at = ?"
+                    " WHERE id = (SELECT id FROM jobs"
+                    "   WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?)"
+                    "   ORDER BY available_at LIMIT 1)"
+                    " RETURNING *",
+                    (JOB_RUNNING, worker_id, now + visibility_timeout, datetime.now().isoformat(), now,
+                     JOB_QUEUED, now, JOB_RUNNING, now)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._row_to_dict(row) if row is not None else None
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float,
+                  stages: Optional[Dict[str, float]] = None) -> bool:
+        """Extend the lease (and optionally save progress). False if the lease was lost."""
+        now = time.time()
+        with self._lock:
+            if stages is None:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                    (now + visibility_timeout, job_id, worker_id, JOB_RUNNING)
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ?, stages = ?, updated_at = ?"
+                    " WHERE id = ? AND lease_owner = ? AND status = ?",
+                    (now + visibility_timeout, json.dumps(stages), now, job_id, worker_id, JOB_RUNNING)
+                )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: dict) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ?, lease_owner = NULL, updated_at = ?"
+                " WHERE id = ? AND lease_owner = ? AND status = ?",
+                (JOB_SUCCEEDED, json.dumps(result), datetime.now().isoformat(), time.time(),
+                 job_id, worker_id, JOB_RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Record a failed attempt; requeue with exponential backoff while attempts remain."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET"
+                " status = CASE WHEN ? AND attempts < max_attempts THEN ? ELSE ? END,"
+                " finished_at = CASE WHEN ? AND attempts < max_attempts THEN NULL ELSE ? END,"
+                " available_at = ? + (1 << attempts), error = ?, lease_owner = NULL, updated_at = ?"
+                " WHERE id = ? AND lease_owner = ? AND status = ?",
+                (retry, JOB_QUEUED, JOB_FAILED, retry, datetime.now().isoformat(), now, error, now,
+                 job_id, worker_id, JOB_RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, worker_id: str) -> int:
+        """Hand back every job leased by a worker that is shutting down cleanly."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts - 1, lease_owner = NULL,"
+                " available_at = ?, updated_at = ? WHERE lease_owner = ? AND status = ?",
+                (JOB_QUEUED, now, now, worker_id, JOB_RUNNING)
+            )
+        return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row is not None else None
+
+    def count_queued(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (JOB_QUEUED,)
+            ).fetchone()[0]
+
+    def prune(self, retention_seconds: float) -> int:
+        """Delete finished jobs not updated within the retention period."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*FINISHED_STATUSES, time.time() - retention_seconds)
+            )
+        return cursor.rowcount
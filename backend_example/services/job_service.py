@@ -0,0 +1,198 @@
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import os
+import socket
+import asyncio
+import logging
+from services.job_queue import FINISHED_STATUSES, JobQueue
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Failures that will not go away by retrying
+PERMANENT_ERRORS = (ValueError, KeyError)
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job backlog is at capacity."""
+
+
+@dataclass
+class Job:
+    """A job leased by this process, handed to the job handler."""
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    worker_id: str
+    queue: JobQueue = field(repr=False)
+    visibility_timeout: float = 120.0
+    # stage name -> progress between 0 and 1, in the order stages were reported
+    stages: Dict[str, float] = field(default_factory=dict)
+    # Writes progress to the queue in a thread, one write at a time
+    _saving: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+    _unsaved: bool = field(default=False, init=False, repr=False)
+
+    def report(self, stage: str, progress: float) -> None:
+        self.stages[stage] = round(min(max(progress, 0.0), 1.0), 3)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called from a worker thread: already off the event loop
+            self._save_stages()
+            return
+        self._unsaved = True
+        # Reports that arrive while a write is in flight are coalesced into the next one
+        if self._saving is None or self._saving.done():
+            self._saving = loop.create_task(self._save_pending())
+
+    def _save_stages(self) -> None:
+        try:
+            self.queue.heartbeat(self.id, self.worker_id, self.visibility_timeout, dict(self.stages))
+        except Exception as e:
+            logger.warning(f"Could not save progress of job {self.id}: {str(e)}")
+
+    async def _save_pending(self) -> None:
+        while self._unsaved:
+            self._unsaved = False
+            await asyncio.to_thread(self._save_stages)
+
+
+JobHandler = Callable[[Job], Awaitable[dict]]
+
+
+class JobManager:
+    """Bounded worker pool pulling analysis jobs from the durable JobQueue.
+
+    Every API process runs its own workers against the same database file, so
+    any process can pick up jobs submitted (or abandoned) by another.
+    """
+
+    def __init__(self, handler: JobHandler, queue: JobQueue):
+        self.handler = handler
+        self.queue = queue
+        self.max_workers = int(os.getenv("JOB_WORKERS", "2"))
+        self.max_queued = int(os.getenv("JOB_MAX_QUEUED", "100"))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.visibility_timeout = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+        self.poll_interval = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+        self.retention_seconds = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+        self._workers: List[asyncio.Task] = []
+        self._worker_ids: List[str] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._worker_ids = [f"{prefix}:{worker}" for worker in range(self.max_workers)]
+        self._workers = [
+            asyncio.create_task(self._work(worker_id)) for worker_id in self._worker_ids
+        ]
+        logger.info(f"Started {self.max_workers} job workers on {self.queue.path}")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        # Hand in-flight jobs straight back instead of waiting for their leases to expire
+        released = sum(self.queue.release(worker_id) for worker_id in self._worker_ids)
+        if released:
+            logger.info(f"Released {released} in-flight jobs for other workers")
+        self._workers = []
+
+    def submit(self, kind: str, params: Dict[str, Any], idempotency_key: Optional[str] = None) -> dict:
+        self.queue.prune(self.retention_seconds)
+        if self.queue.count_queued() >= self.max_queued:
+            raise JobQueueFullError("Too many queued jobs. Please try again later.")
+        job = self.queue.enqueue(kind, params, idempotency_key, self.max_attempts)
+        logger.info(f"Queued {kind} job {job['job_id']}")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.queue.get(job_id)
+
+    async def events(self, job_id: str, keepalive: float = 15.0) -> AsyncIterator[Optional[dict]]:
+        """Yield job snapshots on every change until the job finishes.
+
+        The job may be running in another process, so this polls the queue.
+        Yields None after `keepalive` seconds without a change so callers can
+        keep idle connections open.
+        """
+        last_seen = None
+        idle = 0.0
+        while True:
+            # Many streams poll at once; SQLite waits must not block the loop
+            job = await asyncio.to_thread(self.queue.get, job_id)
+            if job is None:
+                return
+            if (job["status"], job["updated_at"]) != last_seen:
+                last_seen = (job["status"], job["updated_at"])
+                idle = 0.0
+                yield job
+                if job["status"] in FINISHED_STATUSES:
+                    return
+            elif idle >= keepalive:
+                idle = 0.0
+                yield None
+            await asyncio.sleep(0.5)
+            idle += 0.5
+
+    async def _work(self, worker_id: str) -> None:
+        while True:
+            try:
+                leased = await asyncio.to_thread(self.queue.lease, worker_id, self.visibility_timeout)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} could not lease a job: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if leased is None:
+                # Sleep until a local submit or the next poll for other processes' jobs
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job = Job(
+                id=leased["job_id"],
+                kind=leased["kind"],
+                params=leased["params"],
+                worker_id=worker_id,
+                queue=self.queue,
+                visibility_timeout=self.visibility_timeout,
+                stages=leased["stages"]
+            )
+            logger.info(f"Worker {worker_id} running {job.kind} job {job.id} (attempt {leased['attempts']})")
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                result = await self.handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                retry = not isinstance(e, PERMANENT_ERRORS)
+                logger.error(f"Job {job.id} failed{' (will retry)' if retry else ''}: {str(e)}")
+                await self._record(job, self.queue.fail, job.id, worker_id, str(e), retry=retry)
+            else:
+                if await self._record(job, self.queue.complete, job.id, worker_id, result) is False:
+                    logger.warning(f"Lost the lease on job {job.id}; result discarded")
+            finally:
+                heartbeat.cancel()
+
+    async def _record(self, job: Job, action: Callable[..., bool], *args, **kwargs) -> Optional[bool]:
+        """Store a job's outcome; on a database error the job is retried once its lease expires."""
+        try:
+            return await asyncio.to_thread(action, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"Could not record the outcome of job {job.id}, leaving it to be retried: {str(e)}")
+            return None
+
+    async def _heartbeat(self, job: Job) -> None:
+        # Keep the lease alive for handlers that report progress rarely
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                await asyncio.to_thread(job.queue.heartbeat, job.id, job.worker_id, job.visibility_timeout)
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job.id} failed: {str(e)}")
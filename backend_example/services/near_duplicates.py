@@ -0,0 +1,164 @@
+from typing import Callable, Dict, List, Optional
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+import numpy as np
+from services.document_comparer import rolling_hashes
+from services.document_service import tokenize
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS minhash_signatures (
+    file_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    uploaded_at TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    bucket BLOB NOT NULL,
+    file_id TEXT NOT NULL,
+    PRIMARY KEY (bucket, file_id)
+) WITHOUT ROWID;
+"""
+
+# Words per shingle
+SHINGLE_WORDS = 5
+
+# 16 bands of 8 rows: documents above ~0.7 Jaccard similarity almost always share a bucket
+BANDS = 16
+ROWS = 8
+PERMUTATIONS = BANDS * ROWS
+
+# Fixed seed: every worker process must produce the same signatures
+_random = np.random.default_rng(20240304)
+MULTIPLIERS = _random.integers(1, 2 ** 63, size=PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+OFFSETS = _random.integers(0, 2 ** 63, size=PERMUTATIONS, dtype=np.uint64)
+
+# Permutations evaluated at once; bounds the temporary matrix to this many rows
+PERMUTATION_BLOCK = 16
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """128 32-bit MinHash values over the word 5-gram shingles of a text, or None if it is too short."""
+    vocabulary: Dict[str, int] = {}
+    ids = np.array([vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(text)], dtype=np.int64)
+    if len(ids) < SHINGLE_WORDS:
+        return None
+    # Stable token hashes (Python's hash() differs between processes)
+    token_hashes = np.array([
+        int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        for token in vocabulary
+    ], dtype=np.uint64)
+    shingles = np.unique(rolling_hashes(token_hashes[ids], SHINGLE_WORDS))
+
+    signature = np.empty(PERMUTATIONS, dtype=np.uint32)
+    for start in range(0, PERMUTATIONS, PERMUTATION_BLOCK):
+        block = slice(start, start + PERMUTATION_BLOCK)
+        # Multiply-shift hashing: the high 32 bits of a * x + b (mod 2^64)
+        permuted = MULTIPLIERS[block, None] * shingles[None, :] + OFFSETS[block, None]
+        signature[block] = (permuted >> np.uint64(32)).min(axis=1)
+    return signature
+
+
+def band_buckets(signature: np.ndarray) -> List[bytes]:
+    """One LSH bucket key per band: the band number followed by a hash of its rows."""
+    rows = signature.reshape(BANDS, ROWS)
+    return [
+        bytes([band]) + hashlib.blake2b(rows[band].tobytes(), digest_size=8).digest()
+        for band in range(BANDS)
+    ]
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of every upload, with an LSH index to find similar ones.
+
+    Signatures and buckets live in SQLite so every worker shares them.
+    A lookup reads the 16 buckets of the document's bands, which is a
+    handful of index probes however many documents are stored, and then
+    estimates the similarity of each candidate from the signatures.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.threshold = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def add(self, file_id: str, signature: np.ndarray, filename: str, uploaded_at: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO minhash_signatures VALUES (?, ?, ?, ?)",
+                    (file_id, filename, uploaded_at, signature.astype(np.uint32).tobytes())
+                ).rowcount
+                if inserted:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO lsh_buckets VALUES (?, ?)",
+                        ((bucket, file_id) for bucket in band_buckets(signature))
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def signature(self, file_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT signature FROM minhash_signatures WHERE file_id = ?", (file_id,)
+            ).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint32) if row is not None else None
+
+    def query(self, signature: np.ndarray, exclude: str = "", before: Optional[str] = None) -> List[dict]:
+        """Stored documents whose estimated similarity reaches the threshold, most similar first."""
+        buckets = band_buckets(signature)
+        query = (
+            "SELECT signatures.file_id, signatures.filename, signatures.uploaded_at, signatures.signature"
+            " FROM minhash_signatures AS signatures WHERE signatures.file_id IN ("
+            f"SELECT file_id FROM lsh_buckets WHERE bucket IN ({','.join('?' * len(buckets))}))"
+            " AND signatures.file_id != ?"
+        )
+        params = [*buckets, exclude]
+        if before is not None:
+            query += " AND signatures.uploaded_at < ?"
+            params.append(before)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        if not rows:
+            return []
+
+        candidates = np.frombuffer(b"".join(row[3] for row in rows), dtype=np.uint32).reshape(len(rows), -1)
+        similarities = (candidates == signature[None, :]).mean(axis=1)
+        matches = [
+            {"file_id": row[0], "filename": row[1], "uploaded_at": row[2], "similarity": round(float(similarity), 3)}
+            for row, similarity in zip(rows, similarities) if similarity >= self.threshold
+        ]
+        return sorted(matches, key=lambda match: match["similarity"], reverse=True)
+
+    def find_duplicates(self, file_id: str, text: Callable[[], str], uploaded_at: str) -> List[dict]:
+        """Earlier uploads the document nearly duplicates, without adding it to the index.
+
+        `text` is only called when the document has not been indexed (yet).
+        """
+        signature = self.signature(file_id)
+        if signature is None:
+            # Compare the text without storing its signature
+            signature = minhash_signature(text())
+            if signature is None:
+                return []
+        # Only earlier uploads, so the answer for a document never changes
+        return self.query(signature, exclude=file_id, before=uploaded_at)
+
+    def index_document(self, file_id: str, text: str, filename: str, uploaded_at: str) -> None:
+        """Store the document's signature, once."""
+        if self.signature(file_id) is None:
+            signature = minhash_signature(text)
+            if signature is not None:
+                self.add(file_id, signature, filename, uploaded_at)
@@ -1,12 +1,16 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 import os
+import time
 import logging
+import tiktoken
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from openai.types.chat import ChatCompletion
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
 from tenacity import retry, stop_after_attempt, wait_exponential
+from services.clause_segmenter import ClauseIndex
+from services.entity_extractor import EntityIndex, entity_kinds
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -15,6 +19,33 @@ logging.basicConfig(level=logging.INFO)
 # Load environment variables
 load_dotenv()
 
+class CircuitBreaker:
+    """Opens after consecutive LLM failures; lets a trial call through after the cooldown."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        if self.opened_at is None:
+            return False
+        return time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if not self.is_open:
+                logger.warning(f"LLM circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
 class OpenAIService:
     def __init__(self):
         # Load and validate OpenAI API key
@@ -25,6 +56,7 @@ class OpenAIService:
         # Initialize OpenAI client
         try:
             self.client = OpenAI(api_key=api_key)
+            self.async_client = AsyncOpenAI(api_key=api_key)
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI client: {str(e)}")
             raise ValueError(f"OpenAI client initialization failed: {str(e)}")
@@ -32,6 +64,12 @@ class OpenAIService:
         # Set up model configuration
         self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
         logger.info(f"Using OpenAI model: {self.model}")
+
+        # Shared by every LLM caller so callers can skip the API while it is failing
+        self.circuit = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("LLM_RESET_TIMEOUT", "30"))
+        )
         
         # Configure text splitter for document chunking
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -41,6 +79,35 @@ class OpenAIService:
             separators=["\n\n", "\n", " ", ""]
         )
 
+        # Most tokens of earlier turns sent along with a chat message
+        self.chat_history_tokens = int(os.getenv("CHAT_HISTORY_TOKENS", "2000"))
+        self._encoding = None
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except Exception as e:
+                logger.warning(f"Tokenizer unavailable, estimating token counts: {str(e)}")
+                self._encoding = False
+        if self._encoding is False:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def trim_history(self, chat_history: List[dict]) -> List[dict]:
+        """The latest turns of a chat that fit in chat_history_tokens, oldest first."""
+        kept = []
+        tokens = 0
+        for chat in reversed(chat_history):
+            tokens += self.count_tokens(chat["message"])
+            if tokens > self.chat_history_tokens:
+                break
+            kept.append(chat)
+        # Never start with an answer whose question was dropped
+        while kept and kept[-1]["role"] == "ai":
+            kept.pop()
+        return kept[::-1]
+
     def _prepare_document_context(self, text: str) -> List[Document]:
         """Split document into chunks for context."""
         try:
@@ -54,8 +121,60 @@ class OpenAIService:
             logger.error(f"Error preparing document context: {str(e)}")
             raise ValueError(f"Failed to process document text: {str(e)}")
 
-    def _get_mock_response(self, message: str) -> dict:
+    def _clause_response(self, message: str, clauses: ClauseIndex) -> Optional[str]:
+        """Answer clause questions from the document's own clause index."""
+        names, matched = clauses.for_question(message)
+        if matched:
+            # Excerpts start with their own heading
+            excerpts = [clauses.excerpt(clause, limit=1200) for clause in matched[:2]]
+            return "This is what the document says:\n\n" + "\n\n".join(excerpts)
+
+        headings = [
+            f"{clause.number}. {clause.heading}" if clause.number else clause.heading
+            for clause in clauses.clauses if clause.depth == 1
+        ]
+        if names and headings:
+            asked = " or ".join(name.replace("_", " ") for name in names)
+            return (
+                f"I could not find a section on {asked} in this document. Its sections are:\n\n"
+                + "\n".join(headings[:20])
+            )
+        message_lower = message.lower()
+        if headings and ("clause" in message_lower or "key" in message_lower):
+            return (
+                "This document has the following sections:\n\n" + "\n".join(headings[:20])
+                + "\n\nWould you like me to explain any of these clauses in more detail?"
+            )
+        return None
+
+    def _entity_response(self, message: str, entities: EntityIndex) -> Optional[str]:
+        """Answer who / when / how much / which law questions from the document's entities."""
+        labels = {"party": "Parties", "date": "Dates", "amount": "Amounts", "jurisdiction": "Governing jurisdictions"}
+        lines = []
+        for kind in entity_kinds(message):
+            values = entities.values(kind)
+            if values:
+                lines.append(f"{labels[kind]}: {'; '.join(values)}")
+        if not lines:
+            return None
+        return "From the document:\n\n" + "\n".join(lines)
+
+    def _get_mock_response(
+        self,
+        message: str,
+        clauses: Optional[ClauseIndex] = None,
+        entities: Optional[EntityIndex] = None
+    ) -> dict:
         """Generate a mock response when OpenAI API is unavailable."""
+        if entities is not None:
+            response = self._entity_response(message, entities)
+            if response is not None:
+                return {"response": response, "confidence": 0.85, "sources": ["document_entities"]}
+        if clauses is not None:
+            response = self._clause_response(message, clauses)
+            if response is not None:
+                return {"response": response, "confidence": 0.85, "sources": ["document_clauses"]}
+
         mock_responses = {
             "explain": "This document appears to be a legal agreement. The main points include standard contractual terms, obligations between parties, and legal requirements. Would you like me to explain any specific section?",
             "summarize": "The document outlines a legal agreement between parties. It contains sections on terms, conditions, obligations, and dispute resolution. Let me know if you need details about any particular aspect.",
@@ -134,7 +253,9 @@ Would you like more information about any of these aspects?"""
         self, 
         document_text: str, 
         user_message: str,
-        chat_history: Optional[List[dict]] = None
+        chat_history: Optional[List[dict]] = None,
+        clauses: Optional[ClauseIndex] = None,
+        entities: Optional[EntityIndex] = None
     ) -> dict:
         """Process chat messages with document context."""
         logger = logging.getLogger(__name__)
@@ -145,14 +266,18 @@ Would you like more information about any of these aspects?"""
         # If OpenAI API key is not set or empty, use mock response
         if not os.getenv("OPENAI_API_KEY"):
             logger.warning("No OpenAI API key found, using mock response")
-            return self._get_mock_response(user_message)
-        # Prepare document chunks
-        doc_chunks = self._prepare_document_context(document_text)
+            return self._get_mock_response(user_message, clauses, entities)
+        # Prepare document chunks; a question about a clause only needs that clause
+        _, asked_clauses = clauses.for_question(user_message) if clauses is not None else ((), [])
+        if asked_clauses:
+            doc_chunks = [Document(page_content=clauses.excerpt(clause)) for clause in asked_clauses[:4]]
+        else:
+            doc_chunks = self._prepare_document_context(document_text)
         
         # Format chat history
         messages = []
         if chat_history:
-            for chat in chat_history:
+            for chat in self.trim_history(chat_history):
                 role = "assistant" if chat["role"] == "ai" else "user"
                 messages.append({"role": role, "content": chat["message"]})
 
@@ -162,6 +287,9 @@ Would you like more information about any of these aspects?"""
             "document context. Use this information to provide accurate answers about the document. "
             "Keep responses clear and focused on the legal aspects.\n\n"
         )
+        facts = entities.describe() if entities is not None else ""
+        if facts:
+            system_message += f"Key facts extracted from the document:\n{facts}\n\n"
         for chunk in doc_chunks:
             system_message += chunk.page_content + "\n"
 
@@ -203,6 +331,7 @@ Would you like more information about any of these aspects?"""
                     raise ValueError("No message in OpenAI API response")
                 
                 logger.info("Received valid response from OpenAI API")
+                self.circuit.record_success()
                 return {
                     "response": response.choices[0].message.content,
                     "confidence": 0.95,
@@ -210,16 +339,17 @@ Would you like more information about any of these aspects?"""
                 }
                 
             except Exception as api_error:
+                self.circuit.record_failure()
                 error_message = str(api_error)
                 logger.warning(f"OpenAI API error: {error_message}")
                 
                 # Check for specific error types
                 if "insufficient_quota" in error_message or "exceeded your current quota" in error_message:
                     logger.warning("OpenAI API quota exceeded, falling back to mock response")
-                    return self._get_mock_response(user_message)
+                    return self._get_mock_response(user_message, clauses, entities)
                 elif "rate_limit" in error_message or "429" in error_message:
                     logger.warning("OpenAI API rate limit reached, falling back to mock response")
-                    return self._get_mock_response(user_message)
+                    return self._get_mock_response(user_message, clauses, entities)
                 else:
                     # For other errors, raise them
                     raise
@@ -232,6 +362,59 @@ Would you like more information about any of these aspects?"""
             # Return mock response for any error in production
             if os.getenv("ENVIRONMENT") != "development":
                 logger.warning("Error in production, falling back to mock response")
-                return self._get_mock_response(user_message)
+                return self._get_mock_response(user_message, clauses, entities)
             
-            raise Exception("Chat service temporarily unavailable. Please try again later.")
\ No newline at end of file
+            raise Exception("Chat service temporarily unavailable. Please try again later.")
+
+    async def stream_chat_with_context(
+        self,
+        context_chunks: List[str],
+        user_message: str,
+        chat_history: Optional[List[dict]] = None,
+        clauses: Optional[ClauseIndex] = None,
+        entities: Optional[EntityIndex] = None
+    ) -> AsyncIterator[str]:
+        """Stream response tokens for a question over pre-selected document chunks."""
+        if not context_chunks or not user_message:
+            raise ValueError("Document context and user message are required")
+
+        facts = entities.describe() if entities is not None else ""
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a legal document analysis assistant. You have access to the following "
+                    "document excerpts. Use this information to provide accurate answers about the document. "
+                    "Keep responses clear and focused on the legal aspects.\n\n"
+                    + (f"Key facts extracted from the document:\n{facts}\n\n" if facts else "")
+                    + "\n".join(context_chunks)
+                )
+            }
+        ]
+        for chat in self.trim_history(chat_history or []):
+            role = "assistant" if chat["role"] == "ai" else "user"
+            messages.append({"role": role, "content": chat["message"]})
+        messages.append({"role": "user", "content": user_message})
+
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800,
+                top_p=0.95,
+                stream=True
+            )
+            async for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
+            self.circuit.record_success()
+        except Exception as e:
+            self.circuit.record_failure()
+            error_message = str(e)
+            if "insufficient_quota" in error_message or "rate_limit" in error_message or "429" in error_message:
+                logger.warning(f"OpenAI streaming unavailable, falling back to mock response: {error_message}")
+                for word in self._get_mock_response(user_message, clauses, entities)["response"].split(" "):
+                    yield word + " "
+            else:
+                raise
@@ -0,0 +1,196 @@
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import List, Optional
+import os
+import sqlite3
+import threading
+from services.revision_tracker import HASH_SIZE, digest, page_digest, paragraphs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS originals (
+    original_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    page_hashes BLOB NOT NULL,
+    registered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS originals_by_content ON originals (content_hash);
+CREATE TABLE IF NOT EXISTS original_pages (
+    page_hash BLOB NOT NULL,
+    original_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    PRIMARY KEY (page_hash, original_id, page)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS original_paragraphs (
+    paragraph_hash BLOB NOT NULL,
+    original_id TEXT NOT NULL,
+    PRIMARY KEY (paragraph_hash, original_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS original_paragraphs_by_original ON original_paragraphs (original_id);
+"""
+
+# Host parameters per IN (...) lookup
+LOOKUP_BATCH = 500
+
+# Pages without text hash alike in every document and never identify an original
+EMPTY_PAGE = page_digest("")
+
+
+def _unpack(blob: bytes) -> List[bytes]:
+    return [blob[start:start + HASH_SIZE] for start in range(0, len(blob), HASH_SIZE)]
+
+
+class OriginalRegistry:
+    """Page and paragraph hashes of documents we issued ourselves.
+
+    Every page and paragraph hash is a key in a WITHOUT ROWID table, so
+    the registry stores about 30 bytes per page or paragraph and a lookup
+    is a few B-tree page reads however many originals are registered. An
+    uploaded copy is matched by its exact bytes first, then by voting
+    with its page hashes, and compared with the winning original page by
+    page.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Share of pages that must match before a copy is attributed to an original
+        self.min_page_match = float(os.getenv("ORIGINAL_MIN_PAGE_MATCH", "0.3"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def registered_at(self, original_id: Optional[str] = None) -> Optional[str]:
+        """When the original was last registered, or without an id the latest registration of any."""
+        with self._lock:
+            if original_id is None:
+                return self._conn.execute("SELECT MAX(registered_at) FROM originals").fetchone()[0]
+            row = self._conn.execute(
+                "SELECT registered_at FROM originals WHERE original_id = ?", (original_id,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def register(self, original_id: str, name: str, content_hash: str, pages: List[str]) -> dict:
+        page_hashes = [page_digest(page) for page in pages]
+        paragraph_hashes = {digest(paragraph) for page in pages for paragraph in paragraphs(page)}
+        # An original without text would match nothing and only take up space
+        if not paragraph_hashes:
+            raise ValueError("Document has no text to register")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-registering replaces every hash, so old pages and paragraphs stop voting for the id
+                row = self._conn.execute(
+                    "SELECT page_hashes FROM originals WHERE original_id = ?", (original_id,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.executemany(
+                        "DELETE FROM original_pages WHERE page_hash = ? AND original_id = ? AND page = ?",
+                        ((page_hash, original_id, page) for page, page_hash in enumerate(_unpack(row[0]), start=1))
+                    )
+                    self._conn.execute("DELETE FROM original_paragraphs WHERE original_id = ?", (original_id,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO originals VALUES (?, ?, ?, ?, ?)",
+                    (original_id, name, content_hash, b"".join(page_hashes), datetime.now().isoformat())
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO original_pages VALUES (?, ?, ?)",
+                    ((page_hash, original_id, page) for page, page_hash in enumerate(page_hashes, start=1))
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO original_paragraphs VALUES (?, ?)",
+                    ((paragraph_hash, original_id) for paragraph_hash in paragraph_hashes)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {"original_id": original_id, "name": name, "pages": len(page_hashes), "paragraphs": len(paragraph_hashes)}
+
+    def _best_original(self, page_hashes: List[bytes]) -> Optional[str]:
+        votes = {}
+        unique = [page_hash for page_hash in dict.fromkeys(page_hashes) if page_hash != EMPTY_PAGE]
+        for start in range(0, len(unique), LOOKUP_BATCH):
+            batch = unique[start:start + LOOKUP_BATCH]
+            for original_id, count in self._conn.execute(
+                f"SELECT original_id, COUNT(*) FROM original_pages WHERE page_hash IN ({','.join('?' * len(batch))})"
+                " GROUP BY original_id",
+                batch
+            ):
+                votes[original_id] = votes.get(original_id, 0) + count
+        return max(votes, key=votes.get) if votes else None
+
+    def _known_paragraphs(self, original_id: str, hashes: List[bytes]) -> set:
+        known = set()
+        for start in range(0, len(hashes), LOOKUP_BATCH):
+            batch = hashes[start:start + LOOKUP_BATCH]
+            known.update(row[0] for row in self._conn.execute(
+                f"SELECT paragraph_hash FROM original_paragraphs WHERE original_id = ?"
+                f" AND paragraph_hash IN ({','.join('?' * len(batch))})",
+                (original_id, *batch)
+            ))
+        return known
+
+    def match(self, content_hash: str, pages: List[str]) -> Optional[dict]:
+        """How an uploaded copy relates to the registered original it matches best, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT original_id, name, page_hashes, registered_at FROM originals WHERE content_hash = ? LIMIT 1",
+                (content_hash,)
+            ).fetchone()
+            if row is not None:
+                return {
+                    "status": "exact",
+                    "originalId": row[0],
+                    "name": row[1],
+                    "registeredAt": row[3],
+                    "identicalBytes": True,
+                    "pages": len(row[2]) // HASH_SIZE,
+                    "matchingPages": len(row[2]) // HASH_SIZE,
+                    "differingPages": [],
+                    "missingOriginalPages": []
+                }
+
+            page_hashes = [page_digest(page) for page in pages]
+            original_id = self._best_original(page_hashes)
+            if original_id is None:
+                return None
+            name, original_blob, registered_at = self._conn.execute(
+                "SELECT name, page_hashes, registered_at FROM originals WHERE original_id = ?", (original_id,)
+            ).fetchone()
+            original_pages = _unpack(original_blob)
+
+            # Align pages so an inserted or removed page does not shift every later page
+            opcodes = SequenceMatcher(None, original_pages, page_hashes, autojunk=False).get_opcodes()
+            matching = sum(end - start for operation, _, _, start, end in opcodes if operation == "equal")
+            if matching < self.min_page_match * max(len(original_pages), len(page_hashes)):
+                return None
+
+            differing, missing = [], []
+            for operation, original_start, original_end, start, end in opcodes:
+                if operation == "equal":
+                    continue
+                for page in range(start, end):
+                    original_page = original_start + page - start
+                    hashes = [digest(paragraph) for paragraph in paragraphs(pages[page])]
+                    known = self._known_paragraphs(original_id, hashes)
+                    differing.append({
+                        "page": page + 1,
+                        "originalPage": original_page + 1 if original_page < original_end else None,
+                        "paragraphs": len(hashes),
+                        "changedParagraphs": sum(1 for hashed in hashes if hashed not in known)
+                    })
+                missing.extend(range(original_start + (end - start) + 1, original_end + 1))
+
+        return {
+            "status": "modified" if differing or missing else "identical_text",
+            "originalId": original_id,
+            "name": name,
+            "registeredAt": registered_at,
+            "identicalBytes": False,
+            "pages": len(page_hashes),
+            "matchingPages": matching,
+            "differingPages": differing,
+            "missingOriginalPages": missing
+        }
@@ -0,0 +1,561 @@
+"""
+Tamper forensics for PDF files, read straight from the stored bytes.
+
+The file is memory-mapped and scanned once for object headers and %%EOF
+markers; after that only the objects a check needs (trailer, catalog,
+Info, XMP, page tree, fonts) are sliced out and parsed. Content streams
+and images are never decoded, so a 10 MB file costs little more than a
+regex pass over it.
+"""
+
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import mmap
+import re
+import time
+import logging
+from services.pdf_scanner import (
+    OBJECT_WINDOW, Buffer, ObjectReader, PdfScanner, PdfStructureError,
+    name, parse_dict, read_object, reference, references
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Patterns scanned over the whole file start with a literal, which the regex
+# engine finds with a fast substring search instead of trying every offset
+OBJECT_KEYWORD = re.compile(rb"obj\b")
+EOF_MARKER = re.compile(rb"%%EOF")
+XREF_KEYWORD = re.compile(rb"xref[ \t]*[\r\n]")
+# Checked just before each "obj" keyword and at object offsets
+OBJECT_NUMBERS = re.compile(rb"(?<![0-9])(\d{1,10})[ \t\r\n\f\x00]+(\d{1,5})[ \t\r\n\f\x00]+$")
+XREF_STREAM = re.compile(rb"/Type\s*/XRef\b")
+OBJECT_STREAM = re.compile(rb"/Type\s*/ObjStm\b")
+SIGNATURE_RANGE = re.compile(rb"/ByteRange\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]")
+SUB_FILTER = re.compile(rb"/SubFilter\s*/([A-Za-z0-9.#_-]+)")
+PDF_DATE = re.compile(r"D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?([Zz+-])?(\d{2})?'?(\d{2})?")
+SUBSET_PREFIX = re.compile(r"^[A-Z]{6}\+")
+
+MAX_PAGES = 10000
+
+# Catalog entries that signing or filling in a form adds or rewrites
+SIGNING_CATALOG_KEYS = ("AcroForm", "Perms", "DSS", "Metadata")
+# Dictionary types an update may add or rewrite without changing what a page shows
+SIGNING_TYPES = ("Sig", "DocTimeStamp", "Annot", "XRef", "ObjStm", "Metadata")
+
+XMP_FIELDS = {
+    "Title": rb"dc:title",
+    "Creator": rb"xmp:CreatorTool",
+    "Producer": rb"pdf:Producer",
+    "CreationDate": rb"xmp:CreateDate",
+    "ModDate": rb"xmp:ModifyDate"
+}
+
+
+def parse_pdf_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse a PDF date (D:YYYYMMDDHHmmSSOHH'mm') or an ISO 8601 date from XMP."""
+    if not value:
+        return None
+    value = value.strip()
+    match = PDF_DATE.match(value)
+    if match is None:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    year, month, day, hour, minute, second, sign, tz_hours, tz_minutes = match.groups()
+    try:
+        parsed = datetime(
+            int(year), int(month or 1), int(day or 1), int(hour or 0), int(minute or 0), int(second or 0)
+        )
+    except ValueError:
+        return None
+    if sign in ("Z", "z"):
+        return parsed.replace(tzinfo=timezone.utc)
+    if sign in ("+", "-") and tz_hours:
+        offset = timedelta(hours=int(tz_hours), minutes=int(tz_minutes or 0))
+        return parsed.replace(tzinfo=timezone(offset if sign == "+" else -offset))
+    return parsed
+
+
+def _normalized(entries: Dict[str, bytes], ignore: Tuple[str, ...]) -> Dict[str, bytes]:
+    """Dictionary entries without `ignore`, with whitespace normalized for comparison."""
+    return {key: b" ".join(value.split()) for key, value in entries.items() if key not in ignore}
+
+
+def same_time(first: Optional[datetime], second: Optional[datetime]) -> bool:
+    if first is None or second is None:
+        return first is second
+    if first.tzinfo is None or second.tzinfo is None:
+        first, second = first.replace(tzinfo=None), second.replace(tzinfo=None)
+    return abs((first - second).total_seconds()) <= 60
+
+
+class PdfObjects(ObjectReader):
+    """Random access to the objects of a PDF held in a buffer (bytes or mmap).
+
+    One regex pass indexes every `N G obj` header; objects are only sliced
+    and parsed when asked for. When an object is defined more than once the
+    last definition wins, as it does for a reader applying incremental
+    updates in order.
+    """
+
+    def __init__(self, data: Buffer):
+        self.data = data
+        self.size = len(data)
+        self.linearized = b"/Linearized" in bytes(data[:1024])
+        self.eof_offsets = [match.start() for match in EOF_MARKER.finditer(data)]
+        self.offsets: Dict[int, int] = {}
+        # object number -> offsets of every definition, oldest first
+        self.history: Dict[int, List[int]] = {}
+        for match in OBJECT_KEYWORD.finditer(data):
+            window_start = max(0, match.start() - 32)
+            header = OBJECT_NUMBERS.search(bytes(data[window_start:match.start()]))
+            if header is None:
+                continue
+            number = int(header.group(1))
+            self.offsets[number] = window_start + header.start()
+            self.history.setdefault(number, []).append(window_start + header.start())
+        self._sorted_offsets = sorted((offset, number) for number, offset in self.offsets.items())
+        # object number -> (value, revision) for objects inside object streams
+        self._compressed: Optional[Dict[int, Tuple[bytes, int]]] = None
+        # object number -> (revision, value) of every definition inside an object stream
+        self._compressed_history: Dict[int, List[Tuple[int, bytes]]] = {}
+        # object number -> (value, stream data offset, revision)
+        self._values: Dict[int, Tuple[bytes, Optional[int], Optional[int]]] = {}
+
+    def revision(self, offset: int) -> int:
+        """0 for the original file, n for the n-th incremental update."""
+        revision = bisect_left(self.eof_offsets, offset)
+        # A linearized file has a first-page section ending in its own %%EOF
+        if self.linearized and revision > 0:
+            revision -= 1
+        return revision
+
+    def object_revision(self, number: int) -> Optional[int]:
+        self.value(number)
+        return self._values[number][2]
+
+    def value(self, number: Optional[int]) -> bytes:
+        """Raw value of an object (a dictionary, array, number...)."""
+        if number is None:
+            return b""
+        if number not in self._values:
+            offset = self.offsets.get(number)
+            compressed = self._compressed_objects().get(number)
+            if offset is not None and (compressed is None or self.revision(offset) >= compressed[1]):
+                value, stream_start = read_object(self.data, offset)
+                self._values[number] = (value, stream_start, self.revision(offset))
+            elif compressed is not None:
+                self._values[number] = (compressed[0], None, compressed[1])
+            else:
+                self._values[number] = (b"", None, None)
+        return self._values[number][0]
+
+    def stream_start(self, number: int) -> Optional[int]:
+        if number not in self.offsets:
+            return None
+        self.value(number)
+        return self._values[number][1]
+
+    def _compressed_objects(self) -> Dict[int, Tuple[bytes, int]]:
+        """Objects stored inside object streams (PDF 1.5+), decoded once."""
+        if self._compressed is not None:
+            return self._compressed
+        self._compressed = {}
+        starts = [offset for offset, _ in self._sorted_offsets]
+        for match in OBJECT_STREAM.finditer(self.data):
+            position = bisect_left(starts, match.start()) - 1
+            if position < 0:
+                continue
+            offset, stream_number = self._sorted_offsets[position]
+            revision = self.revision(offset)
+            for number, value in self.object_stream(stream_number):
+                self._compressed_history.setdefault(number, []).append((revision, value))
+                existing = self._compressed.get(number)
+                if existing is None or existing[1] <= revision:
+                    self._compressed[number] = (value, revision)
+        return self._compressed
+
+    def updates(self) -> Dict[int, Dict[int, Tuple[bytes, Optional[bytes]]]]:
+        """Objects defined by each incremental update: revision -> {number: (value, previous value)}.
+
+        The previous value is that of the newest definition in an earlier
+        revision, or None for an object the update adds.
+        """
+        self._compressed_objects()
+        updates: Dict[int, Dict[int, Tuple[bytes, Optional[bytes]]]] = {}
+        for number in set(self.history) | set(self._compressed_history):
+            definitions = sorted(
+                [(self.revision(offset), offset, None) for offset in self.history.get(number, [])]
+                + [(revision, -1, value) for revision, value in self._compressed_history.get(number, [])],
+                key=lambda definition: definition[:2]
+            )
+            if definitions[-1][0] == 0:
+                continue
+            values: Dict[int, bytes] = {}
+            for revision, offset, value in definitions:
+                values[revision] = value if value is not None else read_object(self.data, offset)[0]
+            previous = None
+            for revision in sorted(values):
+                if revision > 0:
+                    updates.setdefault(revision, {})[number] = (values[revision], previous)
+                previous = values[revision]
+        return updates
+
+    def trailer(self) -> Dict[str, bytes]:
+        """The newest trailer dictionary (classic trailer or cross-reference stream)."""
+        try:
+            return PdfScanner(self.data).trailer
+        except PdfStructureError as e:
+            logger.info(f"Cross-reference data unusable ({str(e)}), using the last trailer keyword")
+        position = self.data.rfind(b"trailer")
+        if position >= 0:
+            return parse_dict(bytes(self.data[position:position + OBJECT_WINDOW]))
+        return {}
+
+
+class PdfForensics:
+    """Forensic findings for one PDF."""
+
+    def __init__(self, data: Buffer):
+        self.objects = PdfObjects(data)
+        self.trailer = self.objects.trailer()
+        self.catalog = self.objects.dict(self.trailer.get("Root"))
+        self._fonts: Dict[int, dict] = {}
+
+    def info(self) -> Dict[str, str]:
+        return self.objects.info(self.trailer)
+
+    def xmp(self) -> Dict[str, str]:
+        packet = self.objects.stream(reference(self.catalog.get("Metadata")))
+        if packet is None:
+            data = self.objects.data
+            start = data.rfind(b"<x:xmpmeta")
+            end = data.find(b"</x:xmpmeta>", start) if start >= 0 else -1
+            packet = bytes(data[start:end]) if end > start else b""
+        values = {}
+        for field, tag in XMP_FIELDS.items():
+            match = re.search(
+                tag + rb"(?:=\"([^\"]*)\"|>\s*(?:<rdf:Alt>\s*<rdf:li[^>]*>)?([^<]*)<)", packet
+            )
+            if match:
+                value = (match.group(1) or match.group(2) or b"").decode("utf-8", errors="replace").strip()
+                if value:
+                    values[field] = value
+        return values
+
+    def pages(self) -> List[dict]:
+        """Page objects in page-tree order, with their (possibly inherited) resources."""
+        pages: List[dict] = []
+        stack = [(reference(self.catalog.get("Pages")), None)]
+        seen = set()
+        while stack and len(pages) < MAX_PAGES:
+            number, inherited = stack.pop()
+            if number is None or number in seen:
+                continue
+            seen.add(number)
+            node = self.objects.dict(self.objects.value(number))
+            resources = node.get("Resources", inherited)
+            if "Kids" in node:
+                kids = references(self.objects.resolve(node["Kids"]))
+                stack.extend((kid, resources) for kid in reversed(kids))
+            elif node:
+                pages.append({"object": number, "resources": resources, "contents": self._contents(node)})
+        return pages
+
+    def _contents(self, page: Dict[str, bytes]) -> List[int]:
+        value = page.get("Contents", b"")
+        number = reference(value)
+        # /Contents is a stream or an array of streams, either possibly indirect
+        if number is not None and self.objects.value(number).lstrip().startswith(b"["):
+            return references(self.objects.value(number))
+        return [number] if number is not None else references(value)
+
+    def font(self, number: int) -> dict:
+        if number not in self._fonts:
+            entries = self.objects.dict(self.objects.value(number))
+            subtype = name(entries.get("Subtype"))
+            descriptor = entries.get("FontDescriptor")
+            if descriptor is None and subtype == "Type0":
+                descendants = references(self.objects.resolve(entries.get("DescendantFonts")))
+                if descendants:
+                    descriptor = self.objects.dict(self.objects.value(descendants[0])).get("FontDescriptor")
+            descriptor_entries = self.objects.dict(descriptor)
+            self._fonts[number] = {
+                "name": name(entries.get("BaseFont")) or subtype or "unknown",
+                "subtype": subtype,
+                "embedded": any(key in descriptor_entries for key in ("FontFile", "FontFile2", "FontFile3")),
+                "revision": self.objects.object_revision(number) or 0
+            }
+        return self._fonts[number]
+
+    def page_fonts(self, page: dict) -> List[dict]:
+        resources = self.objects.dict(page["resources"])
+        fonts = self.objects.dict(resources.get("Font"))
+        return [self.font(number) for number in sorted({reference(value) for value in fonts.values()} - {None})]
+
+    def signatures(self) -> List[dict]:
+        signatures = []
+        data = self.objects.data
+        # Ignore trailing end-of-line bytes when deciding whether a signature covers the file
+        end = self.objects.size
+        while end > 0 and data[end - 1:end] in (b"\r", b"\n", b" ", b"\x00"):
+            end -= 1
+        for match in SIGNATURE_RANGE.finditer(data):
+            first_start, first_length, second_start, second_length = (int(value) for value in match.groups())
+            sub_filter = SUB_FILTER.search(bytes(data[max(0, match.start() - 2048):match.end() + 2048]))
+            signed_until = second_start + second_length
+            signatures.append({
+                "subFilter": sub_filter.group(1).decode("latin-1") if sub_filter else None,
+                "byteRange": [first_start, first_length, second_start, second_length],
+                "coversWholeFile": first_start == 0 and signed_until >= end,
+                # The last revision whose bytes the signature covers up to its %%EOF
+                "signedRevision": self.objects.revision(signed_until) - 1 if first_start == 0 else None,
+                "signedUntil": signed_until
+            })
+        return signatures
+
+    def _signing_only(self, number: int, value: bytes, previous: Optional[bytes]) -> bool:
+        """Whether one object of an update leaves the pages' content as it was."""
+        if previous is None:
+            # New objects only matter once a rewritten object refers to them
+            return True
+        entries = parse_dict(value)
+        kind = name(entries.get("Type"))
+        if kind in SIGNING_TYPES or "ByteRange" in entries:
+            return True
+        if "Subtype" in entries and "Rect" in entries:
+            # Annotation or signature widget without /Type
+            return True
+        if "Fields" in entries or "FT" in entries or any(key in entries for key in ("Certs", "OCSPs", "CRLs", "VRI")):
+            # AcroForm, form field, or the document security store of a signature
+            return True
+        if number == reference(self.trailer.get("Info")):
+            return True
+        if kind == "Page":
+            return _normalized(entries, ("Annots",)) == _normalized(parse_dict(previous), ("Annots",))
+        if kind == "Catalog":
+            return _normalized(entries, SIGNING_CATALOG_KEYS) == _normalized(parse_dict(previous), SIGNING_CATALOG_KEYS)
+        return False
+
+    def revisions(self) -> List[dict]:
+        """Each incremental update, and whether it only added signatures, annotations or form fields."""
+        updates = self.objects.updates()
+        return [
+            {
+                "revision": revision,
+                "objects": len(updates[revision]),
+                "annotationsOnly": all(
+                    self._signing_only(number, value, previous)
+                    for number, (value, previous) in updates[revision].items()
+                )
+            }
+            for revision in sorted(updates)
+        ]
+
+    def xref_sections(self) -> int:
+        data = self.objects.data
+        # "xref" at the start of a line; "startxref" does not count
+        tables = sum(
+            1 for match in XREF_KEYWORD.finditer(data)
+            if match.start() == 0 or data[match.start() - 1:match.start()] in (b"\r", b"\n")
+        )
+        return tables + len(XREF_STREAM.findall(data))
+
+    def report(self) -> dict:
+        objects = self.objects
+        eof_markers = len(objects.eof_offsets)
+        incremental_updates = max(0, eof_markers - 1 - (1 if objects.linearized and eof_markers > 1 else 0))
+        modified_objects = sorted(
+            number for number, offset in objects.offsets.items() if objects.revision(offset) > 0
+        )
+        revisions = self.revisions() if eof_markers > 1 else []
+        signatures = self.signatures()
+        content_revisions = [revision["revision"] for revision in revisions if not revision["annotationsOnly"]]
+        last_eof = objects.eof_offsets[-1] if objects.eof_offsets else 0
+        for signature in signatures:
+            signed = signature["signedRevision"]
+            if signature["coversWholeFile"]:
+                signature["changedAfterSigning"] = False
+            elif signed is None:
+                signature["changedAfterSigning"] = True
+            else:
+                # Later countersignatures and annotations are expected; a later update
+                # that rewrote anything else, or bytes after the last %%EOF, are not
+                signature["changedAfterSigning"] = (
+                    signature["signedUntil"] > last_eof or any(revision > signed for revision in content_revisions)
+                )
+        # Content in revisions up to the newest one a signature covers was vouched for by the signer
+        signed_revision = max(
+            (signature["signedRevision"] for signature in signatures if signature["signedRevision"] is not None),
+            default=0
+        )
+
+        info, xmp = self.info(), self.xmp()
+        mismatches = []
+        for field in ("Producer", "Creator", "Title"):
+            if field in info and field in xmp and info[field] != xmp[field]:
+                mismatches.append(field)
+        for field in ("CreationDate", "ModDate"):
+            if field in info and field in xmp and not same_time(
+                parse_pdf_date(info[field]), parse_pdf_date(xmp[field])
+            ):
+                mismatches.append(field)
+
+        pages = self.pages()
+        fonts_per_page = []
+        changed_pages = []
+        for index, page in enumerate(pages, start=1):
+            fonts_per_page.append([font["name"] for font in self.page_fonts(page)])
+            # Only the content streams: signing rewrites the page object to add /Annots
+            content_revisions = [objects.object_revision(number) or 0 for number in page["contents"]]
+            if max(content_revisions, default=0) > signed_revision:
+                changed_pages.append(index)
+
+        fonts = list(self._fonts.values())
+        added_fonts = sorted({font["name"] for font in fonts if font["revision"] > signed_revision})
+        embedding = {}
+        for font in fonts:
+            family = SUBSET_PREFIX.sub("", font["name"])
+            embedding.setdefault(family, set()).add(font["embedded"])
+        mixed_fonts = sorted(family for family, flags in embedding.items() if len(flags) > 1)
+
+        return {
+            "eofMarkers": eof_markers,
+            "incrementalUpdates": incremental_updates,
+            "xrefSections": self.xref_sections(),
+            "linearized": objects.linearized,
+            "objects": len(objects.offsets),
+            "modifiedObjects": len(modified_objects),
+            "info": info,
+            "xmp": xmp,
+            "metadataMismatches": mismatches,
+            "pageCount": len(pages),
+            "changedPages": changed_pages,
+            "fontsPerPage": fonts_per_page,
+            "fontsAddedInUpdates": added_fonts,
+            "mixedEmbeddingFonts": mixed_fonts,
+            "revisions": revisions,
+            "signedRevision": signed_revision,
+            "signatures": signatures
+        }
+
+
+def unvouched_updates(report: dict) -> int:
+    """Updates that may have changed content and that no signature vouches for.
+
+    Updates that only added signatures, form fields or annotations, and
+    updates a later signature covers, do not count.
+    """
+    return sum(
+        1 for revision in report["revisions"]
+        if not revision["annotationsOnly"] and revision["revision"] > report["signedRevision"]
+    )
+
+
+def assess(report: dict) -> dict:
+    """Turn a forensic report into the /analyze-alterability response."""
+    findings = []
+    updates = report["incrementalUpdates"]
+    signatures = report["signatures"]
+    unsigned_changes = [signature for signature in signatures if signature["changedAfterSigning"]]
+    annotation_updates = sum(1 for revision in report["revisions"] if revision["annotationsOnly"])
+    content_updates = unvouched_updates(report)
+
+    if updates:
+        findings.append(f"PDF was saved {updates} more time(s) after creation (incremental updates)")
+        if annotation_updates:
+            findings.append(f"{annotation_updates} update(s) only added signatures, form fields or annotations")
+    else:
+        findings.append("No incremental updates after the original save")
+    if report["changedPages"]:
+        pages = ", ".join(str(page) for page in report["changedPages"][:10])
+        findings.append(f"Page content replaced in a later update (page {pages})")
+    if report["fontsAddedInUpdates"]:
+        findings.append(f"Fonts introduced in a later update: {', '.join(report['fontsAddedInUpdates'][:5])}")
+    if report["mixedEmbeddingFonts"]:
+        findings.append(f"Same font both embedded and not embedded: {', '.join(report['mixedEmbeddingFonts'][:5])}")
+    if report["metadataMismatches"]:
+        findings.append(f"Info dictionary and XMP metadata disagree on: {', '.join(report['metadataMismatches'])}")
+    elif report["info"] or report["xmp"]:
+        findings.append("Document metadata is consistent")
+    if signatures:
+        findings.append(f"{len(signatures)} digital signature(s) found")
+        if unsigned_changes:
+            findings.append("The document was changed after it was signed")
+
+    created = parse_pdf_date(report["info"].get("CreationDate") or report["xmp"].get("CreationDate"))
+    modified = parse_pdf_date(report["info"].get("ModDate") or report["xmp"].get("ModDate"))
+    timestamps_valid = created is not None
+    if created is not None and modified is not None:
+        if created.tzinfo is None or modified.tzinfo is None:
+            created, modified = created.replace(tzinfo=None), modified.replace(tzinfo=None)
+        timestamps_valid = modified >= created - timedelta(minutes=1)
+    if created is not None:
+        now = datetime.now(created.tzinfo) if created.tzinfo else datetime.now()
+        timestamps_valid = timestamps_valid and created <= now + timedelta(days=1)
+    if not timestamps_valid:
+        findings.append("Creation and modification dates are missing or inconsistent")
+
+    font_consistency = not report["fontsAddedInUpdates"] and not report["mixedEmbeddingFonts"]
+    text_insertion = bool(report["changedPages"])
+    metadata_intact = not report["metadataMismatches"]
+
+    if text_insertion or unsigned_changes or report["fontsAddedInUpdates"]:
+        risk = "High"
+    elif content_updates or not metadata_intact or not font_consistency or not timestamps_valid:
+        risk = "Medium"
+    else:
+        risk = "Low"
+
+    confidence = 90
+    if not report["pageCount"]:
+        confidence -= 25
+    if not report["info"] and not report["xmp"]:
+        confidence -= 10
+
+    summaries = {
+        "Low": "Low risk of alteration. No later revision changed the PDF beyond signatures or annotations, and its metadata is consistent.",
+        "Medium": "Medium risk of alteration. The PDF was re-saved or its metadata is inconsistent, but no page content was replaced.",
+        "High": "High risk of alteration. Page content, fonts or signed content changed after the document was created."
+    }
+    return {
+        "alterabilityRisk": risk,
+        "confidence": confidence,
+        "findings": findings,
+        "summary": summaries[risk],
+        "technicalDetails": {
+            "fontConsistency": font_consistency,
+            "textInsertion": text_insertion,
+            "metadataIntact": metadata_intact,
+            "digitalSignature": bool(signatures),
+            "timestampValidation": timestamps_valid
+        },
+        "forensics": report
+    }
+
+
+def forensic_report(path: Optional[str] = None, content: Optional[bytes] = None) -> dict:
+    """Structural forensics of a PDF (updates, signatures, pages, fonts), memory-mapping `path` when given."""
+    started = time.perf_counter()
+    # mmap cannot map an empty file, and anything this short has no PDF structure to examine
+    head = content[:1024] if content is not None else None
+    if path is not None:
+        with open(path, "rb") as pdf_file:
+            head = pdf_file.read(1024)
+    if not head or b"%PDF-" not in head:
+        raise ValueError("File is empty or not a PDF")
+    if path is not None:
+        with open(path, "rb") as pdf_file, mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            report = PdfForensics(data).report()
+    else:
+        report = PdfForensics(content).report()
+    report["scanTimeMs"] = round((time.perf_counter() - started) * 1000, 2)
+    return report
+
+
+def analyze_pdf(path: Optional[str] = None, content: Optional[bytes] = None) -> dict:
+    """Forensic alterability analysis of a PDF, memory-mapping `path` when given."""
+    return assess(forensic_report(path, content))
@@ -0,0 +1,496 @@
+"""
+Lightweight PDF structure scanner.
+
+Reads the cross-reference data from the end of the file and parses only
+the objects that are asked for, which is orders of magnitude cheaper than
+a full parse. Also holds the small PDF syntax helpers (dictionaries,
+references, strings, streams) shared with the forensics scan.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import mmap
+import re
+import time
+import zlib
+import logging
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+Buffer = Union[bytes, mmap.mmap]
+
+REFERENCE = re.compile(rb"(\d+)\s+(\d+)\s+R")
+OBJECT_HEADER = re.compile(rb"(\d{1,10})[ \t\r\n\f\x00]+(\d{1,5})[ \t\r\n\f\x00]+obj\b")
+OBJECT_END = re.compile(rb">>[ \t\r\n\f\x00]*stream(?:\r\n|\r|\n)|\bendobj\b")
+STARTXREF = re.compile(rb"startxref\s+(\d+)")
+XREF_SUBSECTION = re.compile(rb"(\d+)[ \t]+(\d+)[ \t]*(?:\r\n|\r|\n)")
+HEADER_VERSION = re.compile(rb"%PDF-(\d\.\d)")
+SPACE_OR_COMMENT = re.compile(rb"(?:[ \t\r\n\f\x00]+|%[^\r\n]*)*")
+REGULAR_CHARACTERS = re.compile(rb"[^ \t\r\n\f\x00()<>\[\]{}/%]*")
+ESCAPES = {ord("n"): 10, ord("r"): 13, ord("t"): 9, ord("b"): 8, ord("f"): 12}
+
+# Bytes read for one object before widening the window
+OBJECT_WINDOW = 2048
+# startxref must appear within this many bytes of the end of the file
+TAIL_SIZE = 1024
+# Upper bound for a decompressed stream
+MAX_STREAM_SIZE = 16 * 1024 * 1024
+# Guards against /Prev loops in damaged files
+MAX_XREF_SECTIONS = 1000
+
+INFO_FIELDS = ("Title", "Author", "Creator", "Producer", "CreationDate", "ModDate")
+
+
+class PdfStructureError(Exception):
+    """The file has no usable cross-reference structure."""
+
+
+def _skip_whitespace(data: bytes, pos: int) -> int:
+    return SPACE_OR_COMMENT.match(data, pos).end()
+
+
+def _value_end(data: bytes, pos: int) -> int:
+    """Offset just past the PDF value (dict, array, string, name, ref...) starting at pos."""
+    if pos >= len(data):
+        return pos
+    char = data[pos]
+    if char == 0x28:  # literal string; parentheses nest, backslash escapes
+        depth, i = 0, pos
+        while i < len(data):
+            if data[i] == 0x5C:
+                i += 2
+                continue
+            if data[i] == 0x28:
+                depth += 1
+            elif data[i] == 0x29:
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return len(data)
+    if data.startswith(b"<<", pos) or char == 0x5B:
+        closing = b">>" if char == 0x3C else b"]"
+        i = _skip_whitespace(data, pos + len(closing))
+        while i < len(data) and not data.startswith(closing, i):
+            i = _skip_whitespace(data, _value_end(data, i))
+        return min(len(data), i + len(closing))
+    if char == 0x3C:  # hex string
+        end = data.find(b">", pos)
+        return len(data) if end < 0 else end + 1
+    if char == 0x2F:  # name
+        return REGULAR_CHARACTERS.match(data, pos + 1).end()
+    reference = REFERENCE.match(data, pos)
+    if reference is not None:
+        return reference.end()
+    # Always make progress, even on a stray delimiter
+    return max(REGULAR_CHARACTERS.match(data, pos).end(), pos + 1)
+
+
+def parse_dict(data: bytes) -> Dict[str, bytes]:
+    """Top-level entries of the first dictionary in `data`, values left raw."""
+    start = data.find(b"<<")
+    if start < 0:
+        return {}
+    entries: Dict[str, bytes] = {}
+    i = _skip_whitespace(data, start + 2)
+    while i < len(data) and not data.startswith(b">>", i):
+        if data[i] != 0x2F:
+            i = _skip_whitespace(data, _value_end(data, i))
+            continue
+        key_end = _value_end(data, i)
+        value_start = _skip_whitespace(data, key_end)
+        value_end = _value_end(data, value_start)
+        entries[data[i + 1:key_end].decode("latin-1")] = data[value_start:value_end]
+        i = _skip_whitespace(data, value_end)
+    return entries
+
+
+def reference(value: Optional[bytes]) -> Optional[int]:
+    match = REFERENCE.fullmatch(value.strip()) if value else None
+    return int(match.group(1)) if match else None
+
+
+def references(value: Optional[bytes]) -> List[int]:
+    return [int(number) for number, _ in REFERENCE.findall(value or b"")]
+
+
+def name(value: Optional[bytes]) -> Optional[str]:
+    if not value or not value.startswith(b"/"):
+        return None
+    return value[1:].decode("latin-1")
+
+
+def integer(value: Optional[bytes]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def text(value: Optional[bytes]) -> Optional[str]:
+    """Decode a literal or hex string (PDFDocEncoding or UTF-16BE)."""
+    if not value:
+        return None
+    if value.startswith(b"("):
+        raw = bytearray()
+        i, end = 1, len(value) - 1
+        while i < end:
+            char = value[i]
+            if char == 0x5C and i + 1 < end:
+                following = value[i + 1]
+                if 0x30 <= following <= 0x37:
+                    j = i + 1
+                    while j < end and j < i + 4 and 0x30 <= value[j] <= 0x37:
+                        j += 1
+                    raw.append(int(value[i + 1:j], 8) & 0xFF)
+                    i = j
+                    continue
+                if following in b"\r\n":
+                    i += 3 if value[i + 1:i + 3] == b"\r\n" else 2
+                    continue
+                raw.append(ESCAPES.get(following, following))
+                i += 2
+                continue
+            raw.append(char)
+            i += 1
+        data = bytes(raw)
+    elif value.startswith(b"<"):
+        digits = re.sub(rb"[^0-9A-Fa-f]", b"", value)
+        data = bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii"))
+    else:
+        return None
+    if data.startswith(b"\xfe\xff"):
+        return data[2:].decode("utf-16-be", errors="replace")
+    return data.decode("latin-1")
+
+
+def read_object(data: Buffer, offset: int) -> Tuple[bytes, Optional[int]]:
+    """The value of the object at `offset` and where its stream data starts, if any."""
+    size = len(data)
+    window = OBJECT_WINDOW
+    while True:
+        chunk = bytes(data[offset:offset + window])
+        header = OBJECT_HEADER.match(chunk)
+        if header is None:
+            return b"", None
+        end = OBJECT_END.search(chunk, header.end())
+        if end is not None or offset + window >= size:
+            break
+        window *= 4
+    start = header.end()
+    if end is None:
+        return chunk[start:].strip(), None
+    if end.group(0) == b"endobj":
+        return chunk[start:end.start()].strip(), None
+    # Keep the closing ">>" of the stream dictionary
+    return chunk[start:end.start() + 2].strip(), offset + end.end()
+
+
+def _unpredict(data: bytes, parameters: Dict[str, bytes]) -> bytes:
+    """Undo the PNG row predictors used by cross-reference and object streams."""
+    predictor = integer(parameters.get("Predictor")) or 1
+    if predictor < 10:
+        return data
+    colors = integer(parameters.get("Colors")) or 1
+    bits = integer(parameters.get("BitsPerComponent")) or 8
+    columns = integer(parameters.get("Columns")) or 1
+    row_size = (columns * colors * bits + 7) // 8
+    pixel_size = max(1, colors * bits // 8)
+    rows = len(data) // (row_size + 1)
+    table = np.frombuffer(data[:rows * (row_size + 1)], dtype=np.uint8).reshape(rows, row_size + 1)
+    if rows and (table[:, 0] == 2).all():
+        # "Up" on every row, the usual case: a running sum down each column
+        return np.cumsum(table[:, 1:], axis=0, dtype=np.uint8).tobytes()
+
+    output = bytearray()
+    previous = bytearray(row_size)
+    for row in table:
+        kind, line = int(row[0]), bytearray(row[1:].tobytes())
+        for i in range(row_size):
+            left = line[i - pixel_size] if i >= pixel_size else 0
+            up = previous[i]
+            if kind == 1:
+                line[i] = (line[i] + left) & 0xFF
+            elif kind == 2:
+                line[i] = (line[i] + up) & 0xFF
+            elif kind == 3:
+                line[i] = (line[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                upper_left = previous[i - pixel_size] if i >= pixel_size else 0
+                estimate = left + up - upper_left
+                distances = (abs(estimate - left), abs(estimate - up), abs(estimate - upper_left))
+                closest = (left, up, upper_left)[distances.index(min(distances))]
+                line[i] = (line[i] + closest) & 0xFF
+        output += line
+        previous = line
+    return bytes(output)
+
+
+def decode_stream(
+    data: Buffer,
+    value: bytes,
+    stream_start: int,
+    resolve: Callable[[Optional[bytes]], bytes]
+) -> Optional[bytes]:
+    """Decoded data of a stream object; None unless it is unfiltered or FlateDecode."""
+    entries = parse_dict(value)
+    length = integer(resolve(entries.get("Length")).strip())
+    if length is None or stream_start + length > len(data):
+        end = data.find(b"endstream", stream_start)
+        length = (len(data) if end < 0 else end) - stream_start
+    raw = bytes(data[stream_start:stream_start + length])
+    filters = [name(item) for item in re.findall(rb"/[A-Za-z0-9]+", resolve(entries.get("Filter")))]
+    if not filters:
+        return raw
+    if filters != ["FlateDecode"]:
+        return None
+    try:
+        decoded = zlib.decompressobj().decompress(raw, MAX_STREAM_SIZE)
+    except zlib.error:
+        return None
+    parameters = resolve(entries.get("DecodeParms")).strip()
+    if parameters.startswith(b"["):
+        parameters = parameters[1:-1].strip()
+    return _unpredict(decoded, parse_dict(parameters)) if parameters else decoded
+
+
+class ObjectReader:
+    """Dictionary, reference and stream access on top of an object lookup.
+
+    Subclasses say where objects are: `value` returns an object's raw value
+    and `stream_start` the offset of its stream data, if it has any.
+    """
+
+    data: Buffer
+
+    def value(self, number: Optional[int]) -> bytes:
+        raise NotImplementedError
+
+    def stream_start(self, number: int) -> Optional[int]:
+        raise NotImplementedError
+
+    def dict(self, value: Optional[bytes]) -> Dict[str, bytes]:
+        """Parse an inline dictionary or follow a reference to one."""
+        if not value:
+            return {}
+        number = reference(value)
+        if number is not None:
+            value = self.value(number)
+        return parse_dict(value) if value.lstrip().startswith(b"<<") else {}
+
+    def resolve(self, value: Optional[bytes]) -> bytes:
+        number = reference(value)
+        return self.value(number) if number is not None else (value or b"")
+
+    def stream(self, number: Optional[int]) -> Optional[bytes]:
+        """Decoded stream data of an object; None if it is not a Flate or unfiltered stream."""
+        start = self.stream_start(number) if number is not None else None
+        if start is None:
+            return None
+        return decode_stream(self.data, self.value(number), start, self.resolve)
+
+    def object_stream(self, number: int) -> List[Tuple[int, bytes]]:
+        """(object number, value) pairs held in an object stream."""
+        entries = parse_dict(self.value(number))
+        count, first = integer(entries.get("N")), integer(entries.get("First"))
+        data = self.stream(number)
+        if count is None or first is None or data is None:
+            return []
+        header = data[:first].split()
+        pairs = [(int(header[i]), int(header[i + 1])) for i in range(0, min(len(header), 2 * count) - 1, 2)]
+        objects = []
+        for index, (object_number, relative) in enumerate(pairs):
+            end = first + pairs[index + 1][1] if index + 1 < len(pairs) else len(data)
+            objects.append((object_number, data[first + relative:end].strip()))
+        return objects
+
+    def info(self, trailer: Dict[str, bytes]) -> Dict[str, str]:
+        """Text fields of the document Info dictionary."""
+        entries = self.dict(trailer.get("Info"))
+        values = {}
+        for field in INFO_FIELDS:
+            value = text(self.resolve(entries.get(field)))
+            if value:
+                values[field] = value.strip()
+        return values
+
+
+class PdfScanner(ObjectReader):
+    """Reads a PDF's structure from the end of the file.
+
+    The startxref pointer in the last bytes leads to the newest
+    cross-reference section, and each trailer's /Prev to the one before.
+    Classic xref tables have fixed-width entries, so an object's offset is
+    computed from its number without reading the rest of the table. Only
+    the objects that are asked for are read.
+    """
+
+    def __init__(self, data: Buffer):
+        self.data = data
+        self.size = len(data)
+        self.startxref = self._find_startxref()
+        # Cross-reference sections, newest first
+        self.sections: List[dict] = []
+        # Newest value of every trailer key
+        self.trailer: Dict[str, bytes] = {}
+        self._load_sections()
+        self._values: Dict[int, Tuple[bytes, Optional[int]]] = {}
+        self._object_streams: Dict[int, List[Tuple[int, bytes]]] = {}
+
+    def _find_startxref(self) -> int:
+        tail = bytes(self.data[max(0, self.size - TAIL_SIZE):])
+        matches = STARTXREF.findall(tail)
+        if not matches:
+            raise PdfStructureError("No startxref near the end of the file")
+        offset = int(matches[-1])
+        if offset >= self.size:
+            raise PdfStructureError(f"startxref points past the end of the file ({offset})")
+        return offset
+
+    def _load_sections(self) -> None:
+        pending = [(self.startxref, False)]
+        seen = set()
+        while pending and len(self.sections) < MAX_XREF_SECTIONS:
+            offset, hybrid = pending.pop(0)
+            if offset in seen or not 0 <= offset < self.size:
+                continue
+            seen.add(offset)
+            try:
+                section = self._read_section(offset)
+            except PdfStructureError:
+                if not self.sections:
+                    raise
+                logger.warning(f"Ignoring unreadable cross-reference section at offset {offset}")
+                break
+            # A hybrid file's /XRefStm adds entries to the same revision
+            section["hybrid"] = hybrid
+            self.sections.append(section)
+            for key, value in section["trailer"].items():
+                self.trailer.setdefault(key, value)
+            stream_offset = integer(section["trailer"].get("XRefStm"))
+            if stream_offset is not None:
+                pending.insert(0, (stream_offset, True))
+            previous = integer(section["trailer"].get("Prev"))
+            if previous is not None:
+                pending.append((previous, False))
+
+    def _read_section(self, offset: int) -> dict:
+        if bytes(self.data[offset:offset + 4]) == b"xref":
+            return self._read_table(offset)
+        value, stream_start = read_object(self.data, offset)
+        entries = parse_dict(value)
+        if name(entries.get("Type")) != "XRef" or stream_start is None:
+            raise PdfStructureError(f"No cross-reference section at offset {offset}")
+        data = decode_stream(self.data, value, stream_start, lambda item: item or b"")
+        widths = [int(width) for width in re.findall(rb"\d+", entries.get("W", b""))]
+        if data is None or len(widths) != 3:
+            raise PdfStructureError(f"Unreadable cross-reference stream at offset {offset}")
+        index = [int(item) for item in re.findall(rb"\d+", entries.get("Index", b""))]
+        if not index:
+            index = [0, integer(entries.get("Size")) or 0]
+        ranges, row = [], 0
+        for first, count in zip(index[0::2], index[1::2]):
+            ranges.append((first, count, row))
+            row += count
+        return {
+            "offset": offset, "type": "stream", "trailer": entries,
+            "data": data, "widths": widths, "ranges": ranges
+        }
+
+    def _read_table(self, offset: int) -> dict:
+        subsections = []
+        position = _skip_whitespace(self.data, offset + 4)
+        while True:
+            header = XREF_SUBSECTION.match(self.data, position)
+            if header is None:
+                break
+            first, count, start = int(header.group(1)), int(header.group(2)), header.end()
+            # Entries are 20 bytes; some writers drop the space before "\n"
+            width = 20 if bytes(self.data[start + 18:start + 20]) in (b"\r\n", b" \n", b" \r") else 19
+            subsections.append((first, count, start, width))
+            position = _skip_whitespace(self.data, start + count * width)
+        if bytes(self.data[position:position + 7]) != b"trailer":
+            raise PdfStructureError(f"No trailer after the xref table at offset {offset}")
+        trailer = parse_dict(bytes(self.data[position:position + 4 * OBJECT_WINDOW]))
+        return {"offset": offset, "type": "table", "trailer": trailer, "subsections": subsections}
+
+    def locate(self, number: int) -> Optional[Tuple[str, int, int]]:
+        """("offset", file offset, 0) or ("compressed", object stream, index); None if free or unknown."""
+        for section in self.sections:
+            if section["type"] == "table":
+                for first, count, start, width in section["subsections"]:
+                    if first <= number < first + count:
+                        position = start + (number - first) * width
+                        entry = bytes(self.data[position:position + 18])
+                        if entry[17:18] != b"n":
+                            return None
+                        return ("offset", int(entry[:10]), 0)
+                continue
+            widths = section["widths"]
+            for first, count, row in section["ranges"]:
+                if first <= number < first + count:
+                    position = (row + number - first) * sum(widths)
+                    fields = []
+                    for width in widths:
+                        fields.append(int.from_bytes(section["data"][position:position + width], "big"))
+                        position += width
+                    kind = fields[0] if widths[0] else 1
+                    if kind == 1:
+                        return ("offset", fields[1], 0)
+                    if kind == 2:
+                        return ("compressed", fields[1], fields[2])
+                    return None
+        return None
+
+    def value(self, number: Optional[int]) -> bytes:
+        """Raw value of an object (a dictionary, array, number...)."""
+        if number is None:
+            return b""
+        if number not in self._values:
+            location = self.locate(number)
+            if location is None:
+                self._values[number] = (b"", None)
+            elif location[0] == "offset":
+                self._values[number] = read_object(self.data, location[1])
+            else:
+                stream_number, index = location[1], location[2]
+                if stream_number not in self._object_streams:
+                    self._object_streams[stream_number] = self.object_stream(stream_number)
+                objects = self._object_streams[stream_number]
+                self._values[number] = (objects[index][1] if index < len(objects) else b"", None)
+        return self._values[number][0]
+
+    def stream_start(self, number: int) -> Optional[int]:
+        self.value(number)
+        return self._values[number][1]
+
+    def revisions(self) -> int:
+        """Number of saves: cross-reference sections, not counting hybrid-file streams."""
+        return sum(1 for section in self.sections if not section["hybrid"])
+
+
+def pdf_metadata(data: Buffer) -> dict:
+    """Small structural record of a PDF: version, xref layout, page count, Info."""
+    started = time.perf_counter()
+    scanner = PdfScanner(data)
+    catalog = scanner.dict(scanner.trailer.get("Root"))
+    pages = scanner.dict(catalog.get("Pages"))
+    header = HEADER_VERSION.match(bytes(data[:16]))
+    linearized = b"/Linearized" in bytes(data[:1024])
+    encrypted = "Encrypt" in scanner.trailer
+    revisions = scanner.revisions()
+    return {
+        "version": name(catalog.get("Version")) or (header.group(1).decode("ascii") if header else None),
+        "pageCount": integer(scanner.resolve(pages.get("Count")).strip()),
+        "startxref": scanner.startxref,
+        "xrefOffsets": [section["offset"] for section in scanner.sections],
+        "xrefType": scanner.sections[0]["type"],
+        # A linearized file starts with its own first-page section
+        "incrementalUpdates": max(0, revisions - 1 - (1 if linearized and revisions > 1 else 0)),
+        "linearized": linearized,
+        "encrypted": encrypted,
+        # Strings in an encrypted file's Info dictionary are encrypted too
+        "info": {} if encrypted else scanner.info(scanner.trailer),
+        "scanTimeMs": round((time.perf_counter() - started) * 1000, 3)
+    }
@@ -0,0 +1,177 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_results (
+    content_hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (content_hash, kind, variant, engine_version)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS analysis_results_created_at ON analysis_results (created_at);
+"""
+
+# Export order: creation time, then the primary key to break ties
+EXPORT_ORDER = "created_at, content_hash, kind, variant, engine_version"
+
+CacheKey = Tuple[str, str, str, str]
+
+
+class ResultCache:
+    """Analysis results keyed by (content hash, kind, variant, engine version).
+
+    The variant is whatever else changes the result, e.g. the document type
+    for verification. Results live in SQLite so every worker process shares
+    them, with a small in-process LRU in front. Bumping an engine version
+    makes its old entries unreachable; purge_stale() deletes them.
+    """
+
+    def __init__(self, path: str, memory_size: int = 1024):
+        self.path = path
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[CacheKey, dict]" = OrderedDict()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _remember(self, key: CacheKey, result: dict) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, content_hash: str, kind: str, variant: str, engine_version: str) -> Optional[dict]:
+        key = (content_hash, kind, variant, engine_version)
+        with self._lock:
+            result = self._memory.get(key)
+            if result is None:
+                row = self._conn.execute(
+                    "SELECT result FROM analysis_results"
+                    " WHERE content_hash = ? AND kind = ? AND variant = ? AND engine_version = ?",
+                    key
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+            else:
+                self._memory.move_to_end(key)
+
+            counter = self._hits if result is not None else self._misses
+            counter[kind] = counter.get(kind, 0) + 1
+        return result
+
+    def put(self, content_hash: str, kind: str, variant: str, engine_version: str, result: dict) -> None:
+        key = (content_hash, kind, variant, engine_version)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_results VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(result), datetime.now().isoformat())
+            )
+            self._remember(key, result)
+
+    def latest(
+        self,
+        content_hash: str,
+        kind: str,
+        engine_version: str,
+        variant: Optional[str] = None
+    ) -> Optional[dict]:
+        """Most recent stored result of a kind for this content, without computing anything."""
+        query = (
+            "SELECT variant, result, created_at FROM analysis_results"
+            " WHERE content_hash = ? AND kind = ? AND engine_version = ?"
+        )
+        params = [content_hash, kind, engine_version]
+        if variant is not None:
+            query += " AND variant = ?"
+            params.append(variant)
+        with self._lock:
+            row = self._conn.execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        return {"variant": row[0], "result": json.loads(row[1]), "created_at": row[2]}
+
+    def export(
+        self,
+        kinds: Sequence[str],
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        after: Optional[Tuple[str, str, str, str, str]] = None,
+        page_size: int = 1000
+    ) -> Iterator[Tuple[str, str, str, str, str, str]]:
+        """Stored results as (created_at, content_hash, kind, variant, engine_version, result JSON).
+
+        Rows come in export order, starting after the `after` row, one page
+        at a time: memory stays at one page however many rows match, and the
+        lock is only held while a page is read. `since` is inclusive and
+        `until` exclusive, both ISO timestamps.
+        """
+        conditions = [f"kind IN ({', '.join('?' * len(kinds))})"]
+        params = list(kinds)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        query = f"SELECT {EXPORT_ORDER}, result FROM analysis_results WHERE {' AND '.join(conditions)}"
+        while True:
+            page_query, page_params = query, list(params)
+            if after is not None:
+                page_query += f" AND ({EXPORT_ORDER}) > (?, ?, ?, ?, ?)"
+                page_params.extend(after)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"{page_query} ORDER BY {EXPORT_ORDER} LIMIT ?", (*page_params, page_size)
+                ).fetchall()
+            yield from rows
+            if len(rows) < page_size:
+                return
+            after = rows[-1][:5]
+
+    def purge_stale(self, engine_versions: Dict[str, str]) -> int:
+        """Delete results produced by engine versions other than the current ones."""
+        deleted = 0
+        with self._lock:
+            for kind, version in engine_versions.items():
+                cursor = self._conn.execute(
+                    "DELETE FROM analysis_results WHERE kind = ? AND engine_version != ?", (kind, version)
+                )
+                deleted += cursor.rowcount
+            self._memory = OrderedDict(
+                (key, result) for key, result in self._memory.items()
+                if engine_versions.get(key[1], key[3]) == key[3]
+            )
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            kinds = sorted(set(self._hits) | set(self._misses))
+            per_kind = {}
+            for kind in kinds:
+                hits, misses = self._hits.get(kind, 0), self._misses.get(kind, 0)
+                per_kind[kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0
+                }
+            entries = self._conn.execute("SELECT COUNT(*) FROM analysis_results").fetchone()[0]
+        total_hits = sum(self._hits.values())
+        total = total_hits + sum(self._misses.values())
+        return {
+            "entries": entries,
+            "memory_entries": len(self._memory),
+            "hit_rate": round(total_hits / total, 3) if total else 0.0,
+            "kinds": per_kind
+        }
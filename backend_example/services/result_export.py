@@ -0,0 +1,97 @@
+"""
+NDJSON export of stored analysis results for GET /export/results.
+
+Everything here is a generator: rows are read from the result cache a
+page at a time, turned into lines and (optionally) compressed as they
+are sent, so an export of any size runs in constant memory.
+"""
+
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+import json
+import zlib
+import base64
+from datetime import datetime
+from json.encoder import encode_basestring
+
+# Rows read from SQLite per query
+EXPORT_PAGE_SIZE = 1000
+
+# Lines are sent in blocks of about this many bytes; one line per write
+# would cost a thread hop per row
+BLOCK_BYTES = 64 * 1024
+
+
+def encode_cursor(row: Sequence[str]) -> str:
+    """Opaque cursor for a row: its position in export order."""
+    return _cursor([encode_basestring(part) for part in row[:5]])
+
+
+def _cursor(quoted: Sequence[str]) -> str:
+    return base64.urlsafe_b64encode(f"[{','.join(quoted)}]".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, str, str, str]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, list) or len(position) != 5 or not all(isinstance(part, str) for part in position):
+        raise ValueError("Invalid cursor")
+    return tuple(position)
+
+
+def parse_timestamp(value: Optional[str], name: str) -> Optional[str]:
+    """ISO timestamp in the form results are stored with, or None."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp")
+
+
+def export_lines(
+    result_cache,
+    kinds: Sequence[str],
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+) -> Iterator[str]:
+    """One NDJSON line per stored result, each carrying the cursor to resume after it."""
+    rows = result_cache.export(
+        kinds, since, until, decode_cursor(cursor) if cursor else None, page_size=EXPORT_PAGE_SIZE
+    )
+    for count, row in enumerate(rows):
+        if limit is not None and count >= limit:
+            return
+        # Quote each field once for both the cursor and the line; the stored
+        # result is already JSON and is spliced in rather than parsed
+        quoted = [encode_basestring(part) for part in row[:5]]
+        created_at, content_hash, kind, variant, engine_version = quoted
+        yield (
+            f"{{\"cursor\": \"{_cursor(quoted)}\", \"content_hash\": {content_hash}, \"kind\": {kind},"
+            f" \"variant\": {variant}, \"engine_version\": {engine_version}, \"created_at\": {created_at},"
+            f" \"result\": {row[5]}}}\n"
+        )
+
+
+def encode_blocks(lines: Iterable[str], gzip: bool = False) -> Iterator[bytes]:
+    """Lines joined into blocks of bytes, gzip-compressed as one stream if asked."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    buffered, size = [], 0
+    for line in lines:
+        buffered.append(line.encode("utf-8"))
+        size += len(buffered[-1])
+        if size >= BLOCK_BYTES:
+            block = b"".join(buffered)
+            buffered, size = [], 0
+            if compressor is not None:
+                block = compressor.compress(block)
+            if block:
+                yield block
+    block = b"".join(buffered)
+    if compressor is not None:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
@@ -0,0 +1,294 @@
+from dataclasses import dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS revisions (
+    file_id TEXT PRIMARY KEY,
+    lineage_key TEXT NOT NULL,
+    lineage_id TEXT NOT NULL,
+    parent_id TEXT,
+    version INTEGER NOT NULL,
+    overlap REAL,
+    substantive INTEGER NOT NULL,
+    paragraph_hashes BLOB NOT NULL,
+    page_hashes BLOB NOT NULL,
+    uploaded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS revisions_by_key ON revisions (lineage_key, uploaded_at);
+CREATE INDEX IF NOT EXISTS revisions_by_lineage ON revisions (lineage_id, version);
+CREATE TABLE IF NOT EXISTS revision_paragraphs (
+    paragraph_hash BLOB NOT NULL,
+    file_id TEXT NOT NULL,
+    PRIMARY KEY (paragraph_hash, file_id)
+) WITHOUT ROWID;
+"""
+
+HASH_SIZE = 8
+
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+
+# "Lease v2 (final).pdf", "lease_rev3.pdf" and "Lease - Copy.pdf" share the key "lease"
+VERSION_MARKERS = re.compile(
+    r"\b(?:v|ver|version|rev|revision|draft|amendment)\s*\d+[a-z]?\b|\((?:\d+|[a-z]+)\)|\d{4}-\d{2}-\d{2}|\d{8}"
+    r"|\b(?:final|draft|copy|signed|executed|clean|redline|updated|latest|new|old)\b"
+)
+
+# Headings and page numbers repeat across unrelated documents; they do not count towards overlap
+MIN_PARAGRAPH_LENGTH = 40
+
+# Paragraphs looked up in the shared index to find candidate parents
+SAMPLE_SIZE = 64
+
+
+def lineage_key(filename: str) -> str:
+    """Filename with extension, version markers and punctuation removed."""
+    stem = os.path.splitext(os.path.basename(filename or ""))[0].lower().replace("_", " ")
+    stem = VERSION_MARKERS.sub(" ", stem)
+    return " ".join(re.findall(r"[a-z0-9]+", stem))
+
+
+def digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=HASH_SIZE).digest()
+
+
+def page_digest(page: str) -> bytes:
+    """Hash of a page's text, ignoring how whitespace was extracted."""
+    return digest(" ".join(page.split()))
+
+
+def paragraphs(text: str) -> List[str]:
+    """Whitespace-normalized paragraphs, the unit revisions are diffed in."""
+    return [" ".join(block.split()) for block in PARAGRAPH_SPLIT.split(text) if block.strip()]
+
+
+def _pack(hashes: List[bytes]) -> bytes:
+    return b"".join(hashes)
+
+
+def _unpack(blob: bytes) -> List[bytes]:
+    return [blob[start:start + HASH_SIZE] for start in range(0, len(blob), HASH_SIZE)]
+
+
+@dataclass
+class Revision:
+    file_id: str
+    lineage_id: str
+    version: int
+    parent_id: Optional[str] = None
+    # Jaccard similarity of the substantive paragraphs with the parent
+    overlap: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "file_id": self.file_id,
+            "lineageId": self.lineage_id,
+            "version": self.version,
+            "parentId": self.parent_id,
+            "overlap": self.overlap
+        }
+
+
+class RevisionTracker:
+    """Recognizes uploads that are new versions of a known document.
+
+    Each document is registered once with the hashes of its paragraphs and
+    pages. Its parent is the best match among earlier documents with the
+    same filename stem or sharing many paragraphs (found through a paragraph
+    hash index), provided the paragraph overlap is high enough. Revisions
+    are diffed paragraph by paragraph and page by page from the stored
+    hashes, without re-reading either file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Overlap needed when the filenames differ, and when they share a stem
+        self.min_overlap = float(os.getenv("REVISION_MIN_OVERLAP", "0.5"))
+        self.min_named_overlap = float(os.getenv("REVISION_MIN_NAMED_OVERLAP", "0.2"))
+        self._revisions: Dict[str, Revision] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _row_to_revision(self, row: Tuple) -> Revision:
+        file_id, lineage_id, version, parent_id, overlap = row
+        return Revision(file_id, lineage_id, version, parent_id, overlap)
+
+    def get(self, file_id: str) -> Optional[Revision]:
+        revision = self._revisions.get(file_id)
+        if revision is not None:
+            return revision
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_id, lineage_id, version, parent_id, overlap FROM revisions WHERE file_id = ?",
+                (file_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        revision = self._revisions[file_id] = self._row_to_revision(row)
+        return revision
+
+    def _hashes(self, file_id: str) -> Tuple[List[bytes], List[bytes]]:
+        row = self._conn.execute(
+            "SELECT paragraph_hashes, page_hashes FROM revisions WHERE file_id = ?", (file_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(file_id)
+        return _unpack(row[0]), _unpack(row[1])
+
+    def _candidates(self, key: str, substantive: List[bytes], uploaded_at: str) -> Dict[str, bool]:
+        """Earlier uploads worth comparing with, mapped to whether they share the filename stem."""
+        candidates = {}
+        if key:
+            for (candidate,) in self._conn.execute(
+                "SELECT file_id FROM revisions WHERE lineage_key = ? AND uploaded_at < ?"
+                " ORDER BY uploaded_at DESC LIMIT 20",
+                (key, uploaded_at)
+            ):
+                candidates[candidate] = True
+        if substantive:
+            step = max(1, len(substantive) // SAMPLE_SIZE)
+            sample = substantive[::step][:SAMPLE_SIZE]
+            placeholders = ",".join("?" * len(sample))
+            for (candidate,) in self._conn.execute(
+                f"SELECT paragraphs.file_id FROM revision_paragraphs AS paragraphs"
+                f" JOIN revisions ON revisions.file_id = paragraphs.file_id"
+                f" WHERE paragraphs.paragraph_hash IN ({placeholders}) AND revisions.uploaded_at < ?"
+                f" GROUP BY paragraphs.file_id ORDER BY COUNT(*) DESC LIMIT 5",
+                (*sample, uploaded_at)
+            ):
+                candidates.setdefault(candidate, False)
+        return candidates
+
+    def register(self, file_id: str, filename: str, pages: List[str], uploaded_at: Optional[str] = None) -> Revision:
+        """Record a document and link it to the earlier upload it most likely revises."""
+        revision = self.get(file_id)
+        if revision is not None:
+            return revision
+
+        paragraph_texts = [paragraph for page in pages for paragraph in paragraphs(page)]
+        paragraph_hashes = [digest(paragraph) for paragraph in paragraph_texts]
+        page_hashes = [page_digest(page) for page in pages]
+        substantive = list(dict.fromkeys(
+            hashed for hashed, paragraph in zip(paragraph_hashes, paragraph_texts)
+            if len(paragraph) >= MIN_PARAGRAPH_LENGTH
+        ))
+        key = lineage_key(filename)
+        uploaded_at = uploaded_at or datetime.now().isoformat()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                parent_id, overlap = None, None
+                own = set(substantive)
+                for candidate, same_name in self._candidates(key, substantive, uploaded_at).items():
+                    theirs = {hashed for hashed in self._hashes(candidate)[0] if hashed in own}
+                    candidate_substantive = self._conn.execute(
+                        "SELECT substantive FROM revisions WHERE file_id = ?", (candidate,)
+                    ).fetchone()[0]
+                    union = len(own) + candidate_substantive - len(theirs)
+                    similarity = len(theirs) / union if union else float(same_name)
+                    threshold = self.min_named_overlap if same_name else self.min_overlap
+                    if similarity >= threshold and (overlap is None or similarity > overlap):
+                        parent_id, overlap = candidate, round(similarity, 4)
+
+                if parent_id is not None:
+                    lineage_id = self._conn.execute(
+                        "SELECT lineage_id FROM revisions WHERE file_id = ?", (parent_id,)
+                    ).fetchone()[0]
+                    version = self._conn.execute(
+                        "SELECT MAX(version) FROM revisions WHERE lineage_id = ?", (lineage_id,)
+                    ).fetchone()[0] + 1
+                else:
+                    lineage_id, version = file_id, 1
+
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO revisions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (file_id, key, lineage_id, parent_id, version, overlap, len(substantive),
+                     _pack(paragraph_hashes), _pack(page_hashes), uploaded_at)
+                ).rowcount
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO revision_paragraphs VALUES (?, ?)",
+                    ((hashed, file_id) for hashed in substantive)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if not inserted:
+            # Another worker registered it first
+            return self.get(file_id)
+        revision = self._revisions[file_id] = Revision(file_id, lineage_id, version, parent_id, overlap)
+        if parent_id is not None:
+            logger.info(f"{file_id} is version {version} of {lineage_id} (overlap {overlap} with {parent_id})")
+        return revision
+
+    def lineage(self, lineage_id: str) -> List[Revision]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT file_id, lineage_id, version, parent_id, overlap FROM revisions"
+                " WHERE lineage_id = ? ORDER BY version",
+                (lineage_id,)
+            ).fetchall()
+        return [self._row_to_revision(row) for row in rows]
+
+    def diff(self, file_id: str, base_id: Optional[str] = None) -> Optional[dict]:
+        """Paragraph- and page-level changes from `base_id` (default: the parent) to `file_id`."""
+        revision = self.get(file_id)
+        if revision is None:
+            raise KeyError(file_id)
+        base_id = base_id or revision.parent_id
+        if base_id is None:
+            return None
+        with self._lock:
+            base_paragraphs, base_pages = self._hashes(base_id)
+            current_paragraphs, current_pages = self._hashes(file_id)
+
+        # Hashes compare in O(1); autojunk would ignore repeated boilerplate paragraphs
+        matcher = SequenceMatcher(None, base_paragraphs, current_paragraphs, autojunk=False)
+        changes, unchanged = [], 0
+        for operation, base_start, base_end, start, end in matcher.get_opcodes():
+            if operation == "equal":
+                unchanged += end - start
+                continue
+            changes.append({
+                "type": {"replace": "changed", "delete": "removed", "insert": "added"}[operation],
+                "baseParagraphs": [base_start, base_end],
+                "paragraphs": [start, end]
+            })
+
+        page_matcher = SequenceMatcher(None, base_pages, current_pages, autojunk=False)
+        changed_pages, removed_pages = [], []
+        for operation, base_start, base_end, start, end in page_matcher.get_opcodes():
+            if operation in ("replace", "insert"):
+                changed_pages.extend(range(start + 1, end + 1))
+            if operation in ("replace", "delete"):
+                removed_pages.extend(range(base_start + 1, base_end + 1))
+
+        return {
+            "baseId": base_id,
+            "identical": base_paragraphs == current_paragraphs,
+            "paragraphs": {
+                "total": len(current_paragraphs),
+                "unchanged": unchanged,
+                "changes": changes
+            },
+            "pages": {
+                "total": len(current_pages),
+                "changed": changed_pages,
+                "changedBasePages": removed_pages
+            }
+        }
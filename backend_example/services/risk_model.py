@@ -0,0 +1,209 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+import os
+import json
+import math
+import hashlib
+import logging
+import numpy as np
+
+if TYPE_CHECKING:
+    from services.verification_engine import CheckResult
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Inputs of the model, in column order
+FEATURES = (
+    "structure_failed",
+    "signatures_failed",
+    "content_integrity_failed",
+    "metadata_failed",
+    "tampering_failed",
+    "near_duplicates_failed",
+    "legal_compliance_failed",
+    "incomplete_checks",
+    "incremental_updates",
+    "garbled_ratio",
+    "compliance_gap",
+    "missing_elements",
+    "weakest_clause_score",
+    "near_duplicate_similarity",
+    "signature_blocks",
+    "witness_or_notary"
+)
+
+RISK_LEVELS = ("Low", "Medium", "High")
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "risk_model.json")
+
+
+def risk_features(results: Dict[str, "CheckResult"]) -> Dict[str, float]:
+    """Model inputs from the verification check results of one document."""
+
+    def failed(name: str) -> float:
+        return 0.0 if name not in results or results[name].passed else 1.0
+
+    def details(name: str) -> dict:
+        return results[name].details if name in results else {}
+
+    incomplete = sum(1 for result in results.values() if result.status not in ("passed", "failed"))
+    compliance = details("legal_compliance")
+    clause_scores = list(compliance.get("clauseScores", {}).values())
+    duplicates = details("near_duplicates").get("matches", [])
+    signatures = details("signatures")
+    return {
+        "structure_failed": failed("structure"),
+        "signatures_failed": failed("signatures"),
+        "content_integrity_failed": failed("content_integrity"),
+        "metadata_failed": failed("metadata"),
+        "tampering_failed": failed("tampering"),
+        "near_duplicates_failed": failed("near_duplicates"),
+        "legal_compliance_failed": failed("legal_compliance"),
+        "incomplete_checks": incomplete / max(1, len(results)),
+        # Signing and annotating updates say nothing about tampering
+        "incremental_updates": math.log1p(details("tampering").get(
+            "unvouchedUpdates", max(0, details("tampering").get("revisions", 0) - 1)
+        )),
+        "garbled_ratio": min(1.0, 100 * details("content_integrity").get("garbledRatio", 0.0)),
+        "compliance_gap": 1 - compliance.get("complianceScore", 0) / 100 if compliance else 1.0,
+        "missing_elements": math.log1p(len(compliance.get("missingElements", []))),
+        "weakest_clause_score": min(clause_scores) if clause_scores else 1.0,
+        "near_duplicate_similarity": max((match["similarity"] for match in duplicates), default=0.0),
+        "signature_blocks": math.log1p(signatures.get("signatureBlocks", 0)),
+        "witness_or_notary": 1.0 if signatures.get("witness") or signatures.get("notary") else 0.0
+    }
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exponentials = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exponentials / exponentials.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(logits: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-logits))
+
+
+class RiskModel:
+    """Logistic models for authenticity and risk level over verification features.
+
+    Two linear heads share one feature matrix: a logistic regression for
+    the probability that the document is authentic and a softmax
+    regression over Low / Medium / High risk. Scoring any number of
+    documents is two matrix products, so a batch of thousands costs
+    about as much as one. Weights are stored by feature name in JSON;
+    `fit` retrains them from labelled feature rows.
+    """
+
+    def __init__(
+        self,
+        authenticity_weights: np.ndarray,
+        authenticity_bias: float,
+        risk_weights: np.ndarray,
+        risk_bias: np.ndarray
+    ):
+        # (features,) and (features, levels)
+        self.authenticity_weights = np.asarray(authenticity_weights, dtype=np.float64)
+        self.authenticity_bias = float(authenticity_bias)
+        self.risk_weights = np.asarray(risk_weights, dtype=np.float64)
+        self.risk_bias = np.asarray(risk_bias, dtype=np.float64)
+        self.version = hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "RiskModel":
+        path = path or os.getenv("RISK_MODEL_PATH", DEFAULT_MODEL_PATH)
+        with open(path) as model_file:
+            data = json.load(model_file)
+        # Features the file does not mention get weight 0
+        authenticity = data["authenticity"]["weights"]
+        risk = data["risk"]["weights"]
+        model = cls(
+            np.array([authenticity.get(name, 0.0) for name in FEATURES]),
+            data["authenticity"]["bias"],
+            np.array([risk.get(name, [0.0] * len(RISK_LEVELS)) for name in FEATURES]),
+            np.array(data["risk"]["bias"])
+        )
+        logger.info(f"Loaded risk model {model.version} from {path}")
+        return model
+
+    def to_dict(self) -> dict:
+        return {
+            "authenticity": {
+                "bias": round(self.authenticity_bias, 4),
+                "weights": {name: round(float(weight), 4) for name, weight in zip(FEATURES, self.authenticity_weights)}
+            },
+            "risk": {
+                "levels": list(RISK_LEVELS),
+                "bias": [round(float(bias), 4) for bias in self.risk_bias],
+                "weights": {
+                    name: [round(float(weight), 4) for weight in weights]
+                    for name, weights in zip(FEATURES, self.risk_weights)
+                }
+            }
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as model_file:
+            json.dump(self.to_dict(), model_file, indent=2)
+            model_file.write("\n")
+
+    @staticmethod
+    def matrix(rows: Sequence[Dict[str, float]]) -> np.ndarray:
+        """(documents, features) matrix from feature dicts."""
+        return np.array([[row.get(name, 0.0) for name in FEATURES] for row in rows], dtype=np.float64).reshape(-1, len(FEATURES))
+
+    def predict(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """Authenticity probabilities (documents,) and risk level probabilities (documents, levels)."""
+        return {
+            "authenticity": _sigmoid(features @ self.authenticity_weights + self.authenticity_bias),
+            "risk": _softmax(features @ self.risk_weights + self.risk_bias)
+        }
+
+    def score(self, rows: Sequence[Dict[str, float]]) -> List[dict]:
+        """riskLevel, confidence and authenticityScore for every feature dict, in one batch."""
+        if not rows:
+            return []
+        features = self.matrix(rows)
+        predicted = self.predict(features)
+        levels = predicted["risk"].argmax(axis=1)
+        # Checks that timed out or failed to run make every answer less certain
+        completed = 1 - features[:, FEATURES.index("incomplete_checks")]
+        confidence = np.round(100 * predicted["risk"].max(axis=1) * completed)
+        authenticity = np.round(100 * predicted["authenticity"])
+        return [
+            {
+                "riskLevel": RISK_LEVELS[level],
+                "confidence": int(confidence[row]),
+                "authenticityScore": int(authenticity[row]),
+                "isAuthentic": bool(authenticity[row] >= 70)
+            }
+            for row, level in enumerate(levels)
+        ]
+
+    @classmethod
+    def fit(
+        cls,
+        features: np.ndarray,
+        authentic: np.ndarray,
+        risk_levels: np.ndarray,
+        iterations: int = 2000,
+        learning_rate: float = 0.5,
+        l2: float = 1e-3
+    ) -> "RiskModel":
+        """Train both heads by full-batch gradient descent.
+
+        `authentic` holds 0/1 labels and `risk_levels` indexes into RISK_LEVELS.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        count, width = features.shape
+        targets = np.eye(len(RISK_LEVELS))[np.asarray(risk_levels)]
+        authentic = np.asarray(authentic, dtype=np.float64)
+        authenticity_weights, authenticity_bias = np.zeros(width), 0.0
+        risk_weights, risk_bias = np.zeros((width, len(RISK_LEVELS))), np.zeros(len(RISK_LEVELS))
+        for _ in range(iterations):
+            error = _sigmoid(features @ authenticity_weights + authenticity_bias) - authentic
+            authenticity_weights -= learning_rate * (features.T @ error / count + l2 * authenticity_weights)
+            authenticity_bias -= learning_rate * error.mean()
+            error = _softmax(features @ risk_weights + risk_bias) - targets
+            risk_weights -= learning_rate * (features.T @ error / count + l2 * risk_weights)
+            risk_bias -= learning_rate * error.mean(axis=0)
+        return cls(authenticity_weights, authenticity_bias, risk_weights, risk_bias)
@@ -0,0 +1,333 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from services.clause_library import ClauseLibrary
+from services.entity_extractor import EntityIndex
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_PACK = "generic"
+
+# Patterns are matched within one paragraph; a blank line ends every match
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    label: str
+    category: str  # required_element, signature_block, witness, notary, date_format
+    kind: str  # "required": must be present, "forbidden": must not be present
+    weight: int
+    min_count: int
+    # Clause types whose section heading also satisfies a required rule
+    clauses: Tuple[str, ...] = ()
+    # Whether the rule is judged by similarity to its clause exemplars instead of its patterns
+    has_exemplars: bool = False
+    # Kind of entity (e.g. "date") whose spans are counted instead of pattern matches
+    entity: Optional[str] = None
+
+
+class RulePack:
+    """Rules for one document type, compiled into a single regex.
+
+    Every pattern of every rule becomes one alternative of the combined
+    expression, so evaluating the pack is a single finditer pass over the
+    text. Matches may only start at a word boundary and the text is
+    lowercased first, so patterns are written in lowercase without a
+    leading \\b. That keeps each alternative starting with a plain literal,
+    which the regex engine rejects with a single character comparison.
+
+    The text is scanned paragraph by paragraph. Given a chunk store, the
+    matches of each paragraph are kept under the pack's fingerprint, so
+    boilerplate shared with earlier documents is not scanned again.
+
+    Rules with `exemplars` are clause rules: they are met when some part
+    of the document is similar enough to one of the exemplars, which the
+    pack's ClauseLibrary measures for all of them at once. Rules with an
+    `entity` kind count the document's extracted entity spans of that
+    kind and need no patterns.
+    """
+
+    def __init__(self, document_type: str, rules: List[dict], aliases: Optional[List[str]] = None):
+        self.document_type = document_type
+        self.aliases = list(aliases or [])
+        # Cosine similarity to an exemplar at which a clause counts as present
+        self.min_similarity = float(os.getenv("CLAUSE_MIN_SIMILARITY", "0.15"))
+        # Identifies the compiled rules in chunk store artifact names
+        self.fingerprint = hashlib.sha256(
+            json.dumps([document_type, rules], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        self.rules: List[Rule] = []
+        # Marker group name -> index of the rule whose pattern matched
+        self._rule_of_group: Dict[str, int] = {}
+        alternatives = []
+        for position, rule in enumerate(rules):
+            self.rules.append(Rule(
+                id=rule["id"],
+                label=rule.get("label", rule["id"]),
+                category=rule.get("category", "required_element"),
+                kind=rule.get("kind", "required"),
+                weight=int(rule.get("weight", 1)),
+                min_count=int(rule.get("min_count", 1)),
+                clauses=tuple(rule.get("clauses", ())),
+                has_exemplars=bool(rule.get("exemplars")),
+                entity=rule.get("entity")
+            ))
+            for pattern in rule.get("patterns", []):
+                # Validate each pattern on its own so a bad rule names itself
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"Invalid pattern in rule {rule['id']} ({document_type}): {e}")
+                # An empty group after the pattern is the last group to close,
+                # so `lastgroup` names it without putting a group op in front
+                group = f"m{len(self._rule_of_group)}"
+                self._rule_of_group[group] = position
+                alternatives.append(f"(?:{pattern})(?P<{group}>)")
+        self.matcher = re.compile(r"\b(?:" + "|".join(alternatives) + ")", re.MULTILINE) if alternatives else None
+        exemplars = {rule["id"]: rule["exemplars"] for rule in rules if rule.get("exemplars")}
+        self.library = ClauseLibrary(exemplars) if exemplars else None
+
+    def _scan(self, paragraph: str) -> Tuple[Tuple[int, int, int], ...]:
+        """(rule position, match count, first offset) of every rule matching a lowercased paragraph."""
+        counts: Dict[int, int] = {}
+        first_offsets: Dict[int, int] = {}
+        if self.matcher is None:
+            return ()
+        for match in self.matcher.finditer(paragraph):
+            position = self._rule_of_group[match.lastgroup]
+            counts[position] = counts.get(position, 0) + 1
+            first_offsets.setdefault(position, match.start())
+        return tuple((position, count, first_offsets[position]) for position, count in counts.items())
+
+    def evaluate(self, text: str, chunk_store=None, clauses=None, entities: Optional[EntityIndex] = None) -> dict:
+        """Score the text against the pack.
+
+        With the document's clause index, a required rule is also met by a
+        section whose heading names one of the rule's clause types, and
+        every finding points at the section it is in. Entity rules read the
+        document's entity index, which is extracted here if not given.
+        """
+        counts = [0] * len(self.rules)
+        first_offsets: Dict[int, int] = {}
+        lowered = text.lower()
+        artifact = f"rules:{self.fingerprint}"
+        paragraphs, paragraph_starts = [], []
+        start = 0
+        for separator in [*PARAGRAPH_BREAK.finditer(lowered), None]:
+            end = separator.start() if separator is not None else len(lowered)
+            paragraph = lowered[start:end]
+            paragraphs.append(paragraph)
+            paragraph_starts.append(start)
+            if chunk_store is not None:
+                matches = chunk_store.artifact(paragraph, artifact, self._scan)
+            else:
+                matches = self._scan(paragraph)
+            for position, count, offset in matches:
+                counts[position] += count
+                first_offsets.setdefault(position, start + offset)
+            if separator is not None:
+                start = separator.end()
+
+        if any(rule.entity for rule in self.rules):
+            if entities is None:
+                entities = EntityIndex.from_text(text)
+            for position, rule in enumerate(self.rules):
+                spans = entities.of_kind(rule.entity) if rule.entity else []
+                if spans:
+                    counts[position] = len(spans)
+                    first_offsets[position] = spans[0].start
+
+        similarity = self.library.match(paragraphs, paragraph_starts, chunk_store) if self.library is not None else {}
+
+        def heading(rule: Rule):
+            """The first section whose heading names one of the rule's clause types."""
+            if clauses is not None:
+                for name in rule.clauses:
+                    for clause in clauses.of_type(name):
+                        return clause
+            return None
+
+        def similar(rule: Rule) -> bool:
+            return rule.id in similarity and similarity[rule.id]["score"] >= self.min_similarity
+
+        def located(position: int):
+            """The section a rule is about: its heading, else where it was found."""
+            rule = self.rules[position]
+            clause = heading(rule)
+            if clause is None and clauses is not None:
+                if similar(rule) and similarity[rule.id]["offset"] is not None:
+                    clause = clauses.containing(similarity[rule.id]["offset"])
+                elif position in first_offsets:
+                    clause = clauses.containing(first_offsets[position])
+            return clause.to_dict() if clause is not None else None
+
+        missing, violations = [], []
+        sections = {}
+        total_weight = present_weight = 0
+        for position, rule in enumerate(self.rules):
+            if rule.kind == "forbidden":
+                if counts[position]:
+                    violations.append({
+                        "id": rule.id,
+                        "label": rule.label,
+                        "entity": rule.entity,
+                        "offset": first_offsets[position],
+                        "section": located(position)
+                    })
+                continue
+            total_weight += rule.weight
+            found = similar(rule) if rule.has_exemplars else counts[position] >= rule.min_count
+            if found or heading(rule) is not None:
+                present_weight += rule.weight
+                section = located(position)
+                if section is not None:
+                    sections[rule.id] = section
+            else:
+                missing.append(rule)
+
+        return {
+            "documentType": self.document_type,
+            "missingElements": [rule.id for rule in missing],
+            "missingLabels": [rule.label for rule in missing],
+            "violations": violations,
+            "complianceScore": round(100 * present_weight / total_weight) if total_weight else 100,
+            "matches": {rule.id: counts[position] for position, rule in enumerate(self.rules)},
+            "clauseScores": {clause_id: match["score"] for clause_id, match in similarity.items()},
+            "sections": sections
+        }
+
+
+def normalize_document_type(document_type: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", (document_type or "").lower()).strip("_")
+
+
+def directory_signature(directory: str) -> Tuple[Tuple[str, int, int], ...]:
+    """Name, mtime and size of every rule pack file; changes when any file does."""
+    signature = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            stat = os.stat(os.path.join(directory, name))
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class RulePackRegistry:
+    """All rule packs, looked up by document type or alias.
+
+    `version` is a hash of the rule pack files, so every process that loads
+    the same files reports the same version.
+    """
+
+    def __init__(self, packs: Dict[str, RulePack], version: str = ""):
+        if DEFAULT_PACK not in packs:
+            raise ValueError(f"Rule packs must include a '{DEFAULT_PACK}' pack")
+        self.packs = packs
+        self.version = version
+        self.loaded_at = datetime.now().isoformat()
+        self._lookup: Dict[str, RulePack] = {}
+        for pack in packs.values():
+            for name in [pack.document_type, *pack.aliases]:
+                self._lookup[normalize_document_type(name)] = pack
+
+    @classmethod
+    def load(cls, directory: str) -> "RulePackRegistry":
+        """Compile every *.json rule pack in a directory."""
+        packs = {}
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(directory, name), "rb") as pack_file:
+                raw = pack_file.read()
+            digest.update(name.encode("utf-8") + b"\0" + raw + b"\0")
+            data = json.loads(raw)
+            document_type = normalize_document_type(data.get("document_type", name[:-len(".json")]))
+            packs[document_type] = RulePack(document_type, data["rules"], data.get("aliases"))
+        version = digest.hexdigest()[:12]
+        logger.info(f"Compiled {len(packs)} rule packs from {directory} (version {version})")
+        return cls(packs, version)
+
+    def get(self, document_type: str) -> RulePack:
+        return self._lookup.get(normalize_document_type(document_type), self.packs[DEFAULT_PACK])
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "packs": {
+                document_type: {"aliases": pack.aliases, "rules": len(pack.rules)}
+                for document_type, pack in self.packs.items()
+            }
+        }
+
+
+class RulePackWatcher:
+    """Keeps the rule packs in sync with a directory while the server runs.
+
+    A daemon thread polls the directory and compiles changed packs off the
+    request path. The new registry replaces the old one in a single
+    assignment, so a verification sees either the old rules or the new ones,
+    never a mix. A pack that fails to compile is logged and the current
+    rules stay in place. Every worker process runs its own watcher over the
+    same directory and converges on the same version.
+    """
+
+    def __init__(self, directory: str, poll_interval: float = 2.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._signature = directory_signature(directory)
+        self.registry = RulePackRegistry.load(directory)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> str:
+        return self.registry.version
+
+    def get(self, document_type: str) -> RulePack:
+        return self.registry.get(document_type)
+
+    def reload(self) -> bool:
+        """Compile the directory again and swap it in; False if it did not compile."""
+        try:
+            registry = RulePackRegistry.load(self.directory)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Keeping rule packs {self.registry.version}, reload failed: {str(e)}")
+            return False
+        if registry.version != self.registry.version:
+            logger.info(f"Rule packs updated from {self.registry.version} to {registry.version}")
+        self.registry = registry
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None or self.poll_interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="rule-pack-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                signature = directory_signature(self.directory)
+            except OSError as e:
+                logger.error(f"Cannot read rule pack directory {self.directory}: {str(e)}")
+                continue
+            if signature != self._signature:
+                self._signature = signature
+                self.reload()
@@ -0,0 +1,264 @@
+from typing import Callable, Dict, List, Optional
+import os
+import re
+import json
+import asyncio
+import hashlib
+import logging
+import tiktoken
+from services.chunk_store import ChunkStore
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bump when the prompts change so cached partial summaries are not reused
+SUMMARY_PROMPT_VERSION = "1"
+
+# About one paragraph in this many ends a chunk once it is half full
+BOUNDARY_ODDS = 4
+
+CHUNK_SUMMARY_PROMPT = (
+    "You are a legal document analysis assistant. Summarize the following excerpt of a "
+    "legal document in a few sentences. Keep parties, amounts, dates, obligations and "
+    "deadlines; omit boilerplate."
+)
+
+REDUCE_PROMPT = (
+    "You are a legal document analysis assistant. The following are summaries of consecutive "
+    "sections of one legal document. Combine them into a JSON object with two fields: "
+    "\"summary\" (one paragraph describing the whole document) and \"keyPoints\" "
+    "(a list of at most 8 short strings). Respond with the JSON object only."
+)
+
+GROUP_REDUCE_PROMPT = (
+    "You are a legal document analysis assistant. The following are summaries of consecutive "
+    "sections of one legal document. Combine them into one summary of a few sentences per "
+    "section. Keep parties, amounts, dates, obligations and deadlines; omit boilerplate."
+)
+
+
+class SummarizationService:
+    """Map-reduce summarizer: per-chunk summaries in parallel, combined in rounds until one call fits."""
+
+    def __init__(self, openai_service, result_cache=None, chunk_store: Optional[ChunkStore] = None):
+        self.openai_service = openai_service
+        # Persists partial summaries so every worker and every later revision reuses them
+        self.result_cache = result_cache
+        # Token counts and partial summaries of chunks shared with other documents
+        self.chunk_store = chunk_store if chunk_store is not None else ChunkStore()
+        self.chunk_tokens = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1500"))
+        # Most partial summaries sent to one combining call, within the model's context
+        self.reduce_tokens = int(os.getenv("SUMMARY_REDUCE_TOKENS", "3000"))
+        self.max_concurrency = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+        self._encoding = None
+
+    def _count_tokens(self, text: str) -> int:
+        return self.chunk_store.artifact(text, f"tokens:{self.openai_service.model}", self._encode_length)
+
+    def _encode_length(self, text: str) -> int:
+        if self._encoding is None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.openai_service.model)
+            except Exception as e:
+                logger.warning(f"Tokenizer unavailable, estimating token counts: {str(e)}")
+                self._encoding = False
+        if self._encoding is False:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def split_into_chunks(self, text: str) -> List[str]:
+        """Split text into chunks of at most chunk_tokens tokens.
+
+        Chunks are built from whole paragraphs and, once half full, end at
+        a paragraph whose hash marks a boundary. Boundaries depend only on
+        the text around them, so after an edit the chunks realign at the
+        next boundary and the hashes of all other chunks stay the same.
+        """
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for paragraph in re.split(r"\n\s*\n", text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            tokens = self._count_tokens(paragraph)
+            if tokens > self.chunk_tokens:
+                # Oversized paragraph: close the current chunk and split by sentences
+                if current:
+                    chunks.append("\n\n".join(current))
+                    current, current_tokens = [], 0
+                chunks.extend(self._split_long_paragraph(paragraph))
+                continue
+            if current and current_tokens + tokens > self.chunk_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(paragraph)
+            current_tokens += tokens
+            if current_tokens * 2 >= self.chunk_tokens and self._is_boundary(paragraph):
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    def _is_boundary(self, paragraph: str) -> bool:
+        return hashlib.blake2b(paragraph.encode("utf-8"), digest_size=1).digest()[0] % BOUNDARY_ODDS == 0
+
+    def _split_long_paragraph(self, paragraph: str) -> List[str]:
+        pieces: List[str] = []
+        current = ""
+        for sentence in re.split(r"(?<=[.;:!?])\s+", paragraph):
+            candidate = f"{current} {sentence}".strip()
+            if current and self._count_tokens(candidate) > self.chunk_tokens:
+                pieces.append(current)
+                candidate = sentence
+            current = candidate
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def _chunk_key(self, chunk: str) -> str:
+        material = f"{SUMMARY_PROMPT_VERSION}:{self.openai_service.model}:{chunk}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _partial_name(self) -> str:
+        return f"summary:{SUMMARY_PROMPT_VERSION}:{self.openai_service.model}"
+
+    async def _complete(self, system_prompt: str, content: str, max_tokens: int) -> str:
+        circuit = self.openai_service.circuit
+        if circuit.is_open:
+            raise RuntimeError("LLM circuit is open")
+        try:
+            response = await self.openai_service.async_client.chat.completions.create(
+                model=self.openai_service.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": content}
+                ],
+                temperature=0.2,
+                max_tokens=max_tokens
+            )
+        except Exception:
+            circuit.record_failure()
+            raise
+        circuit.record_success()
+        if not response.choices or not response.choices[0].message:
+            raise ValueError("No message in OpenAI API response")
+        return (response.choices[0].message.content or "").strip()
+
+    async def summarize_chunks(
+        self,
+        chunks: List[str],
+        on_progress: Optional[Callable[[float], None]] = None
+    ) -> List[str]:
+        """Summarize every chunk, reusing cached partial summaries by chunk hash."""
+        keys = [self._chunk_key(chunk) for chunk in chunks]
+        name = self._partial_name()
+        partials: Dict[str, str] = {}
+        for key, chunk in zip(keys, chunks):
+            summary = self.chunk_store.get(chunk, name)
+            if summary is None and self.result_cache is not None:
+                cached = await asyncio.to_thread(self.result_cache.get, key, "summary_chunk", "", SUMMARY_PROMPT_VERSION)
+                if cached is not None:
+                    summary = cached["summary"]
+                    self.chunk_store.put(chunk, name, summary)
+            if summary is not None:
+                partials[key] = summary
+
+        missing = {key: chunk for key, chunk in zip(keys, chunks) if key not in partials}
+        logger.info(f"Summarizing {len(missing)} of {len(chunks)} chunks ({len(chunks) - len(missing)} cached)")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def summarize(key: str, chunk: str) -> None:
+            async with semaphore:
+                summary = await self._complete(CHUNK_SUMMARY_PROMPT, chunk, max_tokens=300)
+            partials[key] = summary
+            self.chunk_store.put(chunk, name, summary)
+            if self.result_cache is not None:
+                await asyncio.to_thread(
+                    self.result_cache.put, key, "summary_chunk", "", SUMMARY_PROMPT_VERSION, {"summary": summary}
+                )
+            if on_progress is not None:
+                # Leave the last step for the reduce call
+                on_progress(0.9 * len(partials) / len(keys))
+
+        await asyncio.gather(*(summarize(key, chunk) for key, chunk in missing.items()))
+        return [partials[key] for key in keys]
+
+    async def summarize(
+        self,
+        text: str,
+        on_progress: Optional[Callable[[float], None]] = None,
+        key_facts: str = ""
+    ) -> dict:
+        """Produce the `summary` / `keyPoints` response for a document text.
+
+        `key_facts` (parties, dates, amounts extracted from the document) are
+        given to the combining call so the summary uses their exact form.
+        """
+        chunks = self.split_into_chunks(text)
+        if not chunks:
+            raise ValueError("Empty document text")
+
+        partials = await self.summarize_chunks(chunks, on_progress)
+        budget = self.reduce_tokens - (self._count_tokens(key_facts) if key_facts else 0)
+        sections = await self.reduce_partials(partials, budget)
+        combined = "\n\n".join(f"Section {i + 1}: {summary}" for i, summary in enumerate(sections))
+        if key_facts:
+            combined = f"Key facts of the document:\n{key_facts}\n\n{combined}"
+        reduced = await self._complete(REDUCE_PROMPT, combined, max_tokens=700)
+        if on_progress is not None:
+            on_progress(1.0)
+        return self._parse_reduced(reduced, partials)
+
+    def _group(self, summaries: List[str], budget: int) -> List[List[str]]:
+        """Consecutive summaries in groups of at most `budget` tokens, at least two to a group."""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for summary in summaries:
+            tokens = self._count_tokens(summary)
+            if len(current) >= 2 and current_tokens + tokens > budget:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    async def reduce_partials(self, partials: List[str], budget: int) -> List[str]:
+        """Combine partial summaries in rounds until they fit in one call of `budget` tokens.
+
+        Each round merges groups of consecutive summaries that fit the
+        budget, so a document of any length ends up with a handful of
+        section summaries for the final call.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def combine(group: List[str]) -> str:
+            if len(group) == 1:
+                return group[0]
+            content = "\n\n".join(f"Section {i + 1}: {summary}" for i, summary in enumerate(group))
+            async with semaphore:
+                return await self._complete(GROUP_REDUCE_PROMPT, content, max_tokens=500)
+
+        summaries = partials
+        while len(summaries) > 1 and sum(self._count_tokens(summary) for summary in summaries) > budget:
+            groups = self._group(summaries, budget)
+            logger.info(f"Combining {len(summaries)} partial summaries in {len(groups)} groups")
+            summaries = list(await asyncio.gather(*(combine(group) for group in groups)))
+        return summaries
+
+    def _parse_reduced(self, reduced: str, partials: List[str]) -> dict:
+        match = re.search(r"\{.*\}", reduced, re.DOTALL)
+        try:
+            data = json.loads(match.group(0) if match else reduced)
+            summary = str(data["summary"]).strip()
+            key_points = [str(point).strip() for point in data.get("keyPoints", []) if str(point).strip()]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Could not parse combined summary as JSON, using raw text")
+            summary = reduced
+            key_points = [partial.split(". ")[0].rstrip(".") for partial in partials[:8]]
+        return {"summary": summary, "keyPoints": key_points}
@@ -0,0 +1,362 @@
+"""
+Built-in verification checks and the /verify response they populate.
+
+Each check is a plain function of the artifacts it declares; the
+verification engine runs them concurrently in worker threads.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import re
+import logging
+from services.pdf_forensics import forensic_report, unvouched_updates
+from services.verification_engine import Check, CheckResult
+from services.risk_model import risk_features
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SECTION_PATTERN = re.compile(
+    r"^\s*(?:(?:article|section|clause|schedule)\s+[\dIVXivx]+|\d+(?:\.\d+)*[.)]?\s+[A-Z]|[IVX]+\.\s+[A-Z])",
+    re.IGNORECASE | re.MULTILINE
+)
+SIGNATURE_PATTERN = re.compile(
+    r"in witness whereof|signed(?: and delivered)? by|signature\s*:|/s/\s*\w|^\s*by\s*:\s*_{3,}|_{8,}",
+    re.IGNORECASE | re.MULTILINE
+)
+WITNESS_PATTERN = re.compile(r"\bwitness(?:ed|es)?\b(?! whereof)", re.IGNORECASE)
+NOTARY_PATTERN = re.compile(r"\bnotary public\b|\bsworn (?:to )?(?:and subscribed )?before me\b", re.IGNORECASE)
+
+# Fewer extractable characters per page than this suggests a scanned image
+MIN_CHARACTERS_PER_PAGE = 100
+
+# Leading bytes expected for each extension
+FILE_SIGNATURES = {
+    ".pdf": b"%PDF-",
+    ".docx": b"PK\x03\x04",
+    ".doc": b"\xd0\xcf\x11\xe0",
+    ".rtf": b"{\\rtf"
+}
+
+
+def check_structure(artifacts: Dict[str, Any]) -> dict:
+    text = artifacts["text"]
+    sections = len(SECTION_PATTERN.findall(text))
+    paragraphs = len([block for block in re.split(r"\n\s*\n", text) if block.strip()])
+    passed = len(text) >= 200 and (sections >= 2 or paragraphs >= 3)
+    issues, recommendations = [], []
+    if not passed:
+        issues.append("Document has no recognizable sections or paragraph structure")
+        recommendations.append("Check document formatting")
+    return {
+        "passed": passed,
+        "issues": issues,
+        "recommendations": recommendations,
+        "details": {"sections": sections, "paragraphs": paragraphs}
+    }
+
+
+def check_signatures(artifacts: Dict[str, Any]) -> dict:
+    text = artifacts["text"]
+    signature_blocks = len(SIGNATURE_PATTERN.findall(text))
+    witness = bool(WITNESS_PATTERN.search(text))
+    notary = bool(NOTARY_PATTERN.search(text))
+    issues, recommendations = [], []
+    if not signature_blocks:
+        issues.append("No signature block found")
+        recommendations.append("Add signature blocks for all parties")
+    return {
+        "passed": signature_blocks > 0,
+        "issues": issues,
+        "recommendations": recommendations,
+        "details": {"signatureBlocks": signature_blocks, "witness": witness, "notary": notary}
+    }
+
+
+def check_content_integrity(artifacts: Dict[str, Any]) -> dict:
+    text = artifacts["text"]
+    metadata = artifacts["metadata"]
+    garbled = text.count("�") + sum(1 for char in text if ord(char) < 32 and char not in "\n\r\t\f")
+    garbled_ratio = garbled / max(1, len(text))
+    # Very little text per page (or for a large file) usually means a scanned image
+    page_count = (metadata.get("pdf") or {}).get("pageCount")
+    if page_count:
+        scanned = len(text) / page_count < MIN_CHARACTERS_PER_PAGE
+    else:
+        scanned = metadata.get("size", 0) > 50000 and len(text) / max(1, metadata.get("size", 0)) < 0.005
+    issues, recommendations = [], []
+    if garbled_ratio > 0.01:
+        issues.append("Document text contains unreadable or corrupted characters")
+        recommendations.append("Re-export the document from its original source")
+    if metadata["filename"].lower().endswith(".pdf") and scanned:
+        issues.append("Little extractable text; the document may be a scanned image")
+        recommendations.append("Provide a text-based PDF so the content can be verified")
+    return {
+        "passed": not issues,
+        "issues": issues,
+        "recommendations": recommendations,
+        "details": {"garbledRatio": round(garbled_ratio, 4), "textLength": len(text)}
+    }
+
+
+def check_metadata(artifacts: Dict[str, Any]) -> dict:
+    content = artifacts["content"]
+    metadata = artifacts["metadata"]
+    name = metadata["filename"].lower()
+    extension = name[name.rfind("."):] if "." in name else ""
+    issues = []
+    expected = FILE_SIGNATURES.get(extension)
+    if expected is not None and not content.startswith(expected):
+        issues.append(f"File content does not match its {extension} extension")
+    if extension == ".txt" and b"\x00" in content[:8192]:
+        issues.append("Text file contains binary data")
+    if metadata.get("size") != len(content):
+        issues.append("Stored file size does not match the uploaded content")
+    # Scanned at upload; None means the cross-reference structure could not be read
+    if content.startswith(b"%PDF-") and "pdf" in metadata and metadata["pdf"] is None:
+        issues.append("PDF cross-reference structure is damaged")
+    return {
+        "passed": not issues,
+        "issues": issues,
+        "recommendations": ["Verify the file was not renamed or converted"] if issues else [],
+        "details": {"extension": extension}
+    }
+
+
+def check_tampering(artifacts: Dict[str, Any]) -> dict:
+    content = artifacts["content"]
+    pdf = artifacts["metadata"].get("pdf")
+    forensics = artifacts["forensics"]
+    issues = []
+    revisions = 0
+    if forensics is not None:
+        # Signing and annotating are updates too; only count those that may have changed content
+        revisions = forensics["incrementalUpdates"] + 1
+        unvouched = unvouched_updates(forensics)
+        if unvouched:
+            issues.append(f"PDF was modified after creation ({unvouched} incremental update(s))")
+        if any(signature["changedAfterSigning"] for signature in forensics["signatures"]):
+            issues.append("PDF was changed after it was signed")
+    else:
+        if pdf is not None:
+            # Each incremental update adds a cross-reference section
+            revisions = pdf["incrementalUpdates"] + 1
+        elif content.startswith(b"%PDF-"):
+            # Each incremental update appends another %%EOF marker
+            revisions = content.count(b"%%EOF")
+        unvouched = max(0, revisions - 1)
+        if unvouched:
+            issues.append(f"PDF was modified after creation ({unvouched} incremental update(s))")
+    return {
+        "passed": not issues,
+        "issues": issues,
+        "recommendations": ["Obtain the original unmodified document"] if issues else [],
+        "details": {"revisions": revisions, "unvouchedUpdates": unvouched}
+    }
+
+
+def check_near_duplicates(artifacts: Dict[str, Any]) -> dict:
+    matches = artifacts["near_duplicates"]
+    issues = [
+        f"Nearly identical to {match['filename']} uploaded {match['uploaded_at'][:10]}"
+        f" ({round(match['similarity'] * 100)}% similar)"
+        for match in matches[:3]
+    ]
+    return {
+        "passed": not matches,
+        "issues": issues,
+        "recommendations": ["Compare with the earlier upload to see what changed"] if matches else [],
+        "details": {"matches": matches}
+    }
+
+
+def check_legal_compliance(artifacts: Dict[str, Any]) -> dict:
+    # The pack is compiled once at startup; paragraphs any document already contained are not rescanned
+    evaluation = artifacts["rule_pack"].evaluate(
+        artifacts["text"], artifacts["chunk_store"], artifacts["clauses"], artifacts["entities"]
+    )
+    issues = [f"Missing required element: {label}" for label in evaluation["missingLabels"]]
+    issues.extend(f"{violation['label']} found" for violation in evaluation["violations"])
+    recommendations = [f"Add {label.lower()}" for label in evaluation["missingLabels"]]
+    if any(violation["entity"] == "ambiguous_date" for violation in evaluation["violations"]):
+        recommendations.append("Write dates unambiguously, e.g. \"4 March 2024\"")
+    return {
+        "passed": not issues,
+        "issues": issues,
+        "recommendations": recommendations,
+        "details": {**evaluation, "keyFacts": artifacts["entities"].key_facts()}
+    }
+
+
+DEFAULT_CHECKS: List[Check] = [
+    Check("structure", check_structure, requires=("text",)),
+    Check("signatures", check_signatures, requires=("text",)),
+    Check("content_integrity", check_content_integrity, requires=("text", "metadata")),
+    Check("metadata", check_metadata, requires=("content", "metadata")),
+    Check("tampering", check_tampering, requires=("content", "metadata", "forensics")),
+    Check("legal_compliance", check_legal_compliance, requires=("text", "rule_pack", "chunk_store", "clauses", "entities"))
+]
+
+
+def find_near_duplicates(document_service, near_duplicates, file_id: str) -> List[dict]:
+    """Earlier uploads this upload nearly duplicates; read-only, documents are indexed when uploaded."""
+    if near_duplicates is None:
+        return []
+    metadata = document_service.get_metadata(file_id)
+    return near_duplicates.find_duplicates(
+        file_id, lambda: document_service.get_context(file_id).text, metadata.get("uploaded_at", "")
+    )
+
+
+def _forensics(document_service, file_id: str) -> Optional[dict]:
+    """Forensic report of a PDF upload whose structure could be read at upload, else None."""
+    if document_service.get_metadata(file_id).get("pdf") is None:
+        return None
+    path = document_service.content_path(file_id)
+    try:
+        return forensic_report(path, None if path is not None else document_service.files[file_id]["content"])
+    except Exception as e:
+        logger.warning(f"PDF forensics of {file_id} failed: {str(e)}")
+        return None
+
+
+def build_artifact_providers(document_service, rule_packs) -> Dict[str, Callable[[str, str], Any]]:
+    return {
+        "forensics": lambda file_id, document_type: _forensics(document_service, file_id),
+        "rule_pack": lambda file_id, document_type: rule_packs.get(document_type),
+        "chunk_store": lambda file_id, document_type: document_service.chunk_store,
+        "text": lambda file_id, document_type: document_service.get_context(file_id).text,
+        "clauses": lambda file_id, document_type: document_service.get_context(file_id).clauses,
+        "entities": lambda file_id, document_type: document_service.get_context(file_id).entities,
+        "metadata": lambda file_id, document_type: document_service.get_metadata(file_id),
+        "content": lambda file_id, document_type: document_service.files[file_id]["content"],
+        "document_type": lambda file_id, document_type: document_type
+    }
+
+
+def _summary(passed_count: int, total: int, document_type: str, issues: List[str]) -> str:
+    summary = f"{passed_count} of {total} verification checks passed for this {document_type}."
+    if issues:
+        summary += f" Main concern: {issues[0]}."
+    return summary
+
+
+def compose_verification_result(results: Dict[str, CheckResult], document_type: str, risk_model=None) -> dict:
+    """Fill the /verify response schema from the individual check results.
+
+    With a risk model, riskLevel, confidence and authenticity come from it;
+    otherwise from fixed penalties per failed check.
+    """
+
+    def passed(name: str) -> bool:
+        return name in results and results[name].passed
+
+    issues: List[str] = []
+    recommendations: List[str] = []
+    for result in results.values():
+        issues.extend(result.issues)
+        recommendations.extend(item for item in result.recommendations if item not in recommendations)
+
+    authenticity_score = 100
+    for name, penalty in (("tampering", 35), ("metadata", 20), ("content_integrity", 15), ("signatures", 10)):
+        if not passed(name):
+            authenticity_score -= penalty
+    completed = sum(1 for result in results.values() if result.status in ("passed", "failed"))
+    confidence = round(95 * completed / max(1, len(results)))
+
+    compliance = results.get("legal_compliance")
+    missing_elements = compliance.details.get("missingElements", []) if compliance else []
+    compliance_score = compliance.details.get("complianceScore", 0) if compliance else 0
+    sections = compliance.details.get("sections", {}) if compliance else {}
+    clause_scores = compliance.details.get("clauseScores", {}) if compliance else {}
+    key_facts = compliance.details.get("keyFacts", {}) if compliance else {}
+
+    if not passed("tampering") or authenticity_score < 60:
+        risk_level = "High"
+    elif issues:
+        risk_level = "Medium"
+    else:
+        risk_level = "Low"
+
+    features = risk_features(results)
+    if risk_model is not None:
+        scores = risk_model.score([features])[0]
+        risk_level, confidence = scores["riskLevel"], scores["confidence"]
+        authenticity_score = scores["authenticityScore"]
+
+    passed_count = sum(1 for result in results.values() if result.passed)
+    summary = _summary(passed_count, len(results), document_type, issues)
+
+    return {
+        "isValid": passed("structure") and passed("content_integrity"),
+        "confidence": confidence,
+        "isAuthentic": authenticity_score >= 70,
+        "authenticityScore": authenticity_score,
+        "issues": issues,
+        "recommendations": recommendations,
+        "summary": summary,
+        "riskLevel": risk_level,
+        "analysisDetails": {
+            "structureValidation": passed("structure"),
+            "signatureVerification": passed("signatures"),
+            "contentIntegrity": passed("content_integrity"),
+            "metadataAnalysis": passed("metadata"),
+            "tamperingDetection": passed("tampering")
+        },
+        "legalCompliance": {
+            "isCompliant": not missing_elements and compliance_score >= 70,
+            "missingElements": missing_elements,
+            "complianceScore": compliance_score,
+            "clauseScores": clause_scores,
+            "sections": sections
+        },
+        "nearDuplicates": [],
+        "keyFacts": key_facts,
+        "riskFeatures": features,
+        "riskModel": risk_model.version if risk_model is not None else None
+    }
+
+
+def add_near_duplicates(
+    result: dict,
+    matches: List[dict],
+    document_type: str,
+    duration_ms: float = 0.0,
+    risk_model=None
+) -> dict:
+    """The /verify response of one upload: its content's result plus the near-duplicate check.
+
+    Everything else depends only on the document's bytes and is cached by
+    content hash. Which earlier uploads a document duplicates depends on
+    the upload, so this check runs on every verification and the risk
+    level is scored again with it.
+    """
+    outcome = check_near_duplicates({"near_duplicates": matches})
+    result = dict(result)
+    result["issues"] = [*result["issues"], *outcome["issues"]]
+    result["recommendations"] = [
+        *result["recommendations"],
+        *(item for item in outcome["recommendations"] if item not in result["recommendations"])
+    ]
+    result["checks"] = [
+        *result["checks"],
+        {"name": "near_duplicates", "status": "passed" if outcome["passed"] else "failed", "duration_ms": duration_ms}
+    ]
+    result["nearDuplicates"] = matches
+
+    checks = result["checks"]
+    incomplete = sum(1 for check in checks if check["status"] not in ("passed", "failed"))
+    features = dict(result["riskFeatures"])
+    features["near_duplicates_failed"] = 0.0 if outcome["passed"] else 1.0
+    features["near_duplicate_similarity"] = max((match["similarity"] for match in matches), default=0.0)
+    features["incomplete_checks"] = incomplete / len(checks)
+    result["riskFeatures"] = features
+
+    if risk_model is not None:
+        result.update(risk_model.score([features])[0])
+    else:
+        result["confidence"] = round(95 * (len(checks) - incomplete) / len(checks))
+        if result["riskLevel"] == "Low" and result["issues"]:
+            result["riskLevel"] = "Medium"
+    passed_count = sum(1 for check in checks if check["status"] == "passed")
+    result["summary"] = _summary(passed_count, len(checks), document_type, result["issues"])
+    return result
@@ -0,0 +1,130 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import time
+import asyncio
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[str, float], None]
+
+
+@dataclass(frozen=True)
+class Check:
+    """One verification check.
+
+    `func` receives a dict holding only the artifacts listed in `requires`
+    and returns a dict with `passed` plus optional `issues`,
+    `recommendations` and `details`. A check that runs longer than
+    `timeout` seconds is reported as timed out.
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], dict]
+    requires: Tuple[str, ...]
+    timeout: float = 5.0
+
+
+@dataclass
+class CheckResult:
+    name: str
+    status: str  # "passed", "failed", "timeout" or "error"
+    duration_ms: float
+    issues: List[str] = field(default_factory=list)
+    recommendations: List[str] = field(default_factory=list)
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def passed(self) -> bool:
+        return self.status == "passed"
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "status": self.status, "duration_ms": self.duration_ms}
+
+
+class VerificationEngine:
+    """Runs every check concurrently, each in a worker thread, over lazily built document artifacts.
+
+    Each check is awaited for at most its `timeout` (and never past the
+    verification's deadline), then reported as timed out. A thread cannot
+    be stopped, so a check that overran keeps running in the background
+    until it returns, but the verification no longer waits for it.
+    """
+
+    def __init__(
+        self,
+        checks: List[Check],
+        artifact_providers: Dict[str, Callable[[str, str], Any]],
+        compose: Callable[[Dict[str, CheckResult], str], dict]
+    ):
+        self.checks = checks
+        # artifact name -> fn(file_id, document_type)
+        self.artifact_providers = artifact_providers
+        # Builds the /verify response from the check results
+        self.compose = compose
+        # Seconds after which checks still running are reported as timed out
+        self.deadline = float(os.getenv("VERIFY_DEADLINE", "10"))
+
+    async def _build_artifacts(self, file_id: str, document_type: str) -> Dict[str, Any]:
+        names = sorted({name for check in self.checks for name in check.requires})
+        unknown = [name for name in names if name not in self.artifact_providers]
+        if unknown:
+            raise ValueError(f"No provider for artifacts: {', '.join(unknown)}")
+        values = await asyncio.gather(*(
+            asyncio.to_thread(self.artifact_providers[name], file_id, document_type) for name in names
+        ))
+        return dict(zip(names, values))
+
+    async def _run_check(self, check: Check, artifacts: Dict[str, Any], timeout: float) -> CheckResult:
+        inputs = {name: artifacts[name] for name in check.requires}
+        started = time.perf_counter()
+        try:
+            if timeout <= 0:
+                raise asyncio.TimeoutError
+            outcome = await asyncio.wait_for(asyncio.to_thread(check.func, inputs), timeout)
+            status = "passed" if outcome.get("passed") else "failed"
+        except asyncio.TimeoutError:
+            logger.warning(f"Check {check.name} did not finish within {timeout:.1f}s")
+            outcome, status = {"issues": [f"Check '{check.name}' did not finish in time"]}, "timeout"
+        except Exception as e:
+            logger.error(f"Check {check.name} failed: {str(e)}")
+            outcome, status = {"issues": [f"Check '{check.name}' could not be completed"]}, "error"
+
+        return CheckResult(
+            name=check.name,
+            status=status,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+            issues=list(outcome.get("issues", [])),
+            recommendations=list(outcome.get("recommendations", [])),
+            details=dict(outcome.get("details", {}))
+        )
+
+    async def verify(
+        self,
+        file_id: str,
+        document_type: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        started = time.perf_counter()
+        artifacts = await self._build_artifacts(file_id, document_type)
+        remaining = self.deadline - (time.perf_counter() - started)
+
+        done = 0
+
+        async def run(check: Check) -> CheckResult:
+            nonlocal done
+            result = await self._run_check(check, artifacts, min(check.timeout, remaining))
+            done += 1
+            if on_progress is not None:
+                on_progress("verify", done / len(self.checks))
+            return result
+
+        # The checks only read the artifacts, so they are independent of each other
+        outcomes = await asyncio.gather(*(run(check) for check in self.checks))
+        results: Dict[str, CheckResult] = {result.name: result for result in outcomes}
+
+        response = self.compose(results, document_type)
+        response["checks"] = [results[check.name].to_dict() for check in self.checks]
+        response["verificationTimeMs"] = round((time.perf_counter() - started) * 1000, 2)
+        return response
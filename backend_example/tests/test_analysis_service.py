@@ -0,0 +1,58 @@
+"""
+Verification results shared through the result cache.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import asyncio
+import hashlib
+import os
+
+from bulk_analyze import build_analysis_service
+from services.near_duplicates import NearDuplicateIndex
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules")
+TEXT = (
+    "This Agreement is made between Acme Corporation and Jane Smith.\n\n"
+    "1. Services. The Consultant shall provide consulting services.\n\n"
+    "2. Payment. The Company shall pay 5000 USD per month.\n\n"
+    "3. Governing Law. This Agreement is governed by the laws of New York.\n\n"
+) * 4
+
+
+def add_file(service, file_id: str, uploaded_at: str, index: NearDuplicateIndex) -> None:
+    content = TEXT.encode()
+    service.document_service.files[file_id] = {
+        "filename": file_id,
+        "content_type": "text/plain",
+        "size": len(content),
+        "uploaded_at": uploaded_at,
+        "content_hash": hashlib.sha256(content).hexdigest(),
+        "pdf": None,
+        "content": content
+    }
+    index.index_document(file_id, service.document_service.get_context(file_id).text, file_id, uploaded_at)
+
+
+def test_near_duplicates_are_not_shared_through_the_cache(tmp_path):
+    store = str(tmp_path / "results.db")
+    run_index = NearDuplicateIndex(str(tmp_path / "run.db"))
+    bulk = build_analysis_service(["verify"], "extractive", str(tmp_path), RULES_DIR, store, run_index)
+    add_file(bulk, "archive/a.txt", "2026-01-01T00:00:00", run_index)
+    add_file(bulk, "archive/b.txt", "2026-01-02T00:00:00", run_index)
+
+    first = asyncio.run(bulk.verify("archive/a.txt", "contract"))
+    second = asyncio.run(bulk.verify("archive/b.txt", "contract"))
+    assert first["nearDuplicates"] == []
+    assert [match["file_id"] for match in second["nearDuplicates"]] == ["archive/a.txt"]
+    assert second["riskFeatures"]["near_duplicates_failed"] == 1.0
+
+    # Another process sharing the store, such as the API, with its own index
+    api_index = NearDuplicateIndex(str(tmp_path / "api.db"))
+    api = build_analysis_service(["verify"], "extractive", str(tmp_path), RULES_DIR, store, api_index)
+    add_file(api, "upload", "2026-02-01T00:00:00", api_index)
+    cached = asyncio.run(api.verify("upload", "contract"))
+    assert cached["nearDuplicates"] == []
+    assert cached["riskFeatures"]["near_duplicates_failed"] == 0.0
+    assert api.result_cache.stats()["kinds"]["verify"]["hits"] == 1
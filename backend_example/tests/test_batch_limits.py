@@ -0,0 +1,51 @@
+"""
+Size and count limits on uploaded batch archives.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import io
+import zipfile
+
+import pytest
+
+from services.batch_verifier import BatchTooLargeError, check_upload_size, read_zip
+
+
+def archive(members: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, content in members.items():
+            zip_file.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def test_read_zip_skips_hidden_files_and_folders():
+    documents = list(read_zip(archive({
+        "contracts/lease.txt": b"Lease",
+        "contracts/.DS_Store": b"",
+        "__MACOSX/contracts/._lease.txt": b"",
+        "nda.pdf": b"%PDF-1.4"
+    }), max_files=10, max_bytes=1000))
+
+    assert documents == [("lease.txt", "text/plain", b"Lease"), ("nda.pdf", "application/pdf", b"%PDF-1.4")]
+
+
+def test_read_zip_enforces_limits():
+    with pytest.raises(BatchTooLargeError, match="at most 2"):
+        list(read_zip(archive({"a.txt": b"a", "b.txt": b"b", "c.txt": b"c"}), max_files=2, max_bytes=1000))
+    # Highly compressible content is rejected by its expanded size
+    with pytest.raises(BatchTooLargeError, match="expands"):
+        list(read_zip(archive({"bomb.txt": b"0" * 100_000}), max_files=2, max_bytes=1000))
+    with pytest.raises(ValueError, match="not a valid zip"):
+        list(read_zip(io.BytesIO(b"not a zip"), max_files=2, max_bytes=1000))
+
+
+def test_check_upload_size_rewinds_or_rejects():
+    upload = io.BytesIO(b"x" * 10)
+    assert check_upload_size(upload, max_bytes=10, chunk_size=3) == 10
+    assert upload.tell() == 0
+    with pytest.raises(BatchTooLargeError):
+        check_upload_size(upload, max_bytes=9, chunk_size=3)
@@ -0,0 +1,36 @@
+"""
+Local extractive summaries of documents without much sentence structure.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+from services.extractive_summarizer import MAX_SENTENCE_LENGTH, MAX_SUMMARY_LENGTH, ExtractiveSummarizer
+
+
+def test_one_item_per_line_is_not_one_sentence():
+    text = "\n".join(f"Schedule item {item} covers delivery lot {item * 7} to site {item % 13}" for item in range(5000))
+    summarizer = ExtractiveSummarizer()
+    sentences = summarizer.split_sentences(text)
+    assert len(sentences) == 5000
+    assert len(summarizer.summarize(text)["summary"]) <= MAX_SUMMARY_LENGTH
+
+
+def test_wrapped_lines_stay_one_sentence():
+    text = "The Consultant shall provide the services\nset out in the schedule to this agreement.\nPayment is due monthly in arrears."
+    assert ExtractiveSummarizer().split_sentences(text) == [
+        "The Consultant shall provide the services set out in the schedule to this agreement.",
+        "Payment is due monthly in arrears."
+    ]
+
+
+def test_run_on_sentences_are_cut():
+    text = " ".join(["party"] * 2000) + "."
+    sentences = ExtractiveSummarizer().split_sentences(text)
+    assert len(sentences) > 1
+    assert max(len(sentence) for sentence in sentences) <= MAX_SENTENCE_LENGTH
+
+
+def test_document_without_sentences_falls_back_to_its_beginning():
+    result = ExtractiveSummarizer().summarize("Lease agreement.")
+    assert result == {"summary": "Lease agreement.", "keyPoints": ["Lease agreement."]}
@@ -0,0 +1,102 @@
+"""
+Leases, retries and idempotency of the durable job queue.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import time
+
+from services.job_queue import JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JobQueue
+
+
+def test_expired_lease_is_redelivered_to_another_worker(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job = queue.enqueue("verify", {"file_id": "a"})
+
+    assert queue.lease("worker-1", visibility_timeout=0.05)["job_id"] == job["job_id"]
+    assert queue.lease("worker-2", visibility_timeout=60) is None
+    time.sleep(0.1)
+
+    redelivered = queue.lease("worker-2", visibility_timeout=60)
+    assert redelivered["job_id"] == job["job_id"]
+    assert redelivered["attempts"] == 2
+    # The first worker lost its lease and can no longer finish the job
+    assert not queue.complete(job["job_id"], "worker-1", {"ok": True})
+    assert queue.complete(job["job_id"], "worker-2", {"ok": True})
+    assert queue.get(job["job_id"])["status"] == JOB_SUCCEEDED
+
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job = queue.enqueue("verify", {})
+    queue.lease("worker-1", visibility_timeout=0.05)
+
+    assert queue.heartbeat(job["job_id"], "worker-1", visibility_timeout=60, stages={"extract": 1.0})
+    time.sleep(0.1)
+    assert queue.lease("worker-2", visibility_timeout=60) is None
+    assert queue.get(job["job_id"])["stages"] == {"extract": 1.0}
+
+
+def test_failed_job_is_retried_until_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job = queue.enqueue("verify", {}, max_attempts=2)
+
+    queue.lease("worker-1", visibility_timeout=60)
+    assert queue.fail(job["job_id"], "worker-1", "boom")
+    assert queue.get(job["job_id"])["status"] == JOB_QUEUED
+    # Backoff: the retry is not available straight away
+    assert queue.lease("worker-1", visibility_timeout=60) is None
+
+    queue._conn.execute("UPDATE jobs SET available_at = 0")
+    assert queue.lease("worker-1", visibility_timeout=60)["attempts"] == 2
+    assert queue.fail(job["job_id"], "worker-1", "boom again")
+    failed = queue.get(job["job_id"])
+    assert failed["status"] == JOB_FAILED
+    assert failed["error"] == "boom again"
+    assert failed["finished_at"] is not None
+
+
+def test_job_whose_last_lease_expires_is_given_up(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job = queue.enqueue("verify", {}, max_attempts=1)
+    queue.lease("worker-1", visibility_timeout=0.05)
+    time.sleep(0.1)
+
+    assert queue.lease("worker-2", visibility_timeout=60) is None
+    assert queue.get(job["job_id"])["status"] == JOB_FAILED
+    assert queue.get(job["job_id"])["error"] == "Worker lease expired"
+
+
+def test_fail_without_retry_finishes_the_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job = queue.enqueue("verify", {})
+    queue.lease("worker-1", visibility_timeout=60)
+
+    assert queue.fail(job["job_id"], "worker-1", "bad input", retry=False)
+    assert queue.get(job["job_id"])["status"] == JOB_FAILED
+    assert queue.count_queued() == 0
+
+
+def test_idempotency_key_returns_the_existing_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    first = queue.enqueue("verify", {"file_id": "a"}, idempotency_key="key-1")
+    second = queue.enqueue("verify", {"file_id": "b"}, idempotency_key="key-1")
+    other = queue.enqueue("verify", {"file_id": "a"}, idempotency_key="key-2")
+
+    assert second["job_id"] == first["job_id"]
+    assert second["params"] == {"file_id": "a"}
+    assert other["job_id"] != first["job_id"]
+    assert queue.count_queued() == 2
+
+
+def test_release_hands_jobs_back_without_using_an_attempt(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job = queue.enqueue("verify", {})
+    queue.lease("worker-1", visibility_timeout=60)
+    assert queue.get(job["job_id"])["status"] == JOB_RUNNING
+
+    assert queue.release("worker-1") == 1
+    released = queue.lease("worker-2", visibility_timeout=60)
+    assert released["job_id"] == job["job_id"]
+    assert released["attempts"] == 1
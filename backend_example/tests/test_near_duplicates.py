@@ -0,0 +1,40 @@
+"""
+MinHash signatures and the LSH index of near-duplicate uploads.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+from services.near_duplicates import NearDuplicateIndex, minhash_signature
+
+WORDS = " ".join(f"word{index}" for index in range(400))
+EDITED = WORDS.replace("word200 ", "changed ")
+OTHER = " ".join(f"other{index}" for index in range(400))
+
+
+def test_signature_estimates_similarity():
+    original, edited, other = (minhash_signature(text) for text in (WORDS, EDITED, OTHER))
+    assert (original == minhash_signature(WORDS)).all()
+    assert (original == edited).mean() > 0.9
+    assert (original == other).mean() < 0.1
+    assert minhash_signature("too short") is None
+
+
+def test_only_earlier_uploads_are_reported(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+    index.index_document("first", WORDS, "first.txt", "2026-01-01T00:00:00")
+    index.index_document("unrelated", OTHER, "unrelated.txt", "2026-01-01T00:00:00")
+    index.index_document("second", EDITED, "second.txt", "2026-01-02T00:00:00")
+
+    matches = index.find_duplicates("second", lambda: EDITED, "2026-01-02T00:00:00")
+    assert [match["file_id"] for match in matches] == ["first"]
+    assert matches[0]["similarity"] > 0.9
+    assert index.find_duplicates("first", lambda: WORDS, "2026-01-01T00:00:00") == []
+
+
+def test_unindexed_document_is_compared_without_being_stored(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "near_duplicates.db"))
+    index.index_document("first", WORDS, "first.txt", "2026-01-01T00:00:00")
+
+    assert index.find_duplicates("copy", lambda: WORDS, "2026-01-02T00:00:00")[0]["similarity"] == 1.0
+    assert index.signature("copy") is None
@@ -0,0 +1,42 @@
+"""
+Matching copies against the registry of known originals.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import pytest
+
+from services.original_registry import OriginalRegistry
+
+PAGES = [f"Page {page} of the agreement.\n\nClause {page} applies." for page in range(1, 6)]
+REVISED = [f"Page {page} of the revised agreement.\n\nClause {page} no longer applies." for page in range(1, 6)]
+
+
+def test_reregistering_replaces_old_hashes(tmp_path):
+    registry = OriginalRegistry(str(tmp_path / "originals.db"))
+    registry.register("lease", "Lease", "hash-1", PAGES)
+    assert registry.match("copy", PAGES)["originalId"] == "lease"
+
+    registry.register("lease", "Lease", "hash-2", REVISED)
+    assert registry.match("copy", PAGES) is None
+    assert registry.match("copy", REVISED)["status"] == "identical_text"
+
+
+def test_registered_at_tracks_each_original(tmp_path):
+    registry = OriginalRegistry(str(tmp_path / "originals.db"))
+    assert registry.registered_at() is None
+    registry.register("lease", "Lease", "hash-1", PAGES)
+    first = registry.registered_at("lease")
+    registry.register("nda", "NDA", "hash-2", REVISED)
+
+    assert registry.registered_at("lease") == first
+    assert registry.registered_at() == registry.registered_at("nda") > first
+    assert registry.match("hash-1", PAGES)["registeredAt"] == first
+
+
+def test_document_without_text_is_not_registered(tmp_path):
+    registry = OriginalRegistry(str(tmp_path / "originals.db"))
+    with pytest.raises(ValueError, match="no text"):
+        registry.register("scan", "Scan", "hash-1", ["", "  \n\n  "])
+    assert registry.registered_at() is None
@@ -0,0 +1,125 @@
+"""
+Alterability verdicts for signed PDFs built with the benchmark's writer.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import re
+
+import pytest
+
+from benchmarks.pdf_forensics_benchmark import PdfWriter, make_pdf
+from services.pdf_forensics import analyze_pdf
+
+BYTE_RANGE_PLACEHOLDER = b"/ByteRange [0 0000000000 0000000000 0000000000]"
+PAGE = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents 11 0 R"
+
+
+def last_xref(writer: PdfWriter) -> int:
+    return int(re.findall(rb"startxref\s+(\d+)", writer.bytes())[-1])
+
+
+def unsigned() -> PdfWriter:
+    writer = PdfWriter()
+    writer.parts = [make_pdf(1)]
+    return writer
+
+
+def sign(writer: PdfWriter, count: int) -> None:
+    """Append the `count`-th signature as an incremental update, the way signing tools do."""
+    previous = last_xref(writer)
+    widgets = " ".join(f"{30 + index} 0 R" for index in range(1, count + 1))
+    writer.add(20 + count, (
+        b"<< /Type /Sig /Filter /Adobe.PPKLite /SubFilter /adbe.pkcs7.detached "
+        + BYTE_RANGE_PLACEHOLDER + b" /Contents <" + b"0" * 64 + b"> >>"
+    ))
+    writer.add(30 + count, (
+        f"<< /Type /Annot /Subtype /Widget /FT /Sig /Rect [0 0 0 0] /V {20 + count} 0 R /P 10 0 R"
+        f" /T (Signature{count}) >>"
+    ).encode())
+    writer.add(10, PAGE + f" /Annots [{widgets}] >>".encode())
+    writer.add(1, (
+        f"<< /Type /Catalog /Pages 2 0 R /Metadata 5 0 R /AcroForm << /Fields [{widgets}] /SigFlags 3 >> >>"
+    ).encode())
+    writer.finish(root=1, info=4, previous=previous)
+
+    # Sign everything but the /Contents hex string, up to the end of this revision
+    data = writer.bytes()
+    placeholder = data.rindex(BYTE_RANGE_PLACEHOLDER)
+    contents_start = data.index(b"/Contents <", placeholder) + len(b"/Contents ")
+    contents_end = data.index(b">", contents_start) + 1
+    byte_range = f"/ByteRange [0 {contents_start:010d} {contents_end:010d} {len(data) - contents_end:010d}]".encode()
+    writer.parts = [data[:placeholder] + byte_range + data[placeholder + len(byte_range):]]
+
+
+def replace_page_text(writer: PdfWriter) -> None:
+    previous = last_xref(writer)
+    content = b"BT /F1 12 Tf 72 720 Td (Amended page) Tj ET"
+    writer.add(11, f"<< /Length {len(content)} >>".encode(), content)
+    writer.finish(root=1, info=4, previous=previous)
+
+
+def test_unsigned_original_is_low_risk():
+    result = analyze_pdf(content=unsigned().bytes())
+    assert result["alterabilityRisk"] == "Low"
+    assert result["forensics"]["revisions"] == []
+
+
+def test_signature_covering_whole_file_is_low_risk():
+    writer = unsigned()
+    sign(writer, 1)
+    result = analyze_pdf(content=writer.bytes())
+
+    assert result["alterabilityRisk"] == "Low"
+    assert result["technicalDetails"]["textInsertion"] is False
+    assert result["technicalDetails"]["digitalSignature"] is True
+    assert result["forensics"]["changedPages"] == []
+    assert result["forensics"]["revisions"][0]["annotationsOnly"] is True
+    signature = result["forensics"]["signatures"][0]
+    assert signature["coversWholeFile"] and not signature["changedAfterSigning"]
+
+
+def test_countersigned_document_is_not_changed_after_signing():
+    writer = unsigned()
+    sign(writer, 1)
+    sign(writer, 2)
+    result = analyze_pdf(content=writer.bytes())
+
+    first, second = result["forensics"]["signatures"]
+    assert not first["coversWholeFile"] and not first["changedAfterSigning"]
+    assert second["coversWholeFile"]
+    assert "The document was changed after it was signed" not in result["findings"]
+    assert result["alterabilityRisk"] == "Low"
+
+
+def test_content_replaced_after_signing_is_high_risk():
+    writer = unsigned()
+    sign(writer, 1)
+    replace_page_text(writer)
+    result = analyze_pdf(content=writer.bytes())
+
+    assert result["alterabilityRisk"] == "High"
+    assert result["forensics"]["changedPages"] == [1]
+    assert result["forensics"]["signatures"][0]["changedAfterSigning"]
+    assert "The document was changed after it was signed" in result["findings"]
+
+
+def test_content_replaced_before_signing_is_vouched_for():
+    writer = unsigned()
+    replace_page_text(writer)
+    sign(writer, 1)
+    result = analyze_pdf(content=writer.bytes())
+
+    assert result["forensics"]["changedPages"] == []
+    assert result["technicalDetails"]["textInsertion"] is False
+    assert result["alterabilityRisk"] == "Low"
+
+
+def test_empty_file_is_not_a_pdf(tmp_path):
+    path = tmp_path / "empty.pdf"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        analyze_pdf(str(path))
+    with pytest.raises(ValueError):
+        analyze_pdf(content=b"%PD")
@@ -0,0 +1,89 @@
+"""
+Stored analysis results and the ETags of GET /results.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import importlib
+import sys
+
+import pytest
+from starlette.requests import Request
+
+from services.result_cache import ResultCache
+
+
+def test_results_are_keyed_by_engine_version(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.db"))
+    cache.put("hash", "verify", "contract", "1", {"riskLevel": "Low"})
+
+    assert cache.get("hash", "verify", "contract", "1") == {"riskLevel": "Low"}
+    assert cache.get("hash", "verify", "contract", "2") is None
+    assert cache.get("hash", "verify", "invoice", "1") is None
+    assert cache.stats()["kinds"]["verify"] == {"hits": 1, "misses": 2, "hit_rate": 0.333}
+
+
+def test_results_are_shared_through_the_database(tmp_path):
+    path = str(tmp_path / "results.db")
+    ResultCache(path).put("hash", "summarize", "", "1", {"summary": "Short."})
+
+    other = ResultCache(path, memory_size=1)
+    assert other.get("hash", "summarize", "", "1") == {"summary": "Short."}
+    assert other.latest("hash", "summarize", "1")["result"] == {"summary": "Short."}
+    assert other.latest("hash", "summarize", "1", variant="other") is None
+
+
+def test_memory_is_bounded(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.db"), memory_size=2)
+    for index in range(3):
+        cache.put(f"hash-{index}", "verify", "", "1", {"index": index})
+
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("hash-0", "verify", "", "1") == {"index": 0}
+
+
+def test_purge_stale_deletes_old_engine_versions(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.db"))
+    cache.put("hash", "verify", "", "1", {"old": True})
+    cache.put("hash", "verify", "", "2", {"old": False})
+    cache.put("hash", "summarize", "", "1", {"old": False})
+
+    assert cache.purge_stale({"verify": "2", "summarize": "1"}) == 1
+    assert cache.get("hash", "verify", "", "1") is None
+    assert cache.get("hash", "verify", "", "2") == {"old": False}
+    assert cache.stats()["entries"] == 2
+
+
+@pytest.fixture(scope="module")
+def cached_response(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DATA_DIR", str(tmp_path_factory.mktemp("data")))
+        patch.setenv("OPENAI_API_KEY", "test")
+        sys.modules.pop("main", None)
+        yield importlib.import_module("main").cached_response
+    sys.modules.pop("main", None)
+
+
+def request_with(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/results/file",
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+    })
+
+
+def test_etag_turns_repeat_requests_into_304(cached_response):
+    payload = {"file_id": "file", "results": {"verify": {"riskLevel": "Low"}}}
+    response = cached_response(request_with({}), payload)
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+
+    assert cached_response(request_with({"If-None-Match": etag}), payload).status_code == 304
+    assert cached_response(request_with({"If-None-Match": f'"other", {etag}'}), payload).status_code == 304
+    # Key order does not change the tag, new content does
+    assert cached_response(request_with({}), dict(reversed(payload.items()))).headers["etag"] == etag
+    changed = cached_response(request_with({"If-None-Match": etag}), {**payload, "results": {}})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
@@ -0,0 +1,68 @@
+"""
+Keyset cursors of the NDJSON result export.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import json
+
+import pytest
+
+from services import result_export
+from services.result_cache import ResultCache
+from services.result_export import decode_cursor, encode_cursor, export_lines, parse_timestamp
+
+
+def filled_cache(tmp_path, count: int) -> ResultCache:
+    cache = ResultCache(str(tmp_path / "results.db"))
+    for index in range(count):
+        cache.put(f"hash-{index:02d}", "verify", "contract", "1", {"index": index})
+    # Several rows share a timestamp, so ties are broken by the key
+    cache._conn.execute("UPDATE analysis_results SET created_at = '2026-01-01T00:00:00'")
+    return cache
+
+
+def test_cursor_round_trip():
+    row = ("2026-01-01T00:00:00", "hash", "verify", "contract \"quoted\" é", "1")
+    assert decode_cursor(encode_cursor(row)) == row
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30=", "WyJhIl0=", "WzEsMiwzLDQsNV0="])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_export_resumes_after_the_cursor(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_export, "EXPORT_PAGE_SIZE", 3)
+    cache = filled_cache(tmp_path, 10)
+
+    exported, cursor = [], None
+    while True:
+        page = [json.loads(line) for line in export_lines(cache, ["verify"], cursor=cursor, limit=4)]
+        if not page:
+            break
+        exported.extend(page)
+        cursor = page[-1]["cursor"]
+
+    assert [line["result"]["index"] for line in exported] == list(range(10))
+    assert exported[0]["content_hash"] == "hash-00"
+    assert exported[0]["variant"] == "contract"
+
+
+def test_export_filters_by_kind_and_time(tmp_path):
+    cache = filled_cache(tmp_path, 3)
+    cache.put("later", "summarize", "", "1", {"summary": "Short."})
+    cache._conn.execute("UPDATE analysis_results SET created_at = '2026-02-01T00:00:00' WHERE kind = 'summarize'")
+
+    kinds = [json.loads(line)["kind"] for line in export_lines(cache, ["verify", "summarize"], since="2026-01-15")]
+    assert kinds == ["summarize"]
+    assert len(list(export_lines(cache, ["verify"], until="2026-01-15"))) == 3
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("2026-01-01", "since") == "2026-01-01T00:00:00"
+    assert parse_timestamp(None, "since") is None
+    with pytest.raises(ValueError, match="since must be"):
+        parse_timestamp("yesterday", "since")
@@ -0,0 +1,45 @@
+"""
+Tampering check of /verify on signed PDFs.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+from services.verification_checks import check_tampering, _forensics
+from services.document_service import DocumentService
+from tests.test_pdf_forensics import replace_page_text, sign, unsigned
+
+
+def tampering(content: bytes) -> dict:
+    document_service = DocumentService()
+    document_service.files["doc"] = {
+        "filename": "doc.pdf",
+        "content_type": "application/pdf",
+        "size": len(content),
+        "pdf": document_service.scan_pdf(content),
+        "content": content
+    }
+    return check_tampering({
+        "content": content,
+        "metadata": document_service.get_metadata("doc"),
+        "forensics": _forensics(document_service, "doc")
+    })
+
+
+def test_signature_is_not_tampering():
+    writer = unsigned()
+    sign(writer, 1)
+    sign(writer, 2)
+    result = tampering(writer.bytes())
+    assert result["passed"]
+    assert result["details"] == {"revisions": 3, "unvouchedUpdates": 0}
+
+
+def test_change_after_signing_is_tampering():
+    writer = unsigned()
+    sign(writer, 1)
+    replace_page_text(writer)
+    result = tampering(writer.bytes())
+    assert not result["passed"]
+    assert "PDF was changed after it was signed" in result["issues"]
+    assert result["details"]["unvouchedUpdates"] == 1
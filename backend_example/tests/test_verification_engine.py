@@ -0,0 +1,40 @@
+"""
+Timeouts and failures of individual verification checks.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import asyncio
+import threading
+import time
+
+from services.verification_engine import Check, VerificationEngine
+
+
+def compose(results, document_type):
+    return {"statuses": {name: result.status for name, result in results.items()}}
+
+
+def test_hung_check_times_out_without_blocking_the_others():
+    release = threading.Event()
+    checks = [
+        Check("hung", lambda artifacts: release.wait(5) and {"passed": True}, ("text",), timeout=0.2),
+        Check("fast", lambda artifacts: {"passed": bool(artifacts["text"])}, ("text",)),
+        Check("broken", lambda artifacts: 1 / 0, ("text",))
+    ]
+    engine = VerificationEngine(checks, {"text": lambda file_id, document_type: "text"}, compose)
+
+    async def verify():
+        started = time.perf_counter()
+        try:
+            response = await engine.verify("doc", "contract")
+        finally:
+            # Let the abandoned thread finish so the loop can shut down
+            release.set()
+        return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(verify())
+    assert response["statuses"] == {"hung": "timeout", "fast": "passed", "broken": "error"}
+    assert elapsed < 1
+    assert [check["name"] for check in response["checks"]] == ["hung", "fast", "broken"]
@@ -11,6 +11,7 @@ export const API_CONFIG = {
     ANALYZE_ALTERABILITY: '/analyze-alterability',
     CHAT: '/chat',
     SUMMARIZE: '/summarize',
+    RESULTS: '/results',
   },
   
   // Request settings
@@ -27,7 +27,37 @@ export interface VerificationResult {
     isCompliant: boolean;
     missingElements: string[];
     complianceScore: number;
+    clauseScores?: Record<string, number>;
+    sections?: Record<string, {
+      heading: string;
+      number: string | null;
+      types: string[];
+      start: number;
+      end: number;
+    }>;
   };
+  checks?: Array<{
+    name: string;
+    status: 'passed' | 'failed' | 'timeout' | 'error';
+    duration_ms: number;
+  }>;
+  verificationTimeMs?: number;
+  nearDuplicates?: Array<{
+    file_id: string;
+    filename: string;
+    uploaded_at: string;
+    similarity: number;
+  }>;
+  keyFacts?: KeyFacts;
+  riskFeatures?: Record<string, number>;
+  riskModel?: string | null;
+}
+
+export interface KeyFacts {
+  parties: string[];
+  dates: string[];
+  amounts: string[];
+  jurisdictions: string[];
 }
 
 export interface AlterabilityAnalysis {
@@ -42,6 +72,22 @@ export interface AlterabilityAnalysis {
     digitalSignature: boolean;
     timestampValidation: boolean;
   };
+  forensics?: Record<string, unknown>;
+  originalMatch?: {
+    status: 'exact' | 'identical_text' | 'modified';
+    originalId: string;
+    name: string;
+    identicalBytes: boolean;
+    pages: number;
+    matchingPages: number;
+    differingPages: Array<{
+      page: number;
+      originalPage: number | null;
+      paragraphs: number;
+      changedParagraphs: number;
+    }>;
+    missingOriginalPages: number[];
+  } | null;
 }
 
 export interface ChatResponse {
@@ -52,6 +98,8 @@ export interface ChatResponse {
 
 export class DocumentVerificationAPI {
   private baseURL: string;
+  // Last response per results URL, revalidated with If-None-Match
+  private resultsCache = new Map<string, { etag: string; data: unknown }>();
 
   constructor() {
     this.baseURL = API_CONFIG.BASE_URL;
@@ -246,11 +294,11 @@ export class DocumentVerificationAPI {
     }
   }
 
-  async getDocumentSummary(file: File): Promise<{ summary: string; keyPoints: string[] }> {
+  async getDocumentSummary(file: File): Promise<{ summary: string; keyPoints: string[]; keyFacts?: KeyFacts }> {
     try {
       const fileId = await this.uploadFile(file);
 
-      return await this.makeRequest<{ summary: string; keyPoints: string[] }>(API_CONFIG.ENDPOINTS.SUMMARIZE, {
+      return await this.makeRequest<{ summary: string; keyPoints: string[]; keyFacts?: KeyFacts }>(API_CONFIG.ENDPOINTS.SUMMARIZE, {
         method: 'POST',
         body: JSON.stringify({
           file_id: fileId,
@@ -262,6 +310,33 @@ export class DocumentVerificationAPI {
     }
   }
 
+  // Fetch already computed results without triggering a new analysis.
+  // Polling is cheap: unchanged results come back as 304 Not Modified.
+  async getResults<T = Record<string, unknown>>(fileId: string, kind?: string): Promise<T> {
+    const endpoint = `${API_CONFIG.ENDPOINTS.RESULTS}/${fileId}${kind ? `/${kind}` : ''}`;
+    const cached = this.resultsCache.get(endpoint);
+
+    const response = await fetch(getApiUrl(endpoint), {
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.data as T;
+    }
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
+    }
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+      this.resultsCache.set(endpoint, { etag, data });
+    }
+    return data as T;
+  }
+
   // Health check endpoint
   async healthCheck(): Promise<{ status: string; version: string }> {
     return await this.makeRequest<{ status: string; version: string }>(API_CONFIG.ENDPOINTS.HEALTH);